@@ -2,8 +2,11 @@ from .cwn_base import CwnBase, CwnImage
 from .cwn_graph import CWN_Graph
 from . import cwnio as io
 from .cwn_graph_utils import CwnGraphUtils
+from .cwn_async import AsyncCwnImage
+from .cwn_metrics import Metrics, LoggingSink, CallbackSink, PrometheusTextSink
 from .cwn_types import *
 from .download import update_manifest, list_images
+from .cwn_imagefile import CwnImageIntegrityError
 
 #
 # download manifest
@@ -0,0 +1,164 @@
+import copy
+import asyncio
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from .cwn_base import CwnImage
+from . import cwn_pool
+
+
+class AsyncCwnImage:
+    """Awaitable facade of a :class:`CwnImage <CwnGraph.cwn_base.CwnImage>`.
+
+    Every query method of :class:`CwnGraphUtils
+    <CwnGraph.cwn_graph_utils.CwnGraphUtils>` listed in ``QUERY_METHODS``
+    is available as a coroutine, e.g. ``await acwn.find_lemma("電腦")``.
+    The query itself runs in an executor, so the event loop is never
+    blocked by it.
+
+    Identical concurrent calls (same method and arguments) are coalesced
+    into one execution. Each call may pass ``timeout`` (in seconds);
+    when a call times out or is cancelled, the underlying execution is
+    cancelled as well once no other caller is waiting on it. Note that a
+    query already running in a thread cannot be interrupted; it finishes
+    in the background and its result is dropped.
+
+    Parameters
+    ----------
+    image : CwnImage
+        the image to query
+    executor : str or Executor, optional
+        ``"thread"`` (default) or ``"process"`` to create a pool, or an
+        existing ``Executor``. A user-supplied ``ProcessPoolExecutor``
+        must initialize its workers with ``cwn_pool.init_worker``.
+    max_workers : int, optional
+        size of the pool created for ``"thread"`` or ``"process"``
+    timeout : float, optional
+        default timeout of every call, by default no timeout
+    """
+
+    QUERY_METHODS = (
+        "find_glyph", "find_lemma", "find_all_senses", "find_senses",
+        "find_edges", "subgraph", "connected", "find_shortest_path",
+        "has_id", "get_node_data", "get_edge_data", "from_sense_id",
+        "get_all_lemmas", "get_all_senses", "get_all_synsets")
+
+    def __init__(self, image, executor="thread", max_workers=None, timeout=None):
+        self.image = image
+        self.timeout = timeout
+        self._owns_executor = isinstance(executor, str)
+        if executor == "thread":
+            executor = ThreadPoolExecutor(max_workers,
+                thread_name_prefix="cwn-query")
+        elif executor == "process":
+            executor = cwn_pool.make_process_pool(image, max_workers)
+        elif not isinstance(executor, Executor):
+            raise ValueError(f"unknown executor: {executor}")
+        self.executor = executor
+        self.use_process = isinstance(executor, ProcessPoolExecutor)
+        self._inflight = {}
+
+    def __repr__(self):
+        return f"<AsyncCwnImage: {self.image!r}>"
+
+    @classmethod
+    async def load(cls, img_path_or_tag: str, **kwargs):
+        """Load an image without blocking the event loop.
+
+        Parameters
+        ----------
+        img_path_or_tag : str
+            see :meth:`CwnImage.load <CwnGraph.cwn_base.CwnImage.load>`
+        **kwargs
+            passed to ``AsyncCwnImage``
+
+        Returns
+        -------
+        AsyncCwnImage
+        """
+        loop = asyncio.get_running_loop()
+        image = await loop.run_in_executor(None, CwnImage.load, img_path_or_tag)
+        return cls(image, **kwargs)
+
+    def __getattr__(self, name):
+        if name not in AsyncCwnImage.QUERY_METHODS:
+            raise AttributeError("attribute not found: " + name)
+
+        async def query_method(*args, timeout=None, **kwargs):
+            return await self.call(name, *args, timeout=timeout, **kwargs)
+        query_method.__name__ = name
+        return query_method
+
+    async def call(self, method, *args, timeout=None, **kwargs):
+        """Run ``method`` of the image with the given arguments.
+
+        Parameters
+        ----------
+        method : str
+            name of a query method in ``QUERY_METHODS``
+        timeout : float, optional
+            overrides the default timeout of this facade
+
+        Returns
+        -------
+        the return value of the query method
+        """
+        if method not in AsyncCwnImage.QUERY_METHODS:
+            raise ValueError(f"{method} is not a query method")
+        if timeout is None:
+            timeout = self.timeout
+
+        key = self.coalesce_key(method, args, kwargs)
+        entry = self._inflight.get(key) if key is not None else None
+        if entry is None:
+            task = asyncio.ensure_future(self._run(method, args, kwargs))
+            entry = [task, 0]
+            if key is not None:
+                self._inflight[key] = entry
+                task.add_done_callback(
+                    lambda _, key=key, entry=entry: self._release(key, entry))
+        task = entry[0]
+
+        entry[1] += 1
+        try:
+            ret = await asyncio.wait_for(asyncio.shield(task), timeout)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0 and not task.done():
+                task.cancel()
+        # coalesced callers get their own container
+        return copy.copy(ret)
+
+    async def _run(self, method, args, kwargs):
+        loop = asyncio.get_running_loop()
+        if self.use_process:
+            ret = await loop.run_in_executor(self.executor,
+                cwn_pool.run_query, method, args, kwargs)
+            return cwn_pool.decode_result(ret, self.image)
+        else:
+            query_func = getattr(self.image, method)
+            return await loop.run_in_executor(self.executor,
+                lambda: query_func(*args, **kwargs))
+
+    def _release(self, key, entry):
+        if self._inflight.get(key) is entry:
+            del self._inflight[key]
+
+    @staticmethod
+    def coalesce_key(method, args, kwargs):
+        key = (method, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            # unhashable arguments (e.g. a list of node ids) are not coalesced
+            return None
+        return key
+
+    def close(self, wait=True):
+        if self._owns_executor:
+            self.executor.shutdown(wait=wait)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.close)
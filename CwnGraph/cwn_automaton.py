@@ -0,0 +1,176 @@
+"""Find CWN lemmas in running text.
+
+:class:`LemmaAutomaton` is an Aho–Corasick automaton over all lemma
+strings: ``scan`` reports every lemma occurrence in one pass over the
+text, ``segment`` cuts the text by greedy longest match.
+"""
+import os
+import multiprocessing as mp
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from .cwn_pool import map_bounded, can_fork
+
+LemmaMatch = namedtuple("LemmaMatch", ["start", "end", "lemma", "lemma_ids"])
+LemmaMatch.__doc__ = """A span of text, ``text[start:end] == lemma``.
+``lemma_ids`` are the ids of the lemma nodes with this lemma, empty for
+the characters ``segment`` could not match."""
+
+
+class LemmaAutomaton:
+    """Aho–Corasick automaton over lemma strings.
+
+    Parameters
+    ----------
+    lemma_index : dict
+        lemma string -> lemma node ids, e.g. ``CwnGraphUtils.lemma_index``
+    """
+    def __init__(self, lemma_index):
+        goto = [{}]
+        outputs = [()]
+        for lemma, lemma_ids in lemma_index.items():
+            if not lemma:
+                continue
+            state = 0
+            for ch in lemma:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = goto[state][ch] = len(goto)
+                    goto.append({})
+                    outputs.append(())
+                state = nxt
+            outputs[state] = ((len(lemma), lemma, tuple(lemma_ids)),)
+        # the lemma ending at each trie state, before suffixes are added
+        terminals = [x[0] if x else None for x in outputs]
+
+        # failure links, breadth first; each state also reports the
+        # lemmas of its failure state (the suffixes of its own string)
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                fallback = fail[state]
+                while fallback and ch not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[nxt] = goto[fallback].get(ch, 0)
+                outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+
+        self.goto = goto
+        self.fail = fail
+        self.outputs = outputs
+        self.terminals = terminals
+        self.n_lemmas = sum(1 for x in lemma_index if x)
+
+    def __repr__(self):
+        return f"<LemmaAutomaton: {self.n_lemmas} lemmas, {len(self.goto)} states>"
+
+    def scan(self, text):
+        """Yield every lemma occurrence in ``text``, overlapping ones
+        included, as :class:`LemmaMatch`, by end position then longest
+        first."""
+        goto = self.goto
+        fail = self.fail
+        outputs = self.outputs
+        state = 0
+        for i, ch in enumerate(text):
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            state = nxt or 0
+            if outputs[state]:
+                end = i + 1
+                for length, lemma, lemma_ids in outputs[state]:
+                    yield LemmaMatch(end - length, end, lemma, lemma_ids)
+
+    def segment(self, text):
+        """Cut ``text`` into lemmas by greedy longest match, left to right.
+        Characters starting no lemma are single spans with no lemma ids.
+
+        Returns
+        -------
+        list
+            :class:`LemmaMatch` spans covering ``text``
+        """
+        goto = self.goto
+        terminals = self.terminals
+        spans = []
+        start = 0
+        n_chars = len(text)
+        while start < n_chars:
+            state = 0
+            best = None
+            for i in range(start, n_chars):
+                state = goto[state].get(text[i])
+                if state is None:
+                    break
+                if terminals[state] is not None:
+                    best = terminals[state]
+            if best is None:
+                spans.append(LemmaMatch(start, start + 1, text[start], ()))
+                start += 1
+            else:
+                length, lemma, lemma_ids = best
+                spans.append(LemmaMatch(start, start + length, lemma, lemma_ids))
+                start += length
+        return spans
+
+    def scan_many(self, documents, mode="scan", workers=None, chunksize=16,
+                  max_pending=None):
+        """Scan or segment many documents in worker processes.
+
+        Parameters
+        ----------
+        documents : iterable
+            the texts, consumed lazily
+        mode : str, optional
+            ``"scan"`` or ``"segment"``, by default ``"scan"``
+        workers : int, optional
+            number of processes, by default ``os.cpu_count()``;
+            ``workers=1`` runs in this process
+        chunksize : int, optional
+            number of documents sent to a worker at once, by default 16
+        max_pending : int, optional
+            number of chunks in flight, by default twice the workers
+
+        Returns
+        -------
+        generator
+            a list of :class:`LemmaMatch` for each document, in order
+        """
+        if mode not in ("scan", "segment"):
+            raise ValueError(f"unknown mode: {mode}")
+        workers = workers or os.cpu_count() or 1
+        if workers == 1:
+            return (_run(self, mode, doc) for doc in documents)
+        return self._scan_in_pool(documents, mode, workers, chunksize,
+                                  max_pending or 2 * workers)
+
+    def _scan_in_pool(self, documents, mode, workers, chunksize, max_pending):
+        # forked workers inherit the automaton, others unpickle it once
+        mp_context = mp.get_context("fork") if can_fork() else None
+        pool = ProcessPoolExecutor(workers, mp_context=mp_context,
+            initializer=_init_worker, initargs=(self,))
+        try:
+            jobs = ((mode, doc) for doc in documents)
+            for rets in map_bounded(pool, _scan_in_worker, jobs,
+                                    chunksize, max_pending):
+                yield from rets
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+_worker_automaton = None
+
+def _init_worker(automaton):
+    global _worker_automaton
+    _worker_automaton = automaton
+
+def _scan_in_worker(jobs):
+    return [_run(_worker_automaton, mode, doc) for mode, doc in jobs]
+
+def _run(automaton, mode, doc):
+    if mode == "scan":
+        return list(automaton.scan(doc))
+    return automaton.segment(doc)
@@ -3,48 +3,94 @@ from shutil import copyfile
 from pathlib import Path
 from .download import (
     get_manifest, get_cache_dir,
-    ensure_image)
+    get_image_info, ensure_image)
 from .cwn_graph_utils import CwnGraphUtils
+from .cwn_overlay import OverlayImage
 from . import cwn_stat
 from . import cwnio
+from . import cwn_pool
+from . import cwn_checker
+from .cwn_metrics import load_phase
+from .cwn_bitmap import split_values
+from .cwn_imagefile import read_image, write_image, CwnImageIntegrityError
 from .cwn_types import CwnSense, CwnSynset
 
-def load_cwn_image(fpath):
-    with open(fpath, "rb") as fin:
-        data = pickle.load(fin)
-        if len(data) == 2:
-            V, E = data
-            meta = {}
-        else:
-            V, E, meta = data
+def load_cwn_image(fpath, sha256=None):
+    """``(V, E, meta)`` of an image file, compressed or pickled, see
+    :func:`read_image <CwnGraph.cwn_imagefile.read_image>`."""
+    return read_image(fpath, sha256=sha256)
+
+def load_cached_image(tag, image_path):
+    """Read ``image_path``, the cached image of ``tag``, checked against
+    the manifest. A corrupted file is downloaded again."""
+    sha256 = get_image_info(tag).get("sha256")
+    try:
+        V, E, meta = load_cwn_image(image_path, sha256)
+    except CwnImageIntegrityError as ex:
+        print("WARNING: removing corrupted image:", ex)
+        image_path.unlink(missing_ok=True)
+        image_path = ensure_image(tag)
+        V, E, meta = load_cwn_image(image_path, sha256)
     return V, E, meta
 
 class CwnImage(CwnGraphUtils):
     def __init__(self, V, E, meta):
         super(CwnImage, self).__init__(V, E, meta)
+        self.image_path = None
+        self.embeddings = None
+        self._embedding_rows = None
 
     def __repr__(self):
         return "<CwnImage: {}>".format(self.meta.get("label", "<cwn-image>"))    
 
     @classmethod
-    def load(cls, img_path_or_tag:str):
+    def load(cls, img_path_or_tag:str, metrics=None, compact=False):
+        """Load an image by its tag in the manifest, or by its path.
+
+        Parameters
+        ----------
+        img_path_or_tag : str
+            an image tag, ``"latest"``, or the path of an image file
+        metrics : Metrics, optional
+            if given, the ``resolve``, ``read`` and ``index`` phases of
+            loading are timed into it, and the loaded image records its
+            queries into it
+        compact : bool, optional
+            keep the node data in a column store, see ``compact()``, by
+            default False
+
+        Returns
+        -------
+        CwnImage
+        """
         # FIX THIS: CwnImage.load() is unnecessarily coupled with manifest
-        manifest = get_manifest()
-        tags = [x["tag"] for x in manifest["images"]]
+        with load_phase(metrics, "resolve"):
+            manifest = get_manifest()
+            tags = [x["tag"] for x in manifest["images"]]
 
-        if not tags:
-            raise ValueError("Something is wrong. There is no image in the manifest.")
+            if not tags:
+                raise ValueError("Something is wrong. There is no image in the manifest.")
 
-        if img_path_or_tag == "latest":
-            img_path_or_tag = tags[0]
-        
-        if img_path_or_tag in tags:
-            image_path = ensure_image(img_path_or_tag)            
-        else:
-            image_path = img_path_or_tag
+            if img_path_or_tag == "latest":
+                img_path_or_tag = tags[0]
+
+            if img_path_or_tag in tags:
+                image_path = ensure_image(img_path_or_tag)
+            else:
+                image_path = img_path_or_tag
 
-        V, E, meta = load_cwn_image(image_path)
-        inst = CwnImage(V, E, meta)
+        with load_phase(metrics, "read"):
+            if img_path_or_tag in tags:
+                V, E, meta = load_cached_image(img_path_or_tag, image_path)
+            else:
+                V, E, meta = load_cwn_image(image_path)
+        with load_phase(metrics, "index"):
+            inst = CwnImage(V, E, meta)
+            if compact:
+                inst.compact()
+        inst.image_path = str(image_path)
+        if metrics is not None:
+            inst.enable_metrics(metrics)
         return inst
 
     @classmethod
@@ -55,11 +101,209 @@ class CwnImage(CwnGraphUtils):
     def beta(cls):
         return cls.load("beta")
         
-    def save(self, fpath):
+    def save(self, fpath, compress=False, codec="auto"):
+        """Save the image.
+
+        Parameters
+        ----------
+        fpath : str or Path
+        compress : bool, optional
+            write a compressed image file with checksums (see
+            :mod:`CwnGraph.cwn_imagefile`) rather than a plain pickle, by
+            default False
+        codec : str, optional
+            ``"zstd"``, ``"lz4"``, ``"zlib"``, or ``"auto"`` (the first
+            one installed)
+
+        Returns
+        -------
+        str or Path
+            ``fpath``
+        """
+        if compress:
+            write_image(fpath, self.V, self.E, self.meta, codec=codec)
+            return fpath
+        V = self.V
+        if not isinstance(V, dict):
+            # e.g. a compacted NodeStore: images are saved as plain dicts
+            V = {k: dict(v) for k, v in V.items()}
         with open(fpath, "wb") as fout:
-            pickle.dump((self.V, self.E, self.meta), fout)
+            pickle.dump((V, self.E, self.meta), fout)
         return fpath
 
+    def load_embeddings(self, prefix=None, mmap=True, strict=True):
+        """Load and attach the sense embeddings stored with this image.
+
+        Parameters
+        ----------
+        prefix : str, optional
+            reads ``<prefix>.emb.npy`` and ``<prefix>.emb.json``, by
+            default next to the image file this image was loaded from
+        mmap : bool, optional
+            memory-map the vectors, by default True
+        strict : bool, optional
+            raise ``ValueError`` if the embeddings were computed from
+            another version of the image, by default True; otherwise only
+            print a warning
+
+        Returns
+        -------
+        SenseEmbeddings
+        """
+        from .cwn_embeddings import SenseEmbeddings
+        if prefix is None:
+            if self.image_path is None:
+                raise ValueError("image has no path, pass the embedding prefix")
+            prefix = self.image_path
+        embeddings = SenseEmbeddings.load(prefix, mmap=mmap)
+        graph_hash = embeddings.meta.get("graph_hash")
+        if graph_hash and graph_hash != self.get_hash():
+            msg = (f"embeddings were computed from image {graph_hash}, "
+                   f"not {self.get_hash()}")
+            if strict:
+                raise ValueError(msg)
+            print("WARNING:", msg)
+        self.attach_embeddings(embeddings)
+        return embeddings
+
+    def attach_embeddings(self, embeddings):
+        """Use ``embeddings`` (a :class:`SenseEmbeddings
+        <CwnGraph.cwn_embeddings.SenseEmbeddings>`) for ``nearest_senses``."""
+        import numpy as np
+        V = self.V
+        row_data = [V.get(nid, {}) for nid in embeddings.ids]
+        is_sense = np.array([x.get("node_type") == "sense" for x in row_data],
+                            dtype=bool)
+        # rows -> index of their POS value; a value is matched on its tags
+        pos_codes = {}
+        row_pos = np.array([pos_codes.setdefault(x.get("pos", ""), len(pos_codes))
+                            for x in row_data], dtype=np.int32)
+        pos_tags = [set(split_values(x)) for x in pos_codes]
+        self._embedding_rows = (is_sense, row_pos, pos_tags)
+        self.embeddings = embeddings
+
+    def nearest_senses(self, vector, k=10, pos=None, lemma=None, n_probe=8):
+        """Senses whose embeddings are the closest to ``vector``.
+
+        Parameters
+        ----------
+        vector : array-like
+            query vector, of the dimension of the attached embeddings
+        k : int, optional
+            number of senses, by default 10
+        pos : str or list, optional
+            only return senses with this POS tag (or one of these);
+            ``"VC,VH"`` senses have both tags
+        lemma : str, optional
+            only return senses of this lemma, scored exactly
+        n_probe : int, optional
+            number of IVF lists searched, when candidates are many
+
+        Returns
+        -------
+        list
+            ``(CwnSense, cosine similarity)`` pairs, best first
+        """
+        import numpy as np
+        embeddings = self.embeddings
+        if embeddings is None:
+            raise ValueError("no embeddings, see load_embeddings()")
+        if isinstance(pos, str):
+            pos = [pos]
+
+        is_sense, row_pos, pos_tags = self._embedding_rows
+        if pos is not None:
+            pos_match = np.array([not tags.isdisjoint(pos) for tags in pos_tags],
+                                 dtype=bool)
+        rows, mask = None, None
+        if lemma is not None:
+            rows = embeddings.rows(self.lemma_sense_ids(lemma))
+            if pos is not None:
+                rows = rows[pos_match[row_pos[rows]]]
+        else:
+            mask = is_sense
+            if pos is not None:
+                mask = mask & pos_match[row_pos]
+
+        rows, scores = embeddings.search(vector, k, rows=rows, mask=mask,
+                                         n_probe=n_probe)
+        ids = embeddings.ids
+        return [(CwnSense(ids[r], self), float(score))
+                for r, score in zip(rows, scores)]
+
+    def map_queries(self, queries, method=None, workers=None,
+            chunksize=64, max_pending=None):
+        """Run many queries in worker processes sharing this image.
+
+        With the ``fork`` start method the workers inherit the loaded
+        image, otherwise each worker loads it once. Results are yielded
+        in the order of ``queries``; the input is consumed lazily, with
+        at most ``max_pending`` chunks in flight.
+
+        Parameters
+        ----------
+        queries : iterable
+            ``(method, args)`` or ``(method, args, kwargs)`` tuples, or the
+            single argument of each call when ``method`` is given. A method
+            is a method name, or a module-level function called as
+            ``method(image, *args, **kwargs)``.
+        method : str or callable, optional
+            the query method applied to every item of ``queries``
+        workers : int, optional
+            number of worker processes, by default ``os.cpu_count()``.
+            ``workers=1`` runs the queries in this process.
+        chunksize : int, optional
+            number of queries sent to a worker at once, by default 64
+        max_pending : int, optional
+            number of chunks in flight, by default twice the workers
+
+        Returns
+        -------
+        generator
+            the result of each query, e.g. lists of
+            :class:`CwnSense <CwnGraph.cwn_types.CwnSense>` bound to this image
+
+        Examples
+        --------
+        >>> for senses in cwn.map_queries(words, method="find_all_senses", workers=8):
+        ...     pass
+        """
+        return cwn_pool.map_queries(self, queries, method=method,
+                    workers=workers, chunksize=chunksize,
+                    max_pending=max_pending)
+
+    def check_consistency(self, checks=("inverse", "synset"), workers=None,
+            chunksize=4096):
+        """Check inverse relations and synset membership.
+
+        Parameters
+        ----------
+        checks : tuple, optional
+            ``"inverse"`` and/or ``"synset"``, by default both
+        workers : int, optional
+            number of worker processes; by default the checks run in
+            this process
+        chunksize : int, optional
+            number of nodes checked by a job, by default 4096
+
+        Returns
+        -------
+        generator
+            ``(CwnCheckerSuggestion, payload)`` tuples, see
+            :mod:`CwnGraph.cwn_checker`
+
+        Examples
+        --------
+        >>> from collections import Counter
+        >>> Counter(code for code, _ in cwn.check_consistency())
+        """
+        return cwn_checker.check_graph(self, checks, workers, chunksize)
+
+    def overlay(self):
+        """Start an edit session over this image, see
+        :class:`OverlayImage <CwnGraph.cwn_overlay.OverlayImage>`."""
+        return OverlayImage(self)
+
     def statistics(self, include_all=True):
         return cwn_stat.simple_statistics(self, include_all)
     
@@ -133,9 +377,8 @@ class CwnBase(CwnImage):
     """The base cwn reference data.
     """
     def __init__(self):
-        manifest = get_manifest()
         image_path = ensure_image("base")
-        V, E, meta = load_cwn_image(image_path)
+        V, E, meta = load_cached_image("base", image_path)
         super(CwnBase, self).__init__(V, E, meta)            
 
     def __repr__(self):
@@ -0,0 +1,282 @@
+"""Sense bitmaps for fast filtering and counting.
+
+Senses are numbered densely by their position in
+``node_ids("sense")``, and a set of senses is a :class:`SenseBitmap`, a
+Python int whose bit ``i`` is set when sense ``i`` is in the set. Set
+algebra is then a single big-int operation, and iterating a bitmap
+gives the senses in ``V`` order.
+
+:class:`BitmapIndex` keeps a bitmap per POS tag, domain and relation
+type. Comma-joined POS values (e.g. ``"VC,VH"``) are split into their
+tags once, when the index is built.
+"""
+# node data fields holding comma-joined values
+MULTI_VALUED_FIELDS = ("pos",)
+
+
+def split_values(value):
+    """Tags of a comma-joined field value: ``"VC,VH"`` -> ``["VC", "VH"]``."""
+    return [x.strip() for x in (value or "").split(",") if x.strip()]
+
+
+def bits_from_positions(positions, n_bits):
+    positions = list(positions)
+    if len(positions) < 64:
+        bits = 0
+        for i in positions:
+            bits |= 1 << i
+        return bits
+    buf = bytearray((n_bits >> 3) + 1)
+    for i in positions:
+        buf[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buf, "little")
+
+
+def popcount(bits):
+    """Number of set bits of ``bits``."""
+    return bin(bits).count("1")
+
+
+if hasattr(int, "bit_count"):
+    # Python >= 3.10
+    popcount = int.bit_count
+
+
+def iter_positions(bits):
+    """Yield the set bit positions of ``bits``, lowest first."""
+    digits = bin(bits)[:1:-1]
+    i = digits.find("1")
+    while i >= 0:
+        yield i
+        i = digits.find("1", i + 1)
+
+
+class SenseSpace:
+    """The dense numbering of the senses shared by a set of bitmaps."""
+    def __init__(self, ids):
+        self.ids = tuple(ids)
+        self.position = {nid: i for i, nid in enumerate(self.ids)}
+        self.full = (1 << len(self.ids)) - 1
+
+    def __len__(self):
+        return len(self.ids)
+
+    def bitmap(self, node_ids):
+        """The bitmap of ``node_ids``, ignoring the ids that are not senses."""
+        position = self.position
+        return SenseBitmap(bits_from_positions(
+            (position[x] for x in node_ids if x in position), len(self.ids)),
+            self)
+
+
+class SenseBitmap:
+    """An immutable set of senses.
+
+    Supports ``&``, ``|``, ``-``, ``^``, ``~`` (complement among all
+    senses), ``len``, ``in`` with sense ids, and iteration over sense ids
+    in ``V`` order.
+    """
+    __slots__ = ("bits", "space")
+
+    def __init__(self, bits, space):
+        self.bits = bits
+        self.space = space
+
+    def __repr__(self):
+        return f"<SenseBitmap: {len(self)} of {len(self.space)} senses>"
+
+    def __len__(self):
+        return popcount(self.bits)
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __iter__(self):
+        ids = self.space.ids
+        return (ids[i] for i in iter_positions(self.bits))
+
+    def __contains__(self, node_id):
+        i = self.space.position.get(node_id)
+        return i is not None and (self.bits >> i) & 1 == 1
+
+    def __eq__(self, other):
+        if isinstance(other, SenseBitmap):
+            return self.space is other.space and self.bits == other.bits
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.bits)
+
+    def _check(self, other):
+        if not isinstance(other, SenseBitmap):
+            return NotImplemented
+        if other.space is not self.space:
+            raise ValueError("bitmaps of different sense spaces")
+        return other
+
+    def __and__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        return SenseBitmap(self.bits & other.bits, self.space)
+
+    def __or__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        return SenseBitmap(self.bits | other.bits, self.space)
+
+    def __sub__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        return SenseBitmap(self.bits & ~other.bits, self.space)
+
+    def __xor__(self, other):
+        if self._check(other) is NotImplemented:
+            return NotImplemented
+        return SenseBitmap(self.bits ^ other.bits, self.space)
+
+    def __invert__(self):
+        return SenseBitmap(self.space.full & ~self.bits, self.space)
+
+    def ids(self):
+        """The sense ids, in ``V`` order."""
+        return list(self)
+
+
+class BitmapIndex:
+    """Bitmaps of the senses of ``cgu`` by POS tag, domain and relation
+    type, built field by field on first use.
+
+    Examples
+    --------
+    >>> bm = cwn.sense_bitmaps
+    >>> len(bm.pos("Na") & bm.relation("hypernym") & ~bm.domain(""))
+    """
+    def __init__(self, cgu):
+        self.cgu = cgu
+        self.space = SenseSpace(cgu.node_ids("sense"))
+        self._fields = {}
+        self._relations = None
+
+    def __repr__(self):
+        return f"<BitmapIndex: {len(self.space)} senses>"
+
+    def empty(self):
+        return SenseBitmap(0, self.space)
+
+    def all(self):
+        return SenseBitmap(self.space.full, self.space)
+
+    def from_ids(self, node_ids):
+        return self.space.bitmap(node_ids)
+
+    def _build(self, groups):
+        n_bits = len(self.space)
+        return {key: SenseBitmap(bits_from_positions(positions, n_bits), self.space)
+                for key, positions in groups.items()}
+
+    def values(self, field, split=None):
+        """Field value -> bitmap of the senses with that value; a missing
+        field counts as ``""``. Multi-valued fields (``pos``) are keyed
+        by tag unless ``split`` is False, and a sense with no tag is
+        under ``""``."""
+        if split is None:
+            split = field in MULTI_VALUED_FIELDS
+        index = self._fields.get((field, split))
+        if index is None:
+            V = self.cgu.V
+            groups = {}
+            for i, nid in enumerate(self.space.ids):
+                value = V[nid].get(field, "")
+                if split:
+                    for tag in split_values(value) or [""]:
+                        groups.setdefault(tag, []).append(i)
+                else:
+                    groups.setdefault(value, []).append(i)
+            index = self._build(groups)
+            self._fields[(field, split)] = index
+        return index
+
+    def relations(self):
+        """Edge type -> bitmap of the senses with an outgoing edge of
+        that type."""
+        index = self._relations
+        if index is None:
+            position = self.space.position
+            groups = {}
+            for (src, _), edata in self.cgu.E.items():
+                i = position.get(src)
+                if i is not None:
+                    groups.setdefault(edata.get("edge_type"), []).append(i)
+            index = self._build(groups)
+            self._relations = index
+        return index
+
+    def _union(self, index, keys):
+        bits = 0
+        for key in keys:
+            bitmap = index.get(key)
+            if bitmap is not None:
+                bits |= bitmap.bits
+        return SenseBitmap(bits, self.space)
+
+    def pos(self, *tags):
+        """Senses having any of the POS ``tags``."""
+        return self._union(self.values("pos"), tags)
+
+    def domain(self, *domains):
+        """Senses in any of ``domains``."""
+        return self._union(self.values("domain"), domains)
+
+    def relation(self, *relation_types):
+        """Senses with an outgoing edge of any of ``relation_types``
+        (names or ``CwnRelationType``)."""
+        return self._union(self.relations(),
+                           (getattr(x, "name", x) for x in relation_types))
+
+    def _facet(self, name):
+        if name == "relation":
+            return self.relations()
+        return self.values(name)
+
+    def crosstab(self, rows="pos", cols="domain", within=None):
+        """Count the senses by two facets: ``"relation"`` or a node data
+        field such as ``"pos"`` or ``"domain"``.
+
+        Parameters
+        ----------
+        rows : str, optional
+            the row facet, by default ``"pos"``
+        cols : str, optional
+            the column facet, by default ``"domain"``
+        within : SenseBitmap, optional
+            only count these senses, by default all
+
+        Returns
+        -------
+        dict
+            ``{row: {col: count}}``, without zero counts; it can be
+            passed to ``pandas.DataFrame``
+        """
+        row_index = self._facet(rows)
+        col_index = self._facet(cols)
+        within_bits = within.bits if within is not None else self.space.full
+        table = {}
+        for row, row_bitmap in row_index.items():
+            row_bits = row_bitmap.bits & within_bits
+            if not row_bits:
+                continue
+            counts = {}
+            for col, col_bitmap in col_index.items():
+                n = popcount(row_bits & col_bitmap.bits)
+                if n:
+                    counts[col] = n
+            if counts:
+                table[row] = counts
+        return table
+
+    def counts(self, facet, within=None):
+        """``{value: count}`` of the senses by one facet."""
+        within_bits = within.bits if within is not None else self.space.full
+        counts = ((key, popcount(bitmap.bits & within_bits))
+                  for key, bitmap in self._facet(facet).items())
+        return {key: n for key, n in counts if n}
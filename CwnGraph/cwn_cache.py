@@ -0,0 +1,143 @@
+import sys
+import copy
+import time
+import inspect
+import functools
+import threading
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """Rough resident size of a cached query result, in bytes.
+
+    Only the container and a sample of its items are measured, so the
+    cost stays small for results with thousands of items.
+    """
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)) and value:
+        sample = [x for _, x in zip(range(8), value)]
+        item_size = sum(sys.getsizeof(getattr(x, "__dict__", x))
+                        for x in sample) / len(sample)
+        size += int(item_size * len(value))
+    return size
+
+
+class QueryCache:
+    """LRU cache of query results with optional size, memory and TTL bounds.
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        maximum number of entries, by default 4096
+    max_bytes : int, optional
+        maximum estimated size of all entries, by default unbounded
+    ttl : float, optional
+        seconds before an entry expires, by default never
+    """
+    def __init__(self, maxsize=4096, max_bytes=None, ttl=None):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.total_bytes = 0
+        self.graph_version = None
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return "<QueryCache: {hits} hits, {misses} misses, {n_entries} entries>".format(
+            **self.info())
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, graph_version):
+        """Return ``(True, value)`` on a hit, or ``(False, None)``."""
+        with self._lock:
+            if graph_version != self.graph_version:
+                self._clear()
+                self.graph_version = graph_version
+            entry = self._data.get(key)
+            if entry is not None and entry[2] is not None \
+                    and entry[2] < time.monotonic():
+                self._pop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def put(self, key, value, graph_version):
+        size = estimate_size(value)
+        expire = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            if graph_version != self.graph_version:
+                # the graph changed while computing value
+                return
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, size, expire)
+            self.total_bytes += size
+            while self._data and (
+                    len(self._data) > self.maxsize or
+                    (self.max_bytes and self.total_bytes > self.max_bytes)):
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def info(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions,
+                "n_entries": len(self._data),
+                "total_bytes": self.total_bytes}
+
+    def _pop(self, key):
+        entry = self._data.pop(key)
+        self.total_bytes -= entry[1]
+
+    def _clear(self):
+        self._data.clear()
+        self.total_bytes = 0
+
+
+def cached_query(method):
+    """Cache the results of a ``CwnGraphUtils`` query method, when the
+    instance has a query cache enabled.
+
+    Arguments are normalized against the method signature, so positional,
+    keyword and default arguments map to the same cache entry.
+    """
+    signature = inspect.signature(method)
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = self._query_cache
+        if cache is None:
+            return method(self, *args, **kwargs)
+
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        key = (name,) + tuple(bound.arguments.values())[1:]
+        try:
+            hash(key)
+        except TypeError:
+            return method(self, *args, **kwargs)
+
+        graph_version = self.graph_version()
+        is_hit, ret = cache.get(key, graph_version)
+        if self._metrics is not None:
+            self._metrics.record_cache(name, is_hit)
+        if not is_hit:
+            ret = method(self, *args, **kwargs)
+            cache.put(key, ret, graph_version)
+        # callers may modify the returned list or set
+        return copy.copy(ret)
+    return wrapper
@@ -0,0 +1,191 @@
+"""Consistency checks of an image, streamed as ``SuggestionData``.
+
+Each check makes one pass over the edge indexes and yields
+``(CwnCheckerSuggestion, payload)`` tuples:
+
+``inverse``, for each semantic edge ``src -> tgt`` whose relation has an
+inverse (``CwnRelationType.inverse()``), links to PWN synsets aside:
+
+* ``INVERSE_NOT_EXISTS``, ``(src, tgt, edge_type, inverse_type)``: there
+  is no edge ``tgt -> src``
+* ``INVERSE_ERROR``, ``(src, tgt, edge_type, found_type)``: the edge
+  ``tgt -> src`` is not of the inverse type
+
+``synset``, for each synset and each ``synonym`` edge, links to PWN
+synsets aside:
+
+* ``SYN_NO_SENSE``, ``synset_id``: no sense is in the synset
+* ``SYN_MISSING_REL``, ``(synset_id, sense_id, sense_id)``: two senses of
+  the synset are not linked by a ``synonym`` edge
+* ``MISSING_SYNSET``, ``(sense_id, synset_id)``: the sense is a synonym
+  of a sense of ``synset_id``, but in no synset itself
+* ``NO_SYNSET``, ``(sense_id, sense_id)``: synonyms in no synset
+* ``SYN_REL_DIFF``, ``(sense_id, sense_id, synset_id, synset_id)``:
+  synonyms in different synsets
+
+Work is cut into chunks of node ids, which can run in worker processes
+(see :mod:`CwnGraph.cwn_pool`).
+"""
+from itertools import islice
+from .cwn_types import csg
+from .cwn_types.cwn_relation_types import INVERSE_RELATIONS
+from . import cwn_pool
+
+INVERSE_NAMES = {k.name: v.name for k, v in INVERSE_RELATIONS.items()}
+CHECKS = ("inverse", "synset")
+
+
+def check_inverse(cgu, node_ids):
+    """Check the edges leaving ``node_ids`` against their inverse."""
+    V = cgu.V
+    E = cgu.E
+    edge_src_index = cgu.edge_src_index
+    for node_id in node_ids:
+        if V.get(node_id, {}).get("node_type") == "pwn_synset":
+            continue
+        for src, tgt in edge_src_index.get(node_id, ()):
+            edge_type = E[(src, tgt)].get("edge_type")
+            inverse_type = INVERSE_NAMES.get(edge_type)
+            if inverse_type is None:
+                continue
+            if V.get(tgt, {}).get("node_type") == "pwn_synset":
+                # PWN synsets carry no inverse links back to CWN
+                continue
+            back = E.get((tgt, src))
+            if back is None:
+                yield (csg.INVERSE_NOT_EXISTS, (src, tgt, edge_type, inverse_type))
+            elif back.get("edge_type") != inverse_type:
+                yield (csg.INVERSE_ERROR, (src, tgt, edge_type, back.get("edge_type")))
+
+
+def synset_members(cgu, synset_id):
+    E = cgu.E
+    return [src for src, tgt in cgu.edge_tgt_index.get(synset_id, ())
+            if E[(src, tgt)].get("edge_type") == "is_synset"]
+
+
+def sense_synset(cgu, sense_id):
+    E = cgu.E
+    for src, tgt in cgu.edge_src_index.get(sense_id, ()):
+        if E[(src, tgt)].get("edge_type") == "is_synset":
+            return tgt
+    return None
+
+
+def synonym_neighbors(cgu, sense_id):
+    """Ids of the senses linked to ``sense_id`` by a ``synonym`` edge,
+    in either direction."""
+    E = cgu.E
+    ret = {tgt for src, tgt in cgu.edge_src_index.get(sense_id, ())
+           if E[(src, tgt)].get("edge_type") == "synonym"}
+    ret.update(src for src, tgt in cgu.edge_tgt_index.get(sense_id, ())
+               if E[(src, tgt)].get("edge_type") == "synonym")
+    return ret
+
+
+def check_synsets(cgu, synset_ids):
+    """Check the membership of ``synset_ids``."""
+    for synset_id in synset_ids:
+        members = synset_members(cgu, synset_id)
+        if not members:
+            yield (csg.SYN_NO_SENSE, synset_id)
+            continue
+        # each member's synonym edges against the members after it:
+        # linear in the edges unless pairs are missing
+        rank = {x: i for i, x in enumerate(members)}
+        for i, sense_a in enumerate(members):
+            linked = {rank[x] for x in synonym_neighbors(cgu, sense_a)
+                      if rank.get(x, -1) > i}
+            if len(linked) == len(members) - i - 1:
+                continue
+            for j in range(i + 1, len(members)):
+                if j not in linked:
+                    yield (csg.SYN_MISSING_REL, (synset_id, sense_a, members[j]))
+
+
+def check_synonyms(cgu, node_ids):
+    """Check that the ``synonym`` edges leaving ``node_ids`` link senses
+    of the same synset. A pair linked both ways is checked once, on the
+    edge from its smaller id."""
+    V = cgu.V
+    E = cgu.E
+    edge_src_index = cgu.edge_src_index
+    for node_id in node_ids:
+        if V.get(node_id, {}).get("node_type") == "pwn_synset":
+            continue
+        synset_a = None
+        for src, tgt in edge_src_index.get(node_id, ()):
+            if E[(src, tgt)].get("edge_type") != "synonym":
+                continue
+            if V.get(tgt, {}).get("node_type") == "pwn_synset":
+                # links to PWN, not CWN synonymy
+                continue
+            if tgt < src:
+                back = E.get((tgt, src))
+                if back is not None and back.get("edge_type") == "synonym":
+                    continue
+            if synset_a is None:
+                synset_a = sense_synset(cgu, src) or ""
+            synset_b = sense_synset(cgu, tgt)
+            if not synset_a and not synset_b:
+                yield (csg.NO_SYNSET, (src, tgt))
+            elif not synset_a:
+                yield (csg.MISSING_SYNSET, (src, synset_b))
+            elif not synset_b:
+                yield (csg.MISSING_SYNSET, (tgt, synset_a))
+            elif synset_a != synset_b:
+                yield (csg.SYN_REL_DIFF, (src, tgt, synset_a, synset_b))
+
+
+CHECK_FUNCS = {
+    "inverse": check_inverse,
+    "synset": check_synsets,
+    "synonym": check_synonyms}
+
+
+def run_check(cgu, check, node_ids):
+    """Run one check on a chunk of node ids, as a list of suggestions."""
+    return list(CHECK_FUNCS[check](cgu, node_ids))
+
+
+def iter_jobs(cgu, checks, chunksize):
+    for check in checks:
+        if check == "inverse":
+            jobs = [("inverse", cgu.edge_src_index)]
+        elif check == "synset":
+            jobs = [("synset", cgu.node_ids("synset")),
+                    ("synonym", cgu.edge_src_index)]
+        else:
+            raise ValueError(f"unknown check: {check}")
+        for name, node_ids in jobs:
+            node_iter = iter(node_ids)
+            while True:
+                chunk = list(islice(node_iter, chunksize))
+                if not chunk:
+                    break
+                yield (run_check, (name, chunk))
+
+
+def check_graph(cgu, checks=CHECKS, workers=None, chunksize=4096):
+    """Run ``checks`` on ``cgu``, see :mod:`CwnGraph.cwn_checker`.
+
+    Parameters
+    ----------
+    cgu : CwnGraphUtils
+    checks : tuple, optional
+        ``"inverse"`` and/or ``"synset"``, by default both
+    workers : int, optional
+        number of worker processes; by default the checks run in this
+        process
+    chunksize : int, optional
+        number of nodes checked by a job, by default 4096
+
+    Returns
+    -------
+    generator
+        ``SuggestionData`` tuples, in the same order whatever ``workers``
+    """
+    jobs = iter_jobs(cgu, checks, chunksize)
+    for suggestions in cwn_pool.map_queries(cgu, jobs,
+                                            workers=workers or 1, chunksize=1):
+        yield from suggestions
@@ -0,0 +1,204 @@
+from array import array
+from collections import deque
+from .cwn_types import relation_flags
+
+# node and edge type codes are signed 16-bit integers (numpy int16),
+# -1 and -2 are kept for unknown types
+TYPE_CODE = "h"
+MAX_TYPES = 2**15 - 1
+
+
+class IntGraph:
+    """Dense integer representation of a graph's structure.
+
+    Node ids are interned to ``0..n-1`` in the order of ``V``; node types
+    and edge types are interned to small integer codes. Adjacency is
+    stored in CSR form (offsets + neighbour arrays), for outgoing and
+    incoming edges, each in the order of ``E``, so traversals visit
+    edges in the same order as ``CwnGraphUtils.find_edges``.
+
+    The string ids remain the public interface: ``index`` maps an id to
+    its integer, ``ids`` maps it back.
+    """
+
+    def __init__(self, V, E, graph_version=None):
+        self.graph_version = graph_version
+        self.ids = list(V.keys())
+        self.index = {nid: i for i, nid in enumerate(self.ids)}
+
+        self.node_type_names = []
+        node_type_codes = {}
+        self.node_types = array(TYPE_CODE)
+        for ndata in V.values():
+            ntype = ndata.get("node_type")
+            code = node_type_codes.get(ntype)
+            if code is None:
+                code = node_type_codes[ntype] = new_type_code(
+                    self.node_type_names, ntype, "node")
+            self.node_types.append(code)
+        self.node_type_codes = node_type_codes
+
+        self.edge_type_names = []
+        edge_type_codes = {}
+        index = self.index
+        src_list = array("i")
+        tgt_list = array("i")
+        etype_list = array(TYPE_CODE)
+        for (src, tgt), edata in E.items():
+            etype = edata.get("edge_type", "generic")
+            code = edge_type_codes.get(etype)
+            if code is None:
+                code = edge_type_codes[etype] = new_type_code(
+                    self.edge_type_names, etype, "edge")
+            src_list.append(self._intern(src))
+            tgt_list.append(self._intern(tgt))
+            etype_list.append(code)
+        self.edge_type_codes = edge_type_codes
+        # relation category bits of each edge type code
+        self.edge_type_flags = array("b", map(relation_flags, self.edge_type_names))
+        self.n_edges = len(etype_list)
+
+        self.out_offsets, self.out_targets, self.out_types = \
+            self._build_csr(src_list, tgt_list, etype_list)
+        self.in_offsets, self.in_sources, self.in_types = \
+            self._build_csr(tgt_list, src_list, etype_list)
+
+    def __repr__(self):
+        return f"<IntGraph: {len(self.ids)} nodes, {self.n_edges} edges>"
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _intern(self, nid):
+        # edges pointing outside V still get an integer id
+        idx = self.index.get(nid)
+        if idx is None:
+            idx = self.index[nid] = len(self.ids)
+            self.ids.append(nid)
+            self.node_types.append(-1)
+        return idx
+
+    def _build_csr(self, keys, values, etypes):
+        n_nodes = len(self.ids)
+        offsets = array("i", [0]) * (n_nodes + 1)
+        for k in keys:
+            offsets[k + 1] += 1
+        for i in range(n_nodes):
+            offsets[i + 1] += offsets[i]
+        cursor = array("i", offsets)
+        neighbours = array("i", [0]) * len(keys)
+        neighbour_types = array(TYPE_CODE, [0]) * len(keys)
+        for k, v, t in zip(keys, values, etypes):
+            pos = cursor[k]
+            neighbours[pos] = v
+            neighbour_types[pos] = t
+            cursor[k] = pos + 1
+        return offsets, neighbours, neighbour_types
+
+    def node_type_code(self, node_type):
+        return self.node_type_codes.get(node_type, -2)
+
+    def neighbours(self, x, is_directed=True):
+        """Yield ``(neighbour, edge_type_code)`` of node ``x``, outgoing
+        edges first, then incoming ones when ``is_directed`` is False."""
+        for k in range(self.out_offsets[x], self.out_offsets[x+1]):
+            yield self.out_targets[k], self.out_types[k]
+        if not is_directed:
+            for k in range(self.in_offsets[x], self.in_offsets[x+1]):
+                yield self.in_sources[k], self.in_types[k]
+
+    def count_edges(self, nodes, is_directed=True):
+        out_offsets = self.out_offsets
+        in_offsets = self.in_offsets
+        n_edges = 0
+        for x in nodes:
+            n_edges += out_offsets[x+1] - out_offsets[x]
+            if not is_directed:
+                n_edges += in_offsets[x+1] - in_offsets[x]
+        return n_edges
+
+    def connected(self, x, is_directed, max_conn, max_depth, lemma_guard,
+            relation_mask, include_facets):
+        """Integer version of ``CwnGraphUtils.connected``, following the
+        edges whose type flags intersect ``relation_mask``.
+
+        Returns
+        -------
+        tuple
+            the connected node integers (a set) and the visited ones
+        """
+        node_types = self.node_types
+        edge_type_flags = self.edge_type_flags
+        facet_code = self.node_type_code("facet")
+        lemma_code = self.node_type_code("lemma")
+        if include_facets:
+            facet_code = -2
+        if not lemma_guard:
+            lemma_code = -2
+
+        ret = {x}
+        visited = set()
+        buf = [(x, 0)]
+        while buf:
+            node_x, depth = buf.pop()
+            if node_x in visited:
+                continue
+
+            explore = max_depth > 0 and depth < max_depth
+            for conn_x, etype in self.neighbours(node_x, is_directed):
+                ntype = node_types[conn_x]
+                if ntype == facet_code:
+                    continue
+                if not edge_type_flags[etype] & relation_mask:
+                    continue
+                ret.add(conn_x)
+                if explore and ntype != lemma_code:
+                    buf.append((conn_x, depth+1))
+            visited.add(node_x)
+            if max_conn and len(ret) > max_conn:
+                break
+        return ret, visited
+
+    def shortest_path(self, src, tgt, is_directed=True):
+        """Breadth-first search from ``src`` to ``tgt``.
+
+        Returns
+        -------
+        tuple
+            the path as a list of node integers (empty if not found),
+            and the visited nodes
+        """
+        buf = deque([(src, 0)])
+        backtrace = {}
+        visited = set()
+        is_found = False
+        while buf and not is_found:
+            nid, depth = buf.popleft()
+            if nid in visited:
+                continue
+            for conn_x, _ in self.neighbours(nid, is_directed):
+                if conn_x not in backtrace:
+                    # BFS discovers every node at its minimal depth first
+                    backtrace[conn_x] = nid
+                    buf.append((conn_x, depth+1))
+                if conn_x == tgt:
+                    is_found = True
+                    break
+            visited.add(nid)
+
+        trace = []
+        if is_found:
+            nid = tgt
+            trace.append(tgt)
+            while nid != src:
+                nid = backtrace[nid]
+                trace.append(nid)
+            trace = trace[::-1]
+        return trace, visited
+
+
+def new_type_code(type_names, type_name, kind):
+    if len(type_names) >= MAX_TYPES:
+        raise ValueError(f"more than {MAX_TYPES} {kind} types")
+    type_names.append(type_name)
+    return len(type_names) - 1
@@ -0,0 +1,230 @@
+"""Sense embeddings stored next to an image, with a CPU-only ANN index.
+
+An embedding file pair ``<prefix>.emb.npy`` / ``<prefix>.emb.json``
+holds a float32 matrix and the sense (or synset) id of each row, plus
+the hash of the image it was computed from. The matrix is memory-mapped
+on load. Requires numpy.
+"""
+import json
+from pathlib import Path
+import numpy as np
+
+
+def embedding_paths(prefix):
+    prefix = str(prefix)
+    return Path(prefix + ".emb.npy"), Path(prefix + ".emb.json")
+
+
+class SenseEmbeddings:
+    """A float32 embedding matrix aligned to node ids.
+
+    Parameters
+    ----------
+    ids : list
+        sense or synset id of each row
+    vectors : numpy.ndarray
+        ``(len(ids), dim)`` matrix, possibly memory-mapped
+    meta : dict, optional
+        e.g. ``graph_hash`` of the image and the ``model`` name
+    """
+    def __init__(self, ids, vectors, meta=None):
+        if len(ids) != len(vectors):
+            raise ValueError("ids and vectors have different lengths")
+        self.ids = list(ids)
+        self.vectors = vectors
+        self.meta = dict(meta or {})
+        self.index = {nid: i for i, nid in enumerate(self.ids)}
+        self._norms = None
+        self._ann = None
+
+    def __repr__(self):
+        return f"<SenseEmbeddings: {len(self.ids)} x {self.dim}>"
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    @classmethod
+    def from_encoder(cls, cgu, encode, batch_size=256, model=""):
+        """Embed the definition of every sense with ``encode``.
+
+        Parameters
+        ----------
+        cgu : CwnGraphUtils
+        encode : callable
+            maps a list of strings to a ``(n, dim)`` array
+        batch_size : int, optional
+            number of definitions per ``encode`` call, by default 256
+        model : str, optional
+            name of the encoder, stored in ``meta``
+        """
+        table = cgu.sense_table(columns=["id", "definition"], output="dict")
+        definitions = table["definition"]
+        batches = [np.asarray(encode(definitions[i:i+batch_size]), dtype=np.float32)
+                   for i in range(0, len(definitions), batch_size)]
+        vectors = np.concatenate(batches) if batches else np.zeros((0, 0), np.float32)
+        return cls(table["id"], vectors,
+                   {"graph_hash": cgu.get_hash(), "model": model})
+
+    def save(self, prefix):
+        """Write ``<prefix>.emb.npy`` and ``<prefix>.emb.json``."""
+        npy_path, json_path = embedding_paths(prefix)
+        np.save(npy_path, np.asarray(self.vectors, dtype=np.float32))
+        with json_path.open("w", encoding="UTF-8") as fout:
+            json.dump({**self.meta, "ids": self.ids}, fout, ensure_ascii=False)
+        return npy_path
+
+    @classmethod
+    def load(cls, prefix, mmap=True):
+        """Load ``<prefix>.emb.npy``, memory-mapped unless ``mmap`` is False."""
+        npy_path, json_path = embedding_paths(prefix)
+        with json_path.open("r", encoding="UTF-8") as fin:
+            meta = json.load(fin)
+        ids = meta.pop("ids")
+        vectors = np.load(npy_path, mmap_mode="r" if mmap else None)
+        return cls(ids, vectors, meta)
+
+    @property
+    def norms(self):
+        norms = self._norms
+        if norms is None:
+            norms = np.empty(len(self.ids), dtype=np.float32)
+            for start, block in iter_blocks(self.vectors):
+                norms[start:start+len(block)] = np.linalg.norm(block, axis=1)
+            norms[norms == 0] = 1
+            self._norms = norms
+        return norms
+
+    def rows(self, node_ids):
+        """Row numbers of the ``node_ids`` having a vector."""
+        index = self.index
+        return np.array([index[x] for x in node_ids if x in index], dtype=np.int64)
+
+    def score(self, query, rows):
+        """Cosine similarity of ``query`` with the vectors of ``rows``."""
+        query = normalize(query)
+        return (self.vectors[rows] @ query) / self.norms[rows]
+
+    def build_index(self, n_lists=None, n_iter=10, seed=0):
+        """Build the :class:`IVFIndex` used by :meth:`search`."""
+        ann = IVFIndex(self.vectors, self.norms, n_lists, n_iter, seed)
+        self._ann = ann
+        return ann
+
+    def search(self, query, k=10, rows=None, mask=None, n_probe=8,
+               exact_threshold=4096):
+        """Top ``k`` rows by cosine similarity.
+
+        Candidates are restricted to ``rows`` (row numbers) or ``mask``
+        (a boolean array over all rows). At most ``exact_threshold``
+        candidates are scored exactly; otherwise the IVF index is
+        probed, and built on first use.
+
+        Returns
+        -------
+        tuple
+            row numbers and their scores, best first
+        """
+        if rows is None:
+            n_candidates = len(self.ids) if mask is None else int(mask.sum())
+        else:
+            n_candidates = len(rows)
+
+        if n_candidates <= exact_threshold:
+            if rows is None:
+                rows = np.arange(len(self.ids)) if mask is None \
+                    else np.flatnonzero(mask)
+            return top_k(rows, self.score(query, rows), k)
+
+        if rows is not None:
+            mask = np.zeros(len(self.ids), dtype=bool)
+            mask[rows] = True
+        ann = self._ann or self.build_index()
+        return ann.search(query, k, n_probe, mask)
+
+
+class IVFIndex:
+    """Inverted-file index with spherical k-means, in pure NumPy.
+
+    Vectors are assigned to the closest of ``n_lists`` centroids; a query
+    only scores the vectors of its ``n_probe`` closest lists.
+
+    Parameters
+    ----------
+    vectors : numpy.ndarray
+        ``(n, dim)`` matrix, read block by block
+    norms : numpy.ndarray
+        L2 norm of each row
+    n_lists : int, optional
+        number of lists, by default ``sqrt(n)``
+    n_iter : int, optional
+        k-means iterations, by default 10
+    seed : int, optional
+        random seed of the k-means initialization
+    """
+    def __init__(self, vectors, norms, n_lists=None, n_iter=10, seed=0,
+                 sample_size=50000):
+        n_vectors = len(vectors)
+        n_lists = n_lists or max(1, int(np.sqrt(n_vectors)))
+        rng = np.random.default_rng(seed)
+
+        # train the centroids on a sample
+        sample = np.sort(rng.choice(n_vectors, min(sample_size, n_vectors),
+                                    replace=False))
+        train = vectors[sample] / norms[sample, None]
+        centroids = train[rng.choice(len(train), min(n_lists, len(train)),
+                                     replace=False)]
+        for _ in range(n_iter):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            for c in range(len(centroids)):
+                members = train[assign == c]
+                if len(members):
+                    centroids[c] = normalize(members.sum(axis=0))
+
+        assign = np.empty(n_vectors, dtype=np.int64)
+        for start, block in iter_blocks(vectors):
+            assign[start:start+len(block)] = np.argmax(block @ centroids.T, axis=1)
+
+        self.vectors = vectors
+        self.norms = norms
+        self.centroids = centroids
+        self.order = np.argsort(assign, kind="stable")
+        self.offsets = np.searchsorted(assign[self.order],
+                                       np.arange(len(centroids) + 1))
+
+    def __repr__(self):
+        return f"<IVFIndex: {len(self.centroids)} lists>"
+
+    def search(self, query, k=10, n_probe=8, mask=None):
+        query = normalize(query)
+        n_probe = min(n_probe, len(self.centroids))
+        probes = np.argsort(-(self.centroids @ query))[:n_probe]
+        rows = np.concatenate([self.order[self.offsets[c]:self.offsets[c+1]]
+                               for c in probes])
+        if mask is not None:
+            rows = rows[mask[rows]]
+        rows = np.sort(rows)
+        scores = (self.vectors[rows] @ query) / self.norms[rows]
+        return top_k(rows, scores, k)
+
+
+def normalize(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def top_k(rows, scores, k):
+    if len(rows) > k:
+        best = np.argpartition(-scores, k)[:k]
+        rows, scores = rows[best], scores[best]
+    order = np.argsort(-scores, kind="stable")
+    return rows[order], scores[order]
+
+
+def iter_blocks(vectors, block_size=65536):
+    for start in range(0, len(vectors), block_size):
+        yield start, np.asarray(vectors[start:start+block_size])
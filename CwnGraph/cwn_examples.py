@@ -0,0 +1,138 @@
+"""Example sentences of all senses as flat records.
+
+CWN examples mark the target word with angle brackets, e.g.
+``"他<跑>得很快"``. :func:`parse_example` strips the markers and keeps
+their positions as character offsets in the clean text.
+"""
+import re
+from collections import namedtuple
+
+MARKER_RE = re.compile(r"[<>]")
+
+Example = namedtuple("Example", ["sense_id", "node_id", "text", "target_spans"])
+Example.__doc__ = """An example sentence of a sense.
+
+``node_id`` is the sense itself, or the facet the example comes from.
+``target_spans`` are the ``(start, end)`` offsets of the marked target
+words in ``text``, empty if the example has no marker.
+"""
+
+
+def parse_example(example):
+    """Strip the ``<...>`` markers of an example sentence.
+
+    Unbalanced ``<`` and ``>`` are dropped without a span.
+
+    Returns
+    -------
+    tuple
+        the clean text and a tuple of ``(start, end)`` target spans
+    """
+    if "<" not in example and ">" not in example:
+        return example.strip(), ()
+
+    chunks = []
+    spans = []
+    length = 0
+    start = None
+    pos = 0
+    for match in MARKER_RE.finditer(example):
+        chunk = example[pos:match.start()]
+        chunks.append(chunk)
+        length += len(chunk)
+        if match.group() == "<":
+            start = length
+        else:
+            if start is not None and start < length:
+                spans.append((start, length))
+            start = None
+        pos = match.end()
+    chunks.append(example[pos:])
+
+    text = "".join(chunks)
+    stripped = text.strip()
+    if stripped != text:
+        # keep offsets valid after stripping leading whitespace
+        shift = len(text) - len(text.lstrip())
+        text = stripped
+        spans = [(max(s - shift, 0), min(e - shift, len(text)))
+                 for s, e in spans]
+        spans = [(s, e) for s, e in spans if s < e]
+    return text, tuple(spans)
+
+
+def strip_markers(example):
+    """Remove all ``<`` and ``>`` from an example sentence."""
+    return example.replace("<", "").replace(">", "")
+
+
+def iter_examples(cgu, include_facets=True, dedup="sense", batch_size=None):
+    """Yield the examples of all senses as :class:`Example` records.
+
+    Senses are visited in ``V`` order through ``cgu.node_type_index``;
+    facet examples follow the examples of their sense.
+
+    Parameters
+    ----------
+    cgu : CwnGraphUtils
+    include_facets : bool, optional
+        also yield the examples of sense facets, by default True
+    dedup : str, optional
+        ``"sense"`` drops repeated texts within a sense (and its facets),
+        ``"global"`` drops texts already yielded for any sense, ``None``
+        keeps every example; by default ``"sense"``
+    batch_size : int, optional
+        if given, yield lists of up to ``batch_size`` records instead
+
+    Returns
+    -------
+    generator
+    """
+    if dedup not in ("sense", "global", None):
+        raise ValueError(f"unknown dedup: {dedup}")
+    records = _iter_examples(cgu, include_facets, dedup)
+    if batch_size is None:
+        return records
+    return batched(records, batch_size)
+
+
+def _iter_examples(cgu, include_facets, dedup):
+    V = cgu.V
+    E = cgu.E
+    edge_src_index = cgu.edge_src_index
+    seen = set()
+    for sense_id in cgu.node_ids("sense"):
+        node_ids = [sense_id]
+        if include_facets:
+            node_ids.extend(tgt for src, tgt in edge_src_index.get(sense_id, ())
+                            if E[(src, tgt)].get("edge_type") == "has_facet")
+        if dedup == "sense":
+            seen = set()
+
+        for node_id in node_ids:
+            for example in V.get(node_id, {}).get("examples", []):
+                if not example:
+                    continue
+                text, spans = parse_example(example)
+                if not text:
+                    continue
+                if dedup is not None:
+                    if text in seen:
+                        continue
+                    seen.add(text)
+                yield Example(sense_id, node_id, text, spans)
+
+
+def batched(iterable, batch_size):
+    """Yield lists of ``batch_size`` items of ``iterable``, the last one
+    possibly shorter."""
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,399 @@
+"""Downloading images into the cache, safely for concurrent processes.
+
+``fetch_image`` downloads the image of a manifest entry into the cache
+directory:
+
+* a lock file (``<file>.lock``) lets one process download while the
+  others wait, then use its result;
+* the download goes to ``<file>.part``, kept if interrupted: the next
+  attempt resumes it with a ranged request, and starts over once if the
+  resumed file turns out corrupted;
+* the file is checked against the ``size`` and ``sha256`` of the entry,
+  when given, and only then renamed into place, atomically.
+
+Images come from a list of sources, tried in order: Google Drive (the
+``drive_id`` of the entry), an HTTP mirror, or a local directory,
+holding the files under their ``file`` name. The sources default to the
+``CWN_GRAPH_SOURCES`` environment variable, a comma-separated list of
+``gdrive``, URLs and directories, e.g. ``http://mirror.local/cwn,gdrive``.
+
+``serve_mirror`` serves a directory over HTTP, with ranged requests, as
+a local stand-in for a mirror.
+
+Examples
+--------
+>>> with serve_mirror("/data/cwn-images") as mirror:
+...     fetch_image(info, sources=[HttpMirrorSource(mirror.url)])
+"""
+import os
+import time
+import shutil
+import threading
+from pathlib import Path
+from functools import partial
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from .cwn_imagefile import CwnImageIntegrityError, file_sha256
+
+BLOCK_SIZE = 2**20
+
+
+class FileLock:
+    """An exclusive lock on ``path``, held by one process at a time and
+    released by the system if that process dies.
+
+    Parameters
+    ----------
+    path : str or Path
+        the lock file, created if needed
+    timeout : float, optional
+        seconds to wait for the lock before raising ``TimeoutError``, by
+        default forever
+    poll : float, optional
+        seconds between attempts, by default 0.1
+    """
+    def __init__(self, path, timeout=None, poll=0.1):
+        self.path = str(path)
+        self.timeout = timeout
+        self.poll = poll
+        self.fd = None
+
+    def try_lock(self, fd):
+        try:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except ImportError:
+            import msvcrt
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+
+    def unlock(self, fd):
+        try:
+            import fcntl
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        except ImportError:
+            import msvcrt
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        start = time.monotonic()
+        waiting = False
+        while True:
+            try:
+                self.try_lock(fd)
+                break
+            except OSError:
+                if self.timeout is not None and \
+                   time.monotonic() - start > self.timeout:
+                    os.close(fd)
+                    raise TimeoutError(f"cannot lock {self.path}")
+                if not waiting:
+                    print("waiting for another process:", self.path)
+                    waiting = True
+                time.sleep(self.poll)
+        self.fd = fd
+
+    def release(self):
+        fd, self.fd = self.fd, None
+        if fd is not None:
+            self.unlock(fd)
+            os.close(fd)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class ImageSource:
+    """Where images are downloaded from. ``fetch`` completes the
+    partial file ``part_path`` (possibly empty or missing) with the
+    image of the manifest entry ``img_info``."""
+    def fetch(self, img_info, part_path):
+        raise NotImplementedError()
+
+
+class GoogleDriveSource(ImageSource):
+    """The Google Drive file ``drive_id`` of the entry, through gdown."""
+    def __repr__(self):
+        return "<GoogleDriveSource>"
+
+    def fetch(self, img_info, part_path):
+        import gdown
+        if "drive_id" not in img_info:
+            raise ValueError(f"{img_info.get('file')} has no drive_id")
+        # gdown skips the download if its output exists, and resumes its
+        # own partial files: give it an output of its own rather than a
+        # part file another source may have left incomplete
+        output = part_path.with_name(img_info["file"] + ".gdown")
+        gdown.download(id=img_info["drive_id"], output=str(output),
+                       quiet=False, resume=True)
+        os.replace(output, part_path)
+
+
+class HttpMirrorSource(ImageSource):
+    """``<base_url>/<file>``, resumed with ranged requests."""
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"<HttpMirrorSource: {self.base_url}>"
+
+    def fetch(self, img_info, part_path):
+        import requests
+        url = f"{self.base_url}/{img_info['file']}"
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with requests.get(url, headers=headers, stream=True,
+                          timeout=self.timeout) as resp:
+            size = response_size(resp)
+            if resp.status_code == 416:
+                # nothing left after offset: the part file is complete,
+                # or longer than the image
+                check_size(part_path, size)
+                return
+            resp.raise_for_status()
+            mode = "ab" if resp.status_code == 206 else "wb"
+            with part_path.open(mode) as fout:
+                for block in resp.iter_content(BLOCK_SIZE):
+                    fout.write(block)
+        # the manifest may have no size: check the one of the server
+        check_size(part_path, size)
+
+
+def response_size(resp):
+    """Size of the whole file served in ``resp``, from ``Content-Range``
+    (``bytes <start>-<end>/<size>`` or ``bytes */<size>``) or, for a
+    full response, ``Content-Length``; None if unknown."""
+    content_range = resp.headers.get("Content-Range", "")
+    total = content_range.rpartition("/")[2]
+    if total.isdigit():
+        return int(total)
+    length = resp.headers.get("Content-Length", "")
+    if resp.status_code == 200 and length.isdigit() and \
+       not resp.headers.get("Content-Encoding"):
+        return int(length)
+    return None
+
+
+def check_size(fpath, size):
+    """Raise ``IOError`` if ``fpath`` is shorter than ``size`` (to
+    resume), ``CwnImageIntegrityError`` if it is longer."""
+    if size is None:
+        return
+    file_size = fpath.stat().st_size if fpath.exists() else 0
+    if file_size < size:
+        raise IOError(f"{fpath}: incomplete, {file_size} of {size} bytes")
+    if file_size > size:
+        raise CwnImageIntegrityError(f"{fpath}: {file_size} bytes, expected {size}")
+
+
+class LocalDirSource(ImageSource):
+    """``<directory>/<file>``, e.g. a shared or mounted directory."""
+    def __init__(self, directory):
+        self.directory = Path(directory)
+
+    def __repr__(self):
+        return f"<LocalDirSource: {self.directory}>"
+
+    def fetch(self, img_info, part_path):
+        src_path = self.directory / img_info["file"]
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        if offset > src_path.stat().st_size:
+            offset = 0
+        with src_path.open("rb") as fin, \
+             part_path.open("r+b" if offset else "wb") as fout:
+            fin.seek(offset)
+            fout.seek(offset)
+            shutil.copyfileobj(fin, fout, BLOCK_SIZE)
+            fout.truncate()
+        check_size(part_path, src_path.stat().st_size)
+
+
+def parse_sources(spec):
+    """Sources from a comma-separated list of ``gdrive``, URLs and
+    directories."""
+    sources = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if item == "gdrive":
+            sources.append(GoogleDriveSource())
+        elif item.startswith(("http://", "https://")):
+            sources.append(HttpMirrorSource(item))
+        else:
+            sources.append(LocalDirSource(item))
+    return sources
+
+
+def get_sources():
+    """The sources in ``CWN_GRAPH_SOURCES``, by default Google Drive."""
+    return parse_sources(os.environ.get("CWN_GRAPH_SOURCES", "gdrive"))
+
+
+def check_file(fpath, img_info):
+    """Raise ``CwnImageIntegrityError`` if ``fpath`` does not match the
+    ``size`` or ``sha256`` of ``img_info``, ``IOError`` if it is only
+    shorter (an interrupted download, to resume)."""
+    check_size(fpath, img_info.get("size"))
+    sha256 = img_info.get("sha256")
+    if sha256 is not None and file_sha256(fpath) != sha256:
+        raise CwnImageIntegrityError(f"{fpath}: SHA-256 does not match {sha256}")
+
+
+def fetch_image(img_info, cache_dir, sources=None, lock_timeout=None):
+    """Download the image of ``img_info`` into ``cache_dir``, unless it
+    is already there, see :mod:`CwnGraph.cwn_fetch`.
+
+    Parameters
+    ----------
+    img_info : dict
+        a manifest entry: ``file``, and ``drive_id``, ``size``,
+        ``sha256`` if known
+    cache_dir : str or Path
+    sources : list, optional
+        :class:`ImageSource` objects tried in order, by default
+        ``get_sources()``
+    lock_timeout : float, optional
+        seconds to wait for another process downloading the same image
+
+    Returns
+    -------
+    Path
+        the image in the cache
+    """
+    cache_dir = Path(cache_dir)
+    img_path = cache_dir / img_info["file"]
+    if img_path.exists():
+        return img_path
+    if sources is None:
+        sources = get_sources()
+
+    part_path = cache_dir / (img_info["file"] + ".part")
+    lock_path = cache_dir / (img_info["file"] + ".lock")
+    with FileLock(lock_path, timeout=lock_timeout):
+        if img_path.exists():
+            # downloaded by another process while we waited
+            return img_path
+        errors = []
+        for source in sources:
+            print(f"downloading image {img_info['file']} from {source!r}...")
+            # a download resuming a corrupted part file fails its check:
+            # the source is then tried once more, from offset 0
+            n_tries = 2 if part_path.exists() else 1
+            for _ in range(n_tries):
+                try:
+                    source.fetch(img_info, part_path)
+                    check_file(part_path, img_info)
+                except CwnImageIntegrityError as ex:
+                    # no use resuming a corrupted file
+                    part_path.unlink(missing_ok=True)
+                    error = ex
+                    continue
+                except Exception as ex:
+                    # keep the part file, to resume from the next source
+                    error = ex
+                    break
+                os.replace(part_path, img_path)
+                print("image has downloaded: ", img_path)
+                return img_path
+            errors.append(f"{source!r}: {error}")
+    raise IOError(f"cannot download {img_info['file']}:\n  " + "\n  ".join(errors))
+
+
+class MirrorServer:
+    """A running ``serve_mirror`` server, stopped by ``close()`` or at
+    the end of a ``with`` block."""
+    def __init__(self, httpd):
+        self.httpd = httpd
+        host, port = httpd.server_address[:2]
+        self.url = f"http://{host}:{port}"
+        self.thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def __repr__(self):
+        return f"<MirrorServer: {self.url}>"
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def serve_mirror(directory, host="127.0.0.1", port=0):
+    """Serve the files of ``directory`` over HTTP, in a background
+    thread, with support for ``Range: bytes=<start>-[<end>]`` requests.
+
+    Parameters
+    ----------
+    directory : str or Path
+    host : str, optional
+        by default ``127.0.0.1``
+    port : int, optional
+        by default any free port
+
+    Returns
+    -------
+    MirrorServer
+        with the ``url`` to give to :class:`HttpMirrorSource`
+    """
+    handler = partial(RangeRequestHandler, directory=str(directory))
+    return MirrorServer(ThreadingHTTPServer((host, port), handler))
+
+
+class RangeRequestHandler(SimpleHTTPRequestHandler):
+    """Serves files, or the ``Range: bytes=<start>-[<end>]`` of a file."""
+    def log_message(self, format, *args):
+        pass
+
+    def send_head(self):
+        self.range_left = None
+        byte_range = self.headers.get("Range", "")
+        path = self.translate_path(self.path)
+        if not byte_range.startswith("bytes=") or not os.path.isfile(path):
+            return super().send_head()
+        size = os.path.getsize(path)
+        start, _, end = byte_range[len("bytes="):].partition("-")
+        try:
+            start = int(start)
+            end = min(int(end), size - 1) if end else size - 1
+        except ValueError:
+            self.send_error(HTTPStatus.BAD_REQUEST)
+            return None
+        if start >= size or start > end:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header("Content-Range", f"bytes */{size}")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return None
+        fin = open(path, "rb")
+        fin.seek(start)
+        self.send_response(HTTPStatus.PARTIAL_CONTENT)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.send_header("Content-Length", str(end - start + 1))
+        self.end_headers()
+        self.range_left = end - start + 1
+        return fin
+
+    def copyfile(self, source, outputfile):
+        left = self.range_left
+        if left is None:
+            return super().copyfile(source, outputfile)
+        while left > 0:
+            block = source.read(min(BLOCK_SIZE, left))
+            if not block:
+                break
+            outputfile.write(block)
+            left -= len(block)
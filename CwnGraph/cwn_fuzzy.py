@@ -0,0 +1,189 @@
+"""Fuzzy lemma lookup with bounded edit distance.
+
+:class:`LemmaMatcher` is a SymSpell-style deletion index: every lemma is
+indexed under all the strings obtained by deleting up to
+``max_distance`` characters, so a query only looks up its own deletions
+and verifies the few candidates found. Before indexing, characters are
+mapped to a canonical variant (e.g. 臺 -> 台), so variant spellings
+match at distance 0.
+"""
+import unicodedata
+from itertools import combinations
+
+VARIANT_EDGE_TYPES = ("varword", "variant")
+
+
+class LemmaMatcher:
+    """Deletion index over a set of lemma strings.
+
+    Parameters
+    ----------
+    lemmas : iterable
+        lemma strings
+    max_distance : int, optional
+        largest edit distance a query can ask for, by default 2
+    variants : dict or list, optional
+        character -> variant character pairs, applied in both directions
+    aliases : iterable, optional
+        ``(lemma, lemma)`` pairs of whole-word variants
+    """
+    def __init__(self, lemmas, max_distance=2, variants=None, aliases=None):
+        self.max_distance = max_distance
+        self.canonical = canonical_chars(variants or {})
+        self.forms = {}
+        self.deletes = {}
+        for lemma in lemmas:
+            form = self.normalize(lemma)
+            originals = self.forms.get(form)
+            if originals is None:
+                originals = self.forms[form] = []
+                for del_x in iter_deletes(form, max_distance):
+                    self.deletes.setdefault(del_x, []).append(form)
+            if lemma not in originals:
+                originals.append(lemma)
+
+        self.aliases = {}
+        for lemma_a, lemma_b in aliases or ():
+            form_a, form_b = self.normalize(lemma_a), self.normalize(lemma_b)
+            if form_a != form_b:
+                self.aliases.setdefault(form_a, set()).add(form_b)
+                self.aliases.setdefault(form_b, set()).add(form_a)
+
+    def __repr__(self):
+        return f"<LemmaMatcher: {len(self.forms)} forms, {len(self.deletes)} deletes>"
+
+    @classmethod
+    def from_graph(cls, cgu, max_distance=2, variants=None):
+        """Index the lemmas of ``cgu``. Variant tables are seeded from
+        its ``varword`` and ``variant`` edges, and extended by ``variants``:
+        linked lemmas differing by a single character substitution give a
+        character variant, other linked lemmas are whole-word aliases.
+        """
+        pairs = list(variant_pairs(cgu))
+        char_variants = dict(variants or {})
+        char_pairs = []
+        aliases = []
+        for lemma_a, lemma_b in pairs:
+            diff = set((a, b) for a, b in zip(lemma_a, lemma_b) if a != b)
+            if len(lemma_a) == len(lemma_b) and len(diff) == 1:
+                # e.g. 臺灣/台灣, 姊姊/姐姐: a character variant
+                char_pairs.extend(diff)
+            else:
+                aliases.append((lemma_a, lemma_b))
+        return cls(cgu.lemma_index.keys(), max_distance,
+                   variants=list(char_variants.items()) + char_pairs,
+                   aliases=aliases)
+
+    def normalize(self, word):
+        word = unicodedata.normalize("NFKC", word).strip()
+        canonical = self.canonical
+        return "".join(canonical.get(ch, ch) for ch in word)
+
+    def search(self, word, max_distance=1, limit=10):
+        """Lemmas within ``max_distance`` edits of ``word``. At least one
+        character of ``word`` must be kept, so the distance is also capped
+        at ``len(word) - 1``.
+
+        Returns
+        -------
+        list
+            ``(lemma, distance)`` pairs, by distance, then exact spelling
+            first, then by lemma
+        """
+        if max_distance > self.max_distance:
+            raise ValueError(f"max_distance is at most {self.max_distance} "
+                             "for this matcher")
+        query = self.normalize(word)
+        if not query:
+            return []
+        max_distance = min(max_distance, len(query) - 1)
+        found = {}
+        for del_x in iter_deletes(query, max_distance):
+            for form in self.deletes.get(del_x, ()):
+                if form in found:
+                    continue
+                dist = edit_distance(query, form, max_distance)
+                if dist <= max_distance:
+                    found[form] = dist
+        for form in self.aliases.get(query, ()):
+            found[form] = 0
+
+        ranked = sorted(((dist, lemma != word, lemma)
+                         for form, dist in found.items()
+                         for lemma in self.forms[form]))
+        return [(lemma, dist) for dist, _, lemma in ranked[:limit]]
+
+
+def canonical_chars(variants):
+    """Map each character to the smallest character of its variant group."""
+    if isinstance(variants, dict):
+        variants = variants.items()
+    parent = {}
+
+    def find(ch):
+        root = ch
+        while parent.get(root, root) != root:
+            root = parent[root]
+        parent[ch] = root
+        return root
+
+    for a, b in variants:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+    return {ch: find(ch) for ch in list(parent) if find(ch) != ch}
+
+
+def variant_pairs(cgu):
+    """Yield ``(lemma, lemma)`` string pairs linked by a variant edge.
+    A sense stands for its first lemma."""
+    V = cgu.V
+    E = cgu.E
+
+    def head_lemma(nid):
+        ndata = V.get(nid, {})
+        if ndata.get("node_type") == "lemma":
+            return ndata.get("lemma")
+        for src, tgt in cgu.edge_tgt_index.get(nid, ()):
+            if E[(src, tgt)].get("edge_type") == "has_sense":
+                return V.get(src, {}).get("lemma")
+        return None
+
+    for (src, tgt), edata in E.items():
+        if edata.get("edge_type") not in VARIANT_EDGE_TYPES:
+            continue
+        lemma_a, lemma_b = head_lemma(src), head_lemma(tgt)
+        if lemma_a and lemma_b and lemma_a != lemma_b:
+            yield lemma_a, lemma_b
+
+
+def iter_deletes(word, max_distance):
+    """Yield ``word`` and the non-empty strings made by deleting up to
+    ``max_distance`` of its characters, without repeats."""
+    seen = set()
+    for n_del in range(min(max_distance, len(word) - 1) + 1):
+        for positions in combinations(range(len(word)), len(word) - n_del):
+            del_x = "".join(word[i] for i in positions)
+            if del_x not in seen:
+                seen.add(del_x)
+                yield del_x
+
+
+def edit_distance(a, b, max_distance):
+    """Optimal string alignment distance of ``a`` and ``b`` (edits and
+    adjacent transpositions), or ``max_distance + 1`` once it is exceeded."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i-1] == b[j-1] else 1
+            cur[j] = min(prev[j] + 1, cur[j-1] + 1, prev[j-1] + cost)
+            if i > 1 and j > 1 and a[i-1] == b[j-2] and a[i-2] == b[j-1]:
+                cur[j] = min(cur[j], prev_prev[j-2] + 1)
+        if min(cur) > max_distance:
+            return max_distance + 1
+        prev_prev, prev = prev, cur
+    return prev[-1]
@@ -1,35 +1,463 @@
 import pdb
 import re
 from itertools import chain, groupby
+from collections import deque
+from collections.abc import Mapping
 from .cwn_types import *
+from .cwn_cache import QueryCache, cached_query
+from .cwn_metrics import Metrics, instrumented
+from .cwn_core import IntGraph
+from .cwn_examples import iter_examples
+from .cwn_fuzzy import LemmaMatcher
+from .cwn_automaton import LemmaAutomaton
+from .cwn_phonetic import PhoneticIndex
+from .cwn_query import SenseQuery
+from .cwn_bitmap import BitmapIndex, split_values
 
 
 class CwnGraphUtils(GraphStructure):
     """cwn data as graph (vertices and edges)
+
+    Concurrency
+    -----------
+    A ``CwnGraphUtils`` can be shared by many reader threads, as long as
+    nobody mutates it: query methods do not write to ``V`` or ``E``, and
+    index entries are read as tuples. The one write of a read is the
+    freezing of a :class:`PostingIndex` key changed by a mutation: its
+    first read stores the new tuple with a single item assignment, like
+    the lazily computed attributes below. The mutation methods
+    (``add_node``, ``update_node``, ``remove_node``, ``add_edge``,
+    ``remove_edge``, ``compact``) change ``V``, ``E`` and the indexes in
+    place, in several steps, and are not safe to run concurrently with
+    readers or with each other: serialize them with the reads (e.g. a
+    lock, or edit in an :class:`OverlayImage
+    <CwnGraph.cwn_overlay.OverlayImage>` and ``commit()`` while no query
+    runs). Lazily computed attributes (e.g. ``CwnLemma.senses``,
+    ``CwnSense.relations``, ``get_hash()``) are built into a local object
+    and published with a single attribute assignment, so a concurrent
+    reader sees either ``None`` (and computes the same value itself) or
+    the complete result, never a partially built one. This holds on
+    free-threaded CPython as well, since no invariant spans more than one
+    attribute store.
+
+    Traversals (``connected``, ``find_shortest_path``) run on ``core``, an
+    :class:`IntGraph <CwnGraph.cwn_core.IntGraph>` built on first use.
+    Subclasses whose ``V`` and ``E`` change in place can set
+    ``use_core = False`` to traverse through ``find_edges`` instead.
     """
+    use_core = True
+
+    # the derived caches kept across add_/update_/remove_ calls, unless
+    # the change touches one of their dependencies: "nodes" (the node set
+    # or a node type), "edges" (the edge set), a node type (data of the
+    # nodes of that type), "edge:<edge_type>" and "out:<node_type>" (the
+    # edges of a type, or from nodes of a type)
+    CACHE_DEPENDENCIES = {
+        "_core": {"nodes", "edges"},
+        "_sense_bitmaps": {"sense", "out:sense"},
+        "_lemma_matcher": {"lemma", "edge:varword", "edge:variant",
+                           "edge:has_sense"},
+        "_lemma_automaton": {"lemma"},
+        "_phonetic_index": {"lemma"},
+    }
 
     def __init__(self, V, E, meta={}):
         super(CwnGraphUtils, self).__init__()
         self.V = V
         self.E = E
         self.meta = meta
-        self.edge_src_index = self.build_index(E.keys(), lambda x: x[0])
-        self.edge_tgt_index = self.build_index(E.keys(), lambda x: x[1])
+        self._query_cache = None
+        self._metrics = None
+        self._core = None
+        self._node_type_index = None
+        self._lemma_index = None
+        self._lemma_matcher = None
+        self._lemma_automaton = None
+        self._phonetic_index = None
+        self._sense_bitmaps = None
+        self.edge_src_index, self.edge_tgt_index = self.build_edge_indexes()
+
+    def build_edge_indexes(self):
+        """The ``edge_src_index`` and ``edge_tgt_index`` of ``E``."""
+        E = self.E
+        return (self.build_index(E.keys(), lambda x: x[0]),
+                self.build_index(E.keys(), lambda x: x[1]))
 
     def build_index(self, data, keyfunc):
         idx = {}
         for k in data:
             idx_key = keyfunc(k)
             idx.setdefault(idx_key, []).append(k)
-        return idx
+        # freeze the postings, so the index can be shared across threads
+        return {idx_key: tuple(keys) for idx_key, keys in idx.items()}
+
+    def enable_query_cache(self, maxsize=4096, max_bytes=None, ttl=None):
+        """Cache the results of ``find_lemma``, ``find_all_senses``,
+        ``find_senses``, ``connected`` and ``find_shortest_path``.
+
+        The cache is emptied whenever the graph is mutated (see
+        ``invalidate_caches``). Cached lists and sets are copied before
+        being returned, the node objects inside are shared.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            maximum number of cached results, by default 4096
+        max_bytes : int, optional
+            maximum estimated memory of the cached results, by default unbounded
+        ttl : float, optional
+            seconds a result stays valid, by default forever
+
+        Returns
+        -------
+        QueryCache
+            the cache, with ``hits``/``misses``/``evictions`` counters
+        """
+        self._query_cache = QueryCache(maxsize, max_bytes, ttl)
+        return self._query_cache
+
+    def disable_query_cache(self):
+        self._query_cache = None
+
+    @property
+    def query_cache(self):
+        return self._query_cache
+
+    def enable_metrics(self, metrics=None, sinks=None):
+        """Record call counts, latencies and traversal sizes of the
+        query methods.
+
+        Parameters
+        ----------
+        metrics : Metrics, optional
+            an existing :class:`Metrics <CwnGraph.cwn_metrics.Metrics>`
+            to record into, e.g. one shared by several images
+        sinks : list, optional
+            sinks of a newly created ``Metrics``
+
+        Returns
+        -------
+        Metrics
+        """
+        if metrics is None:
+            metrics = Metrics(sinks)
+        self._metrics = metrics
+        return metrics
+
+    def disable_metrics(self):
+        self._metrics = None
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @property
+    def core(self):
+        """The :class:`IntGraph <CwnGraph.cwn_core.IntGraph>` of this graph,
+        rebuilt when the graph version changes."""
+        core = self._core
+        graph_version = self.graph_version()
+        if core is None or core.graph_version != graph_version:
+            core = IntGraph(self.V, self.E, graph_version)
+            self._core = core
+        return core
+
+    @property
+    def node_type_index(self):
+        """node_type -> tuple of the node ids of that type, in ``V`` order,
+        rebuilt when the graph version changes."""
+        graph_version = self.graph_version()
+        entry = self._node_type_index
+        if entry is None or entry[0] != graph_version:
+            index = {}
+            for nid, ndata in self.V.items():
+                index.setdefault(ndata.get("node_type"), []).append(nid)
+            entry = (graph_version, PostingIndex(index))
+            self._node_type_index = entry
+        return entry[1]
+
+    @property
+    def lemma_index(self):
+        """lemma string -> tuple of the ids of the lemma nodes, in ``V``
+        order, rebuilt when the graph version changes."""
+        graph_version = self.graph_version()
+        entry = self._lemma_index
+        if entry is None or entry[0] != graph_version:
+            V = self.V
+            index = {}
+            for nid in self.node_ids("lemma"):
+                index.setdefault(V[nid]["lemma"], []).append(nid)
+            entry = (graph_version, PostingIndex(index))
+            self._lemma_index = entry
+        return entry[1]
+
+    @property
+    def lemma_matcher(self):
+        """The :class:`LemmaMatcher <CwnGraph.cwn_fuzzy.LemmaMatcher>` of
+        all lemmas, rebuilt when the graph version changes."""
+        graph_version = self.graph_version()
+        entry = self._lemma_matcher
+        if entry is None or entry[0] != graph_version:
+            entry = (graph_version, LemmaMatcher.from_graph(self))
+            self._lemma_matcher = entry
+        return entry[1]
+
+    @property
+    def lemma_automaton(self):
+        """The :class:`LemmaAutomaton <CwnGraph.cwn_automaton.LemmaAutomaton>`
+        of all lemmas, rebuilt when the graph version changes.
+
+        Examples
+        --------
+        >>> [x.lemma for x in cwn.lemma_automaton.segment("我們去看電影")]
+        """
+        graph_version = self.graph_version()
+        entry = self._lemma_automaton
+        if entry is None or entry[0] != graph_version:
+            entry = (graph_version, LemmaAutomaton(self.lemma_index))
+            self._lemma_automaton = entry
+        return entry[1]
+
+    @property
+    def phonetic_index(self):
+        """The :class:`PhoneticIndex <CwnGraph.cwn_phonetic.PhoneticIndex>`
+        of all lemmas, rebuilt when the graph version changes."""
+        graph_version = self.graph_version()
+        entry = self._phonetic_index
+        if entry is None or entry[0] != graph_version:
+            entry = (graph_version, PhoneticIndex.from_graph(self))
+            self._phonetic_index = entry
+        return entry[1]
+
+    @property
+    def sense_bitmaps(self):
+        """The :class:`BitmapIndex <CwnGraph.cwn_bitmap.BitmapIndex>` of the
+        senses by POS tag, domain and relation type, rebuilt when the graph
+        version changes.
+
+        Examples
+        --------
+        >>> bm = cwn.sense_bitmaps
+        >>> bm.crosstab("pos", "domain", within=bm.relation("hypernym"))
+        """
+        graph_version = self.graph_version()
+        entry = self._sense_bitmaps
+        if entry is None or entry[0] != graph_version:
+            entry = (graph_version, BitmapIndex(self))
+            self._sense_bitmaps = entry
+        return entry[1]
+
+    def query(self):
+        """Start a compound :class:`SenseQuery <CwnGraph.cwn_query.SenseQuery>`.
 
+        Examples
+        --------
+        >>> cwn.query().lemma("打").pos("VC", "VB").limit(10).all()
+        """
+        return SenseQuery(self)
+
+    def lemma_sense_ids(self, lemma):
+        """Ids of the senses of the lemma string ``lemma``, in the order
+        of ``find_all_senses``."""
+        E = self.E
+        sense_ids = []
+        for lemma_id in self.lemma_index.get(lemma, ()):
+            sense_ids.extend(tgt for src, tgt in self.edge_src_index.get(lemma_id, ())
+                             if E[(src, tgt)].get("edge_type") == "has_sense")
+        return sense_ids
+
+    def node_ids(self, node_type):
+        """Ids of all nodes of ``node_type``, in ``V`` order."""
+        return self.node_type_index.get(node_type, ())
+
+    def to_sparse(self, relation_types=None, node_types=None, is_directed=True):
+        """Export the adjacency as a scipy CSR matrix, requires numpy and scipy.
+
+        Parameters
+        ----------
+        relation_types : list, optional
+            only keep edges of these types (names or ``CwnRelationType``),
+            by default all edges
+        node_types : list, optional
+            only keep nodes of these types, e.g. ``["sense", "synset"]``,
+            by default all nodes
+        is_directed : bool, optional
+            if False, the matrix is made symmetric, by default True
+
+        Returns
+        -------
+        SparseAdjacency
+            the CSR ``matrix`` with the node ``ids`` of its rows and the
+            ``index`` from id to row, see :mod:`CwnGraph.cwn_sparse`
+        """
+        from .cwn_sparse import SparseAdjacency
+        return SparseAdjacency.from_core(self.core,
+            relation_types, node_types, is_directed)
+
+    def to_networkx(self):
+        """A read-only networkx view of this graph, see
+        :func:`CwnGraph.cwn_nx.to_networkx`."""
+        from .cwn_nx import to_networkx
+        return to_networkx(self)
+
+    def to_igraph(self, relation_types=None):
+        """Export this graph to igraph, see :func:`CwnGraph.cwn_nx.to_igraph`."""
+        from .cwn_nx import to_igraph
+        return to_igraph(self, relation_types)
+
+    def count_edges(self, node_ids, is_directed=True):
+        n_edges = 0
+        for node_id in node_ids:
+            n_edges += len(self.edge_src_index.get(node_id, ()))
+            if not is_directed:
+                n_edges += len(self.edge_tgt_index.get(node_id, ()))
+        return n_edges
+
+    def invalidate_caches(self):
+        super(CwnGraphUtils, self).invalidate_caches()
+        if self._query_cache is not None:
+            self._query_cache.clear()
+
+    def compact(self):
+        """Keep the node data in a column store: ``V`` becomes a
+        :class:`NodeStore <CwnGraph.cwn_store.NodeStore>`, whose values
+        are read-only mappings decoded on access. The mutation methods
+        still work, changed nodes are kept as dicts.
+
+        Returns
+        -------
+        NodeTable
+            the column store
+        """
+        from .cwn_store import NodeStore
+        V = self.V
+        if isinstance(V, NodeStore) and not V.delta and not V.removed:
+            return V.table
+        if not isinstance(V, dict):
+            V = {k: V[k] for k in V}
+        self.V = NodeStore(V)
+        self._node_type_index = None
+        self._lemma_index = None
+        self.invalidate_caches()
+        return self.V.table
+
+    def add_node(self, node, data=None):
+        """Add or replace a node: a ``CwnNode`` (e.g. from
+        ``CwnSense.create``), or a node id and its data dict.
+
+        The indexes are updated in place and only the caches depending
+        on the change are dropped, see ``CACHE_DEPENDENCIES``. A node
+        added or retyped after the indexes were built comes last in
+        ``node_ids`` and ``lemma_index``.
+        """
+        if isinstance(node, CwnNode):
+            node, data = node.id, node.data()
+        old_version = self.graph_version()
+        old_data = self.V.get(node)
+        new_data = dict(data)
+        self.V[node] = new_data
+        self._after_mutation(old_version,
+            self._node_changes(old_data, new_data), (node, old_data, new_data))
+
+    def update_node(self, node_id, **fields):
+        """Set ``fields`` in the data of ``node_id``. The data dict is
+        replaced, not modified."""
+        if node_id not in self.V:
+            raise CwnIdNotFoundError(f"{node_id} is not a node")
+        self.add_node(node_id, {**self.V[node_id], **fields})
+
+    def remove_node(self, node_id):
+        """Remove ``node_id`` and its edges."""
+        if node_id not in self.V:
+            raise CwnIdNotFoundError(f"{node_id} is not a node")
+        for edge in self.edge_src_index.get(node_id, ()) + \
+                    self.edge_tgt_index.get(node_id, ()):
+            if edge in self.E:
+                self.remove_edge(edge)
+        old_version = self.graph_version()
+        old_data = self.V.pop(node_id)
+        self._after_mutation(old_version,
+            self._node_changes(old_data, None), (node_id, old_data, None))
+
+    def add_edge(self, edge, data=None):
+        """Add or replace an edge: a ``CwnRelation`` (e.g. from
+        ``CwnRelation.create``), or a ``(src_id, tgt_id)`` key and its
+        data dict."""
+        if isinstance(edge, CwnRelation):
+            edge, data = edge.id, edge.data()
+        edge = tuple(edge)
+        old_version = self.graph_version()
+        old_data = self.E.get(edge)
+        self.E[edge] = dict(data)
+        if old_data is None:
+            add_posting(self.edge_src_index, edge[0], edge)
+            add_posting(self.edge_tgt_index, edge[1], edge)
+        changes = self._edge_changes(edge, data)
+        if old_data is not None:
+            changes |= self._edge_changes(edge, old_data)
+        self._after_mutation(old_version, changes)
+
+    def remove_edge(self, edge):
+        """Remove the edge ``(src_id, tgt_id)``."""
+        edge = tuple(edge)
+        if edge not in self.E:
+            raise CwnIdNotFoundError(f"{edge} is not an edge")
+        old_version = self.graph_version()
+        old_data = self.E.pop(edge)
+        discard_posting(self.edge_src_index, edge[0], edge)
+        discard_posting(self.edge_tgt_index, edge[1], edge)
+        self._after_mutation(old_version, self._edge_changes(edge, old_data))
+
+    def _node_changes(self, old_data, new_data):
+        old_type = old_data.get("node_type") if old_data is not None else None
+        new_type = new_data.get("node_type") if new_data is not None else None
+        changes = set(x for x in (old_type, new_type) if x is not None)
+        if old_data is None or new_data is None or old_type != new_type:
+            changes.add("nodes")
+        return changes
+
+    def _edge_changes(self, edge, edata):
+        src_type = self.V.get(edge[0], {}).get("node_type")
+        return {"edges", "edge:" + str(edata.get("edge_type")),
+                "out:" + str(src_type)}
+
+    def _after_mutation(self, old_version, changes, node_change=None):
+        # bump the version, then carry the caches that do not depend on
+        # the change over to the new version
+        super(CwnGraphUtils, self).invalidate_caches()
+        new_version = self.graph_version()
+
+        entry = self._node_type_index
+        if entry is not None and entry[0] == old_version:
+            if node_change is not None:
+                patch_node_type_index(entry[1], *node_change)
+            self._node_type_index = (new_version, entry[1])
+        entry = self._lemma_index
+        if entry is not None and entry[0] == old_version:
+            if node_change is not None:
+                patch_lemma_index(entry[1], *node_change)
+            self._lemma_index = (new_version, entry[1])
+
+        for attr, depends in self.CACHE_DEPENDENCIES.items():
+            entry = getattr(self, attr, None)
+            if entry is None:
+                continue
+            if attr == "_core":
+                if entry.graph_version == old_version and not depends & changes:
+                    entry.graph_version = new_version
+            elif entry[0] == old_version and not depends & changes:
+                setattr(self, attr, (new_version, entry[1]))
+
+    @instrumented
     def find_glyph(self, instr):
-        for v, vdata in self.V.items():
-            if vdata["node_type"] == "glyph":
-                if vdata["glyph"] == instr:
-                   return v
+        V = self.V
+        for v in self.node_ids("glyph"):
+            if V[v]["glyph"] == instr:
+               return v
         return None
 
+    @instrumented
+    @cached_query
     def find_lemma(self, instr_regex):
         """Find lemmas matching search pattern.
 
@@ -45,17 +473,84 @@ class CwnGraphUtils(GraphStructure):
         """
         ret = []
         pat = re.compile(instr_regex)
-        for v, vdata in self.V.items():
-            if vdata["node_type"] == "lemma":
-                if pat.search(vdata["lemma"]) is not None:
-                   ret.append(CwnLemma(v, self))
+        V = self.V
+        for v in self.node_ids("lemma"):
+            if pat.search(V[v]["lemma"]) is not None:
+               ret.append(CwnLemma(v, self))
         return ret
 
+    @instrumented
+    def find_lemma_fuzzy(self, word, max_distance=1, limit=10):
+        """Find lemmas spelled like ``word``, up to ``max_distance`` edits
+        (insertions, deletions, substitutions or transpositions). Variant
+        characters, as linked by ``varword``/``variant`` relations, match
+        at no cost.
+
+        Parameters
+        ----------
+        word : str
+            the word to look up
+        max_distance : int, optional
+            largest edit distance, at most 2, by default 1
+        limit : int, optional
+            maximum number of lemma strings, by default 10
+
+        Returns
+        -------
+        list
+            :class:`CwnLemma <CwnGraph.cwn_types.CwnLemma>` ranked by
+            distance, exact spelling first
+        """
+        lemma_index = self.lemma_index
+        return [CwnLemma(nid, self)
+                for lemma, _ in self.lemma_matcher.search(word, max_distance, limit)
+                for nid in lemma_index[lemma]]
+
+    @instrumented
+    def find_lemma_by_sound(self, query, prefix=False):
+        """Find lemmas by zhuyin or pinyin.
+
+        Parameters
+        ----------
+        query : str
+            e.g. ``"ㄓㄨㄥ ㄨㄣˊ"`` or ``"zhong1 wen2"``, toneless
+            (``"zhong wen"``) if it has no tone mark or number
+        prefix : bool, optional
+            find the lemmas whose reading starts with ``query``
+
+        Returns
+        -------
+        list
+            A list of :class:`CwnLemma <CwnGraph.cwn_types.CwnLemma>`.
+        """
+        return [CwnLemma(x, self)
+                for x in self.phonetic_index.find(query, prefix)]
+
+    def find_homophones(self, lemma, tone=True):
+        """Find the lemmas pronounced like ``lemma`` (a
+        :class:`CwnLemma <CwnGraph.cwn_types.CwnLemma>` or a lemma id),
+        with the same tones unless ``tone`` is False."""
+        lemma_id = getattr(lemma, "id", lemma)
+        return [CwnLemma(x, self)
+                for x in self.phonetic_index.homophones(lemma_id, tone)]
+
+    @instrumented
+    @cached_query
     def find_all_senses(self, lemma):
-        sense_iter = (x.senses for x in self.find_lemma(f"^{lemma}$"))
+        # a plain string is looked up instead of scanning all lemmas
+        is_plain = re.escape(lemma) == lemma
+        if self._metrics is not None:
+            self._metrics.record_index("find_all_senses", "lemma_index", is_plain)
+        if is_plain:
+            lemmas = [CwnLemma(x, self) for x in self.lemma_index.get(lemma, ())]
+        else:
+            lemmas = self.find_lemma(f"^{lemma}$")
+        sense_iter = (x.senses for x in lemmas)
         sense_iter = chain.from_iterable(sense_iter)
         return list(sense_iter)
 
+    @instrumented
+    @cached_query
     def find_senses(self, lemma="", pos="", definition="", examples=""):
         """Find senses with lemmas, definitions, or examples matching
         search patterns.
@@ -64,6 +559,8 @@ class CwnGraphUtils(GraphStructure):
         ----------
         lemma : str, optional
             RegEx pattern for searching the lemma of a sense, by default ""
+        pos : str, optional
+            RegEx pattern for searching the POS of a sense, by default ""
         definition : str, optional
             RegEx pattern for searching the definition of a sense, by default ""
         examples : str, optional
@@ -75,44 +572,19 @@ class CwnGraphUtils(GraphStructure):
             A list of :class:`CwnSense <CwnGraph.cwn_types.CwnSense>` matching
         """
 
-        lemma_re = re.compile(lemma)
-        pos_re = re.compile(pos)
-        def_re = re.compile(re.escape(definition))
-        ex_re = re.compile(re.escape(examples))
-
-        sense_list = []
-        for node_id, node_x in self.V.items():
-            if not node_x["node_type"] == "sense":
-                continue
-            sense_x = CwnSense(node_id, self)
-            is_matched = True
-            if lemma:
-                lemma_matched = any(lemma_re.search(lemma_x.lemma)
-                    for lemma_x in sense_x.lemmas)
-                is_matched &= lemma_matched
-
-            if pos and is_matched:
-                pos_matched = pos_re.search(sense_x.pos)
-                is_matched &= pos_matched is not None
-
-            if definition and is_matched:
-                def_matched = def_re.search(sense_x.definition)
-                is_matched &= def_matched is not None
-
-            if examples and is_matched:
-                ex_san_re = re.compile(r"[\<\>]")
-                example_matched = any([ex_re.search(ex_san_re.sub("", ex_x))
-                    for ex_x in sense_x.examples])
-                is_matched &= example_matched
-
-            if is_matched:
-                sense_list.append(sense_x)
-        return sense_list
+        query = self.query()
+        if lemma:
+            query.lemma_regex(lemma)
+        if pos:
+            query.pos_regex(pos)
+        if definition:
+            query.definition(definition)
+        if examples:
+            query.examples(examples)
+        return query.all()
 
     def senses(self):
-        sense_iter = filter(lambda x: x[1].get("node_type", "") == "sense",
-                        self.V.items())
-        for sense_id, sense_data in sense_iter:
+        for sense_id in self.node_ids("sense"):
             try:
                 yield CwnSense(sense_id, self)
             except Exception as ex:
@@ -121,14 +593,15 @@ class CwnGraphUtils(GraphStructure):
     def find_edges(self, node_id, is_directed=True):
         ret = []
 
-        for e in self.edge_src_index.get(node_id, []):
+        for e in self.edge_src_index.get(node_id, ()):
             ret.append(CwnRelation(e, self))
         if not is_directed:
-            for e in self.edge_tgt_index.get(node_id, []):
+            for e in self.edge_tgt_index.get(node_id, ()):
                 ret.append(CwnRelation(e, self, reversed=True))
 
         return ret
 
+    @instrumented
     def subgraph(self, node_ids, meta={}, include_lemma=True, include_synset=True):
         sV = {nid: self.V[nid] for nid in node_ids}
         sE = {eid: self.E[eid] for eid in self.E
@@ -157,6 +630,8 @@ class CwnGraphUtils(GraphStructure):
 
         return (sV, sE, {"label": "subgraph", **meta})
 
+    @instrumented
+    @cached_query
     def connected(self, node_id, is_directed=False,
             max_conn=1000, max_depth=-1, lemma_guard=True, 
             include_upper_relations=True,
@@ -177,10 +652,38 @@ class CwnGraphUtils(GraphStructure):
             arg to True implies is_directed is True.
         '''
 
+        is_directed = is_directed or include_upper_relations or include_lower_relations
+        if not self.use_core:
+            return self._connected_by_edges(node_id, is_directed,
+                max_conn, max_depth, lemma_guard,
+                include_upper_relations, include_lower_relations,
+                include_synonym, include_facets)
+
+        core = self.core
+        node_x = core.index.get(node_id)
+        if node_x is None:
+            return set([node_id])
+
+        mask = relation_mask(upper=include_upper_relations,
+            lower=include_lower_relations, synonym=include_synonym)
+        conn_nodes, visited = core.connected(node_x, is_directed,
+            max_conn, max_depth, lemma_guard, mask, include_facets)
+
+        if self._metrics is not None:
+            self._metrics.record_traversal("connected",
+                len(visited), core.count_edges(visited, is_directed))
+        ids = core.ids
+        return set(ids[x] for x in conn_nodes)
+
+    def _connected_by_edges(self, node_id, is_directed,
+            max_conn, max_depth, lemma_guard,
+            include_upper_relations, include_lower_relations,
+            include_synonym, include_facets):
+        mask = relation_mask(upper=include_upper_relations,
+            lower=include_lower_relations, synonym=include_synonym)
         ret = set([node_id])
         visited = set()
         buf = [(node_id, 0)]
-        is_directed = is_directed or include_upper_relations or include_lower_relations
 
         while buf:
             node_x, depth = buf.pop()
@@ -198,15 +701,7 @@ class CwnGraphUtils(GraphStructure):
                 if conn_node_type=="facet" and not include_facets:
                     continue                    
 
-                rel_type = CwnRelationType[conn_edge_x.relation_type]
-                include_relation = rel_type.is_upper_relation() and \
-                                    include_upper_relations                                    
-                include_relation |= rel_type.is_lower_relation() and \
-                                    include_lower_relations
-                include_relation |= rel_type.is_synonym_relation() and \
-                                    include_synonym
-                                
-                if include_relation:
+                if relation_flags(conn_edge_x.relation_type) & mask:
                     ret.add(conn_node_x)
                 else:
                     # if this relation is not included, 
@@ -225,16 +720,39 @@ class CwnGraphUtils(GraphStructure):
             visited.add(node_x)
             if max_conn and len(ret) > max_conn:
                 break
+
+        if self._metrics is not None:
+            self._metrics.record_traversal("connected",
+                len(visited), self.count_edges(visited, is_directed))
         return ret
 
+    @instrumented
+    @cached_query
     def find_shortest_path(self, src_id, tgt_id, is_directed=True):
-        buf = [(src_id, 0)]
+        if not self.use_core:
+            return self._shortest_path_by_edges(src_id, tgt_id, is_directed)
+
+        core = self.core
+        src_x = core.index.get(src_id)
+        tgt_x = core.index.get(tgt_id)
+        if src_x is None or tgt_x is None:
+            return []
+
+        trace, visited = core.shortest_path(src_x, tgt_x, is_directed)
+        if self._metrics is not None:
+            self._metrics.record_traversal("find_shortest_path",
+                len(visited), core.count_edges(visited, is_directed))
+        ids = core.ids
+        return [ids[x] for x in trace]
+
+    def _shortest_path_by_edges(self, src_id, tgt_id, is_directed):
+        buf = deque([(src_id, 0)])
         backtrace = {}
         visited = set()
         is_found = False
 
-        while buf:
-            nid, depth = buf.pop(0)
+        while buf and not is_found:
+            nid, depth = buf.popleft()
             if nid in visited:
                 continue
             
@@ -246,17 +764,21 @@ class CwnGraphUtils(GraphStructure):
                 else:
                     conn_node_x = conn_edge_x.tgt_id
 
-                prev_depth = backtrace.get(conn_node_x, (None, 999))[1]
-                if depth < prev_depth:
-                    backtrace[conn_node_x] = (nid, depth)
+                if conn_node_x not in backtrace:
+                    # BFS reaches every node at its minimal depth first
+                    backtrace[conn_node_x] = nid
+                    buf.append((conn_node_x, depth+1))
 
                 if conn_node_x == tgt_id:
                     is_found = True
-                    break   
-                buf.append((conn_node_x, depth+1))
+                    break
+
+            visited.add(nid)
+
+        if self._metrics is not None:
+            self._metrics.record_traversal("find_shortest_path",
+                len(visited), self.count_edges(visited, is_directed))
 
-            visited.add(nid)            
-                            
         ## backtracking
         trace = []
         if is_found:
@@ -265,7 +787,7 @@ class CwnGraphUtils(GraphStructure):
             while True:
                 if nid==src_id:
                     break
-                nid = backtrace[nid][0]
+                nid = backtrace[nid]
                 trace.append(nid)                
             trace = trace[::-1]
         return trace
@@ -283,8 +805,7 @@ class CwnGraphUtils(GraphStructure):
         return CwnSense(sense_id, self)
 
     def get_all_lemmas(self):
-        lemmas = [CwnLemma(nid, self) for nid, ndata in self.V.items()
-                    if ndata["node_type"] == "lemma"]
+        lemmas = [CwnLemma(nid, self) for nid in self.node_ids("lemma")]
         lemmas = sorted(lemmas, key=lambda x: (x.lemma, x.lemma_sno or 0))
         lemma_groups = groupby(lemmas, key=lambda x: x.lemma)
         lemma_groups = {grp_key: list(grp_iter)
@@ -292,12 +813,220 @@ class CwnGraphUtils(GraphStructure):
         return lemma_groups
 
     def get_all_senses(self):
-        senses = [CwnSense(nid, self) for nid, ndata in self.V.items()
-                    if ndata["node_type"] == "sense"]
+        senses = [CwnSense(nid, self) for nid in self.node_ids("sense")]
         return senses
 
     def get_all_synsets(self):
-        synsets = [CwnSynset(nid, self) for nid, ndata in self.V.items()
-                    if ndata["node_type"] == "synset"]
+        synsets = [CwnSynset(nid, self) for nid in self.node_ids("synset")]
         return synsets
 
+
+    SENSE_COLUMNS = ("id", "pos", "definition", "domain", "head_word",
+                     "lemma_id", "n_examples", "src", "supplementary")
+
+    def sense_table(self, columns=("id", "pos", "definition", "domain",
+                                   "head_word", "n_examples"),
+                    pos=None, domain=None, output="numpy"):
+        """Data of all senses as columns, built in one pass over ``V`` and ``E``.
+
+        Parameters
+        ----------
+        columns : list, optional
+            columns to build, among ``SENSE_COLUMNS``. ``head_word`` and
+            ``lemma_id`` are those of the first lemma of the sense,
+            ``n_examples`` counts the examples of the sense itself.
+        pos : str or list, optional
+            only keep senses with this POS tag (or one of these), by
+            default all; ``"VC,VH"`` senses have both tags, as in
+            ``sense_bitmaps``
+        domain : str or list, optional
+            only keep senses in this domain (or one of these), by default all
+        output : str, optional
+            ``"numpy"`` for a dict of NumPy arrays, ``"pandas"`` for a
+            DataFrame, ``"arrow"`` for a ``pyarrow.Table`` or ``"dict"``
+            for a dict of lists, by default ``"numpy"``
+
+        Returns
+        -------
+        dict, pandas.DataFrame or pyarrow.Table
+            one row per sense, in ``V`` order
+        """
+        unknown = set(columns) - set(self.SENSE_COLUMNS)
+        if unknown:
+            raise ValueError(f"unknown columns: {sorted(unknown)}")
+        if output not in ("numpy", "pandas", "arrow", "dict"):
+            raise ValueError(f"unknown output: {output}")
+        if isinstance(pos, str):
+            pos = (pos,)
+        if isinstance(domain, str):
+            domain = (domain,)
+        pos = set(pos) if pos is not None else None
+        domain = set(domain) if domain is not None else None
+
+        head_lemmas = {}
+        if "head_word" in columns or "lemma_id" in columns:
+            # CwnSense.lemmas lists the has_sense edges in E order
+            for (src, tgt), edata in self.E.items():
+                if edata.get("edge_type") == "has_sense" and tgt not in head_lemmas:
+                    head_lemmas[tgt] = src
+
+        V = self.V
+        getters = {
+            "id": lambda nid, ndata: nid,
+            "pos": lambda nid, ndata: ndata.get("pos", ""),
+            "definition": lambda nid, ndata: ndata.get("def", ""),
+            "domain": lambda nid, ndata: ndata.get("domain", ""),
+            "head_word": lambda nid, ndata:
+                V.get(head_lemmas.get(nid), {}).get("lemma", ""),
+            "lemma_id": lambda nid, ndata: head_lemmas.get(nid),
+            "n_examples": lambda nid, ndata: len(ndata.get("examples", [])),
+            "src": lambda nid, ndata: ndata.get("src"),
+            "supplementary": lambda nid, ndata: ndata.get("supplementary", ""),
+        }
+        data = {col: [] for col in columns}
+        column_getters = [(getters[col], data[col]) for col in columns]
+        for nid in self.node_ids("sense"):
+            ndata = V[nid]
+            if pos is not None and pos.isdisjoint(split_values(ndata.get("pos"))):
+                continue
+            if domain is not None and ndata.get("domain", "") not in domain:
+                continue
+            for getter, values in column_getters:
+                values.append(getter(nid, ndata))
+
+        if output == "dict":
+            return data
+        if output == "arrow":
+            import pyarrow as pa
+            return pa.table(data)
+
+        import numpy as np
+        arrays = {col: np.array(values, dtype=np.int64 if col == "n_examples" else object)
+                  for col, values in data.items()}
+        if output == "pandas":
+            import pandas as pd
+            return pd.DataFrame(arrays, columns=list(columns))
+        return arrays
+
+    def iter_examples(self, include_facets=True, dedup="sense", batch_size=None):
+        """Stream the examples of all senses, with their target spans.
+        See :func:`CwnGraph.cwn_examples.iter_examples`.
+
+        Examples
+        --------
+        >>> for batch in cwn.iter_examples(batch_size=256):
+        ...     vectors = encoder([x.text for x in batch])
+        """
+        return iter_examples(self, include_facets, dedup, batch_size)
+
+
+def add_posting(index, key, edge):
+    if not isinstance(index, dict):
+        # e.g. an OverlayIndex, keeping its own delta
+        index.add(key, edge)
+        return
+    # postings are tuples, replaced rather than modified
+    index[key] = index.get(key, ()) + (edge,)
+
+
+def discard_posting(index, key, edge):
+    if not isinstance(index, dict):
+        index.discard(key, edge)
+        return
+    edges = index.get(key, ())
+    if edge in edges:
+        i = edges.index(edge)
+        edges = edges[:i] + edges[i+1:]
+    if edges:
+        index[key] = edges
+    else:
+        index.pop(key, None)
+
+
+class PostingIndex(Mapping):
+    """key -> tuple of ids, e.g. ``node_type_index``, updated in O(1) by
+    ``add`` and ``discard``.
+
+    Postings are tuples until a key is first changed; its ids are then
+    staged in a dict (insertion-ordered), and frozen again into a tuple
+    on the next read of that key. Reading is therefore not free of
+    writes: the first read after a change stores the tuple (one item
+    assignment) and costs O(len(posting)), so alternating changes and
+    reads of one large key is linear per read. Freezing in the mutation
+    instead would make every ``add`` linear.
+    """
+    def __init__(self, postings=()):
+        # key -> tuple, or None while the tuple of a staged key is stale
+        self._postings = {key: tuple(ids) for key, ids in dict(postings).items()}
+        self._staged = {}
+
+    def __repr__(self):
+        return f"<PostingIndex: {len(self._postings)} keys>"
+
+    def __getitem__(self, key):
+        ids = self._postings[key]
+        if ids is None:
+            ids = self._postings[key] = tuple(self._staged[key])
+        return ids
+
+    def get(self, key, default=None):
+        if key in self._postings:
+            return self[key]
+        return default
+
+    def __contains__(self, key):
+        return key in self._postings
+
+    def __iter__(self):
+        return iter(self._postings)
+
+    def __len__(self):
+        return len(self._postings)
+
+    def _stage(self, key):
+        staged = self._staged.get(key)
+        if staged is None:
+            staged = dict.fromkeys(self._postings.get(key) or ())
+            self._staged[key] = staged
+        self._postings[key] = None
+        return staged
+
+    def add(self, key, item):
+        """Append ``item`` to the posting of ``key``, unless it is in it."""
+        self._stage(key)[item] = None
+
+    def discard(self, key, item):
+        """Remove ``item`` from the posting of ``key``, and the key if
+        its posting is empty."""
+        if key not in self._postings:
+            return
+        staged = self._stage(key)
+        staged.pop(item, None)
+        if not staged:
+            del self._postings[key]
+            del self._staged[key]
+
+
+def patch_node_type_index(index, node_id, old_data, new_data):
+    old_type = old_data.get("node_type") if old_data is not None else None
+    new_type = new_data.get("node_type") if new_data is not None else None
+    if old_data is not None and new_data is not None and old_type == new_type:
+        return
+    if old_data is not None:
+        index.discard(old_type, node_id)
+    if new_data is not None:
+        index.add(new_type, node_id)
+
+
+def patch_lemma_index(index, node_id, old_data, new_data):
+    def lemma_of(ndata):
+        if ndata is not None and ndata.get("node_type") == "lemma":
+            return ndata["lemma"]
+        return None
+    old_lemma, new_lemma = lemma_of(old_data), lemma_of(new_data)
+    if old_lemma == new_lemma:
+        return
+    if old_lemma is not None:
+        index.discard(old_lemma, node_id)
+    if new_lemma is not None:
+        index.add(new_lemma, node_id)
@@ -0,0 +1,350 @@
+"""Compressed image files, with checksums.
+
+An image file is ``MAGIC``, the length of the header (4 bytes, big
+endian), the SHA-256 of the header (32 bytes), a JSON header, then the
+sections it lists: the pickled meta,
+then chunks of the node and edge dicts. Each section is compressed on
+its own (``zstd``, ``lz4`` or ``zlib``) and its SHA-256 is kept in the
+header, so a truncated or corrupted file is detected, and names the
+section at fault.
+
+Sections are read and decompressed in a background thread while the
+previous ones are unpickled. ``read_image`` also computes the SHA-256 of
+the whole file on the way, to check it against the manifest.
+
+Files without ``MAGIC`` are read as the plain pickles written by
+earlier versions.
+
+Examples
+--------
+>>> info = write_image("cwn.cwnz", cwn.V, cwn.E, cwn.meta)
+>>> info["sha256"]  # for the manifest
+>>> V, E, meta = read_image("cwn.cwnz", sha256=info["sha256"])
+"""
+import os
+import json
+import queue
+import pickle
+import struct
+import hashlib
+import threading
+from itertools import islice
+
+MAGIC = b"CWNIMG\x01\n"
+FORMAT_VERSION = 1
+CODECS = ("zstd", "lz4", "zlib")
+
+
+class CwnImageIntegrityError(Exception):
+    """An image file is truncated, corrupted, or not the one expected."""
+    pass
+
+
+def get_codec(name):
+    """The ``compress`` and ``decompress`` functions of a codec.
+
+    Parameters
+    ----------
+    name : str
+        ``"zstd"`` (needs ``zstandard``), ``"lz4"`` (needs ``lz4``),
+        ``"zlib"``, or ``"auto"``: the first one installed, in this order
+
+    Returns
+    -------
+    tuple
+        ``(name, compress, decompress)``
+    """
+    if name == "auto":
+        for codec in CODECS:
+            try:
+                return get_codec(codec)
+            except ImportError:
+                continue
+    if name == "zstd":
+        import zstandard
+        compressor = zstandard.ZstdCompressor(level=10)
+        decompressor = zstandard.ZstdDecompressor()
+        return (name, compressor.compress, decompressor.decompress)
+    elif name == "lz4":
+        import lz4.frame
+        return (name, lz4.frame.compress, lz4.frame.decompress)
+    elif name == "zlib":
+        import zlib
+        return (name, lambda data: zlib.compress(data, 6), zlib.decompress)
+    raise ValueError(f"unknown codec: {name}")
+
+
+def iter_chunks(mapping, chunksize):
+    items = iter(mapping.items())
+    while True:
+        chunk = dict(islice(items, chunksize))
+        if not chunk:
+            break
+        yield chunk
+
+
+def write_image(fpath, V, E, meta, codec="auto", chunksize=16384):
+    """Write an image file, see :mod:`CwnGraph.cwn_imagefile`.
+
+    The file is written next to ``fpath`` and renamed into place, so
+    readers never see a partial file.
+
+    Parameters
+    ----------
+    fpath : str or Path
+    V, E, meta : dict
+        the image; node data are written as plain dicts
+    codec : str, optional
+        see ``get_codec``, by default ``"auto"``
+    chunksize : int, optional
+        number of nodes or edges in a section, by default 16384
+
+    Returns
+    -------
+    dict
+        ``codec``, ``size`` and ``sha256`` of the file
+    """
+    codec, compress, _ = get_codec(codec)
+    parts = [("meta", meta)]
+    parts.extend(("nodes", {k: dict(v) for k, v in chunk.items()})
+                 for chunk in iter_chunks(V, chunksize))
+    parts.extend(("edges", chunk) for chunk in iter_chunks(E, chunksize))
+
+    sections = []
+    blobs = []
+    for name, obj in parts:
+        raw = pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+        blob = compress(raw)
+        sections.append({"name": name, "size": len(blob), "raw_size": len(raw),
+                         "sha256": hashlib.sha256(blob).hexdigest()})
+        blobs.append(blob)
+    header = json.dumps({"format": FORMAT_VERSION, "codec": codec,
+                         "sections": sections}).encode("UTF-8")
+
+    file_hash = hashlib.sha256()
+    tmp_path = f"{fpath}.tmp{os.getpid()}"
+    try:
+        with open(tmp_path, "wb") as fout:
+            head = [MAGIC, struct.pack(">I", len(header)),
+                    hashlib.sha256(header).digest(), header]
+            for data in head + blobs:
+                fout.write(data)
+                file_hash.update(data)
+        os.replace(tmp_path, fpath)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return {"codec": codec, "size": os.path.getsize(fpath),
+            "sha256": file_hash.hexdigest()}
+
+
+def is_image_file(fpath):
+    """Whether ``fpath`` is a compressed image file (rather than a pickle)."""
+    with open(fpath, "rb") as fin:
+        return fin.read(len(MAGIC)) == MAGIC
+
+
+def read_exact(fin, size, what):
+    data = fin.read(size)
+    if len(data) != size:
+        raise CwnImageIntegrityError(
+            f"{fin.name}: truncated in {what} ({len(data)} of {size} bytes)")
+    return data
+
+
+SECTION_KEYS = {"name": str, "size": int, "raw_size": int, "sha256": str}
+
+
+def read_header(fin, file_hash):
+    magic = read_exact(fin, len(MAGIC), "magic")
+    if magic != MAGIC:
+        raise CwnImageIntegrityError(f"{fin.name}: not a compressed image file")
+    size_bytes = read_exact(fin, 4, "header")
+    header_hash = read_exact(fin, 32, "header")
+    header_bytes = read_exact(fin, struct.unpack(">I", size_bytes)[0], "header")
+    for data in (magic, size_bytes, header_hash, header_bytes):
+        file_hash.update(data)
+    if hashlib.sha256(header_bytes).digest() != header_hash:
+        raise CwnImageIntegrityError(f"{fin.name}: checksum mismatch in header")
+    try:
+        header = json.loads(header_bytes.decode("UTF-8"))
+    except ValueError:
+        raise CwnImageIntegrityError(f"{fin.name}: corrupted header")
+    if not isinstance(header, dict) or header.get("format") != FORMAT_VERSION:
+        raise CwnImageIntegrityError(f"{fin.name}: unsupported image format "
+            f"{header.get('format') if isinstance(header, dict) else None}")
+    if header.get("codec") not in CODECS:
+        raise CwnImageIntegrityError(f"{fin.name}: unknown codec {header.get('codec')}")
+    sections = header.get("sections")
+    if not isinstance(sections, list) or not all(
+            isinstance(x, dict) and x.get("name") in ("meta", "nodes", "edges") and
+            all(isinstance(x.get(k), t) for k, t in SECTION_KEYS.items())
+            for x in sections):
+        raise CwnImageIntegrityError(f"{fin.name}: corrupted section table")
+    return header
+
+
+def iter_sections(fin, header, file_hash, prefetch=4):
+    """Yield ``(section, raw bytes)``, read, checked and decompressed in a
+    background thread at most ``prefetch`` sections ahead."""
+    _, _, decompress = get_codec(header["codec"])
+    sections = queue.Queue(prefetch)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                sections.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def reader():
+        try:
+            for i, section in enumerate(header["sections"]):
+                what = f"section {i} ({section['name']})"
+                blob = read_exact(fin, section["size"], what)
+                file_hash.update(blob)
+                if hashlib.sha256(blob).hexdigest() != section["sha256"]:
+                    raise CwnImageIntegrityError(f"{fin.name}: checksum mismatch in {what}")
+                try:
+                    raw = decompress(blob)
+                except Exception as ex:
+                    raise CwnImageIntegrityError(f"{fin.name}: cannot decompress {what}: {ex}")
+                if len(raw) != section["raw_size"]:
+                    raise CwnImageIntegrityError(f"{fin.name}: bad size of {what}")
+                put((section, raw))
+            if fin.read(1):
+                raise CwnImageIntegrityError(f"{fin.name}: trailing data")
+            put(None)
+        except BaseException as ex:
+            put(ex)
+
+    thread = threading.Thread(target=reader, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = sections.get()
+            if item is None:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
+def read_image(fpath, sha256=None, prefetch=4):
+    """Read an image file, or a plain pickled image.
+
+    Parameters
+    ----------
+    fpath : str or Path
+    sha256 : str, optional
+        expected SHA-256 of the file, e.g. from the manifest
+    prefetch : int, optional
+        number of sections decompressed ahead of unpickling, by default 4
+
+    Returns
+    -------
+    tuple
+        ``(V, E, meta)``
+
+    Raises
+    ------
+    CwnImageIntegrityError
+        if the file is truncated, a section does not match its checksum,
+        a plain pickle cannot be loaded, or the file does not match
+        ``sha256``
+    """
+    file_hash = hashlib.sha256()
+    with open(fpath, "rb") as fin:
+        if fin.read(len(MAGIC)) != MAGIC:
+            fin.seek(0)
+            if sha256 is None:
+                return read_pickle(fin, lambda: pickle.load(fin))
+            # hashed while it is unpickled, rather than read into memory
+            # first: the file is only checked once it is loaded
+            reader = HashingReader(fin, file_hash)
+            try:
+                image = read_pickle(fin, lambda: pickle.load(reader))
+            except CwnImageIntegrityError:
+                # a file that is not the one expected says so first
+                reader.read_rest()
+                check_sha256(fpath, file_hash, sha256)
+                raise
+            reader.read_rest()
+            check_sha256(fpath, file_hash, sha256)
+            return image
+
+        fin.seek(0)
+        header = read_header(fin, file_hash)
+        V, E, meta = {}, {}, {}
+        targets = {"nodes": V, "edges": E}
+        for section, raw in iter_sections(fin, header, file_hash, prefetch):
+            if section["name"] == "meta":
+                meta = pickle.loads(raw)
+            else:
+                targets[section["name"]].update(pickle.loads(raw))
+    if sha256 is not None:
+        check_sha256(fpath, file_hash, sha256)
+    return V, E, meta
+
+
+def check_sha256(fpath, file_hash, sha256):
+    if file_hash.hexdigest() != sha256:
+        raise CwnImageIntegrityError(
+            f"{fpath}: SHA-256 {file_hash.hexdigest()} does not match {sha256}")
+
+
+def read_pickle(fin, load):
+    # a corrupted pickle can fail with about any exception
+    try:
+        data = load()
+        if len(data) == 2:
+            V, E = data
+            meta = {}
+        else:
+            V, E, meta = data
+    except Exception as ex:
+        raise CwnImageIntegrityError(
+            f"{fin.name}: not a pickled image ({type(ex).__name__}: {ex})") from ex
+    return V, E, meta
+
+
+class HashingReader:
+    """A binary file, updating ``file_hash`` with the bytes read from it."""
+    def __init__(self, fin, file_hash):
+        self.fin = fin
+        self.file_hash = file_hash
+        self.name = fin.name
+
+    def read(self, size=-1):
+        data = self.fin.read(size)
+        self.file_hash.update(data)
+        return data
+
+    def readline(self, size=-1):
+        data = self.fin.readline(size)
+        self.file_hash.update(data)
+        return data
+
+    def readinto(self, buf):
+        n = self.fin.readinto(buf)
+        self.file_hash.update(memoryview(buf)[:n])
+        return n
+
+    def read_rest(self, blocksize=2**20):
+        """Read (and hash) the file to its end."""
+        while self.read(blocksize):
+            pass
+
+
+def file_sha256(fpath, blocksize=2**20):
+    """SHA-256 of a file, e.g. for a manifest entry."""
+    file_hash = hashlib.sha256()
+    with open(fpath, "rb") as fin:
+        for block in iter(lambda: fin.read(blocksize), b""):
+            file_hash.update(block)
+    return file_hash.hexdigest()
@@ -0,0 +1,242 @@
+import os
+import time
+import bisect
+import logging
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05,
+                   0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+COUNT_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        acc = 0
+        ret = []
+        for n in self.counts:
+            acc += n
+            ret.append(acc)
+        return ret
+
+
+class LoggingSink:
+    """Log every event with ``logging``."""
+    def __init__(self, logger="CwnGraph.metrics", level=logging.DEBUG):
+        self.logger = logging.getLogger(logger) \
+            if isinstance(logger, str) else logger
+        self.level = level
+
+    def handle(self, event):
+        self.logger.log(self.level, "%s", event)
+
+
+class CallbackSink:
+    """Call ``callback(event)`` for every event."""
+    def __init__(self, callback):
+        self.callback = callback
+
+    def handle(self, event):
+        self.callback(event)
+
+
+class PrometheusTextSink:
+    """Write all metrics in the Prometheus text format to ``fpath``
+    on ``Metrics.flush()``, e.g. for the node_exporter textfile collector.
+    """
+    def __init__(self, fpath):
+        self.fpath = fpath
+
+    def handle(self, event):
+        pass
+
+    def flush(self, metrics):
+        tmp_path = f"{self.fpath}.tmp"
+        with open(tmp_path, "w", encoding="UTF-8") as fout:
+            fout.write(metrics.to_prometheus())
+        os.replace(tmp_path, self.fpath)
+
+
+class Metrics:
+    """Counters and histograms of ``CwnGraphUtils`` operations.
+
+    Recorded metrics:
+
+    * ``cwn_query_calls_total``, ``cwn_query_errors_total`` and
+      ``cwn_query_duration_seconds`` per query method
+    * ``cwn_traversal_nodes_visited`` and ``cwn_traversal_edges_visited``
+      per traversal method (``connected``, ``find_shortest_path``)
+    * ``cwn_query_cache_hits_total``/``cwn_query_cache_misses_total``
+      per method, when the query cache is enabled
+    * ``cwn_index_hits_total``/``cwn_index_misses_total`` per method and
+      index: lookups answered by an index (e.g. ``find_all_senses`` from
+      ``lemma_index``), or falling back to a scan (a regex lemma)
+    * ``cwn_image_load_seconds`` per image loading phase
+
+    Each operation is also sent as an event dict to every sink.
+
+    Parameters
+    ----------
+    sinks : list, optional
+        objects with a ``handle(event)`` method, and optionally a
+        ``flush(metrics)`` method, e.g. :class:`LoggingSink`,
+        :class:`CallbackSink` or :class:`PrometheusTextSink`
+    """
+    def __init__(self, sinks=None):
+        self.sinks = list(sinks or [])
+        self.counters = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        n_calls = sum(v for (name, _), v in self.counters.items()
+                      if name == "cwn_query_calls_total")
+        return f"<Metrics: {n_calls} calls>"
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def emit(self, event):
+        for sink in self.sinks:
+            sink.handle(event)
+
+    def flush(self):
+        for sink in self.sinks:
+            if hasattr(sink, "flush"):
+                sink.flush(self)
+
+    def record_call(self, method, duration, error=None):
+        self.inc("cwn_query_calls_total", method=method)
+        if error is not None:
+            self.inc("cwn_query_errors_total", method=method)
+        self.observe("cwn_query_duration_seconds", duration, method=method)
+        event = {"event": "query", "method": method, "duration": duration}
+        if error is not None:
+            event["error"] = repr(error)
+        self.emit(event)
+
+    def record_traversal(self, method, n_nodes, n_edges):
+        self.observe("cwn_traversal_nodes_visited", n_nodes,
+                     buckets=COUNT_BUCKETS, method=method)
+        self.observe("cwn_traversal_edges_visited", n_edges,
+                     buckets=COUNT_BUCKETS, method=method)
+        self.emit({"event": "traversal", "method": method,
+                   "nodes_visited": n_nodes, "edges_visited": n_edges})
+
+    def record_cache(self, method, is_hit):
+        if is_hit:
+            self.inc("cwn_query_cache_hits_total", method=method)
+        else:
+            self.inc("cwn_query_cache_misses_total", method=method)
+
+    def record_index(self, method, index, is_hit):
+        if is_hit:
+            self.inc("cwn_index_hits_total", method=method, index=index)
+        else:
+            self.inc("cwn_index_misses_total", method=method, index=index)
+
+    @contextmanager
+    def phase(self, phase_name):
+        """Time a phase of image loading."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - t0
+            self.observe("cwn_image_load_seconds", duration, phase=phase_name)
+            self.emit({"event": "load", "phase": phase_name,
+                       "duration": duration})
+
+    def snapshot(self):
+        """Return all metrics as a dict keyed by ``name{labels}``."""
+        ret = {}
+        with self._lock:
+            for (name, labels), value in self.counters.items():
+                ret[format_key(name, labels)] = value
+            for (name, labels), hist in self.histograms.items():
+                ret[format_key(name, labels)] = {
+                    "count": hist.count, "sum": hist.sum,
+                    "buckets": dict(zip(hist.buckets + ("+Inf",),
+                                        hist.cumulative_counts()))}
+        return ret
+
+    def to_prometheus(self):
+        """Return all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name in sorted({k[0] for k in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (name_x, labels), value in sorted(self.counters.items()):
+                    if name_x == name:
+                        lines.append(f"{format_key(name, labels)} {value}")
+            for name in sorted({k[0] for k in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (name_x, labels), hist in sorted(self.histograms.items(),
+                                                     key=lambda x: x[0]):
+                    if name_x != name:
+                        continue
+                    bounds = [str(b) for b in hist.buckets] + ["+Inf"]
+                    for le, n in zip(bounds, hist.cumulative_counts()):
+                        key = format_key(f"{name}_bucket", labels + (("le", le),))
+                        lines.append(f"{key} {n}")
+                    lines.append(f"{format_key(name + '_sum', labels)} {hist.sum}")
+                    lines.append(f"{format_key(name + '_count', labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def format_key(name, labels):
+    if not labels:
+        return name
+    label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+    return f"{name}{{{label_str}}}"
+
+
+def load_phase(metrics, phase_name):
+    if metrics is None:
+        return nullcontext()
+    return metrics.phase(phase_name)
+
+
+def instrumented(method):
+    """Record calls and latency of a ``CwnGraphUtils`` method, when the
+    instance has metrics enabled. Disabled, it costs one attribute lookup.
+    """
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = self._metrics
+        if metrics is None:
+            return method(self, *args, **kwargs)
+
+        t0 = time.perf_counter()
+        try:
+            ret = method(self, *args, **kwargs)
+        except Exception as ex:
+            metrics.record_call(name, time.perf_counter() - t0, ex)
+            raise
+        metrics.record_call(name, time.perf_counter() - t0)
+        return ret
+    return wrapper
@@ -0,0 +1,194 @@
+"""Adapters exposing a ``CwnGraphUtils`` to graph libraries.
+
+:func:`to_networkx` returns a read-only networkx view of the graph,
+whose node and adjacency mappings read ``V``, ``E`` and the integer
+core in place. :func:`edge_list`, :func:`to_igraph` export the core's
+integer edges in bulk, e.g. for igraph or graph-tool.
+"""
+from collections.abc import Mapping
+
+
+class NodeView(Mapping):
+    """node id -> node data, for every node of the core.
+    Nodes only found in edges have empty data."""
+    def __init__(self, cgu, core):
+        self._V = cgu.V
+        self._core = core
+
+    def __getitem__(self, node_id):
+        ndata = self._V.get(node_id)
+        if ndata is None:
+            if node_id not in self._core.index:
+                raise KeyError(node_id)
+            return {}
+        return ndata
+
+    def __contains__(self, node_id):
+        return node_id in self._core.index
+
+    def __iter__(self):
+        return iter(self._core.ids)
+
+    def __len__(self):
+        return len(self._core.ids)
+
+
+class NeighbourView(Mapping):
+    """neighbour id -> edge data, of one node in one direction."""
+    def __init__(self, E, core, node_x, reverse):
+        self._E = E
+        self._core = core
+        self._node_x = node_x
+        self._node_id = core.ids[node_x]
+        self._reverse = reverse
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({dict(self)})"
+
+    def _edge_id(self, nbr_id):
+        if self._reverse:
+            return (nbr_id, self._node_id)
+        return (self._node_id, nbr_id)
+
+    def __getitem__(self, nbr_id):
+        return self._E[self._edge_id(nbr_id)]
+
+    def __contains__(self, nbr_id):
+        return self._edge_id(nbr_id) in self._E
+
+    def __iter__(self):
+        core = self._core
+        if self._reverse:
+            offsets, nbrs = core.in_offsets, core.in_sources
+        else:
+            offsets, nbrs = core.out_offsets, core.out_targets
+        ids = core.ids
+        for k in range(offsets[self._node_x], offsets[self._node_x+1]):
+            yield ids[nbrs[k]]
+
+    def __len__(self):
+        offsets = self._core.in_offsets if self._reverse \
+            else self._core.out_offsets
+        return offsets[self._node_x+1] - offsets[self._node_x]
+
+
+class AdjacencyView(Mapping):
+    """node id -> :class:`NeighbourView`, successors or predecessors."""
+    def __init__(self, cgu, core, reverse=False):
+        self._E = cgu.E
+        self._core = core
+        self._reverse = reverse
+
+    def __getitem__(self, node_id):
+        node_x = self._core.index[node_id]
+        return NeighbourView(self._E, self._core, node_x, self._reverse)
+
+    def __contains__(self, node_id):
+        return node_id in self._core.index
+
+    def __iter__(self):
+        return iter(self._core.ids)
+
+    def __len__(self):
+        return len(self._core.ids)
+
+
+def to_networkx(cgu):
+    """A read-only ``networkx.DiGraph`` view of ``cgu``, without copying.
+
+    Node and edge attributes are the data dicts of ``V`` and ``E``.
+    Mutating the returned graph raises ``NetworkXError``; use
+    ``G.to_undirected(as_view=True)`` for an undirected view.
+
+    Parameters
+    ----------
+    cgu : CwnGraphUtils
+
+    Returns
+    -------
+    networkx.DiGraph
+        a frozen graph, valid until the graph of ``cgu`` changes
+    """
+    import networkx as nx
+
+    core = cgu.core
+    G = nx.DiGraph()
+    G.graph.update(cgu.meta)
+    G._node = NodeView(cgu, core)
+    G._adj = AdjacencyView(cgu, core)
+    G._pred = AdjacencyView(cgu, core, reverse=True)
+    return nx.freeze(G)
+
+
+def edge_list(cgu, relation_types=None):
+    """Integer edges of ``cgu``, requires numpy.
+
+    Parameters
+    ----------
+    cgu : CwnGraphUtils
+    relation_types : list, optional
+        only keep edges of these types (names or ``CwnRelationType``)
+
+    Returns
+    -------
+    tuple
+        the node ids (position = vertex number), an ``(n_edges, 2)``
+        int32 array of (source, target) vertex numbers, and the list of
+        edge type names
+
+    Examples
+    --------
+    >>> ids, edges, edge_types = edge_list(cwn)
+    >>> g = graph_tool.Graph(directed=True)
+    >>> g.add_vertex(len(ids))
+    >>> g.add_edge_list(edges)
+    """
+    import numpy as np
+
+    core = cgu.core
+    offsets = np.frombuffer(core.out_offsets, dtype=np.int32)
+    sources = np.repeat(np.arange(len(core.ids), dtype=np.int32),
+                        np.diff(offsets))
+    targets = np.frombuffer(core.out_targets, dtype=np.int32)
+    etypes = np.frombuffer(core.out_types, dtype=np.int16)
+    if relation_types is not None:
+        names = set(getattr(x, "name", x) for x in relation_types)
+        type_mask = np.array([x in names for x in core.edge_type_names],
+                             dtype=bool)
+        edge_mask = type_mask[etypes]
+        sources, targets, etypes = \
+            sources[edge_mask], targets[edge_mask], etypes[edge_mask]
+
+    edges = np.stack([sources, targets], axis=1)
+    type_names = core.edge_type_names
+    return list(core.ids), edges, [type_names[x] for x in etypes]
+
+
+def to_igraph(cgu, relation_types=None):
+    """Export ``cgu`` to a directed ``igraph.Graph``.
+
+    Vertices have the ``name`` (node id) and ``node_type`` attributes,
+    edges have ``edge_type``. Other node and edge data are not copied;
+    look them up in ``cgu.V`` and ``cgu.E`` by name.
+
+    Parameters
+    ----------
+    cgu : CwnGraphUtils
+    relation_types : list, optional
+        only keep edges of these types (names or ``CwnRelationType``)
+
+    Returns
+    -------
+    igraph.Graph
+    """
+    import igraph
+
+    ids, edges, edge_types = edge_list(cgu, relation_types)
+    core = cgu.core
+    type_names = core.node_type_names
+    G = igraph.Graph(n=len(ids), edges=edges, directed=True)
+    G.vs["name"] = ids
+    G.vs["node_type"] = [type_names[x] if x >= 0 else None
+                         for x in core.node_types]
+    G.es["edge_type"] = edge_types
+    return G
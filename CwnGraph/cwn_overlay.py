@@ -0,0 +1,357 @@
+"""Edit sessions on top of a shared, read-only image.
+
+An :class:`OverlayImage` keeps its edits in a small delta over a base
+image: queries see the merged view, the base is only written on
+:meth:`OverlayImage.commit`. Several sessions can share one base image.
+
+Examples
+--------
+>>> session = cwn.overlay()
+>>> lemma = CwnLemma.create(session, "999001", "新詞", "ㄒㄧㄣ ㄘˊ")
+>>> session.add_node(lemma)
+>>> session.diff()
+>>> session.commit()  # or session.rollback()
+"""
+from collections.abc import Mapping, MutableMapping
+from .cwn_graph_utils import CwnGraphUtils, PostingIndex
+
+
+class OverlayMapping(MutableMapping):
+    """``base`` with the entries of ``delta`` added or replaced and the
+    keys in ``removed`` deleted. ``base`` is never written, but may
+    change under the overlay (e.g. another session committing): whether
+    a key is new is always decided against the current ``base``.
+    Iteration follows ``base``, then the new keys in insertion order.
+
+    The new and removed keys are counted as they are edited, and
+    recounted when ``base_version()`` changes (by default ``len(base)``).
+    """
+    def __init__(self, base, base_version=None):
+        self.base = base
+        self.base_version = base_version or base.__len__
+        self.delta = {}
+        self.removed = set()
+        # (base version, number of new keys, number of removed base keys)
+        self._counts = (self.base_version(), 0, 0)
+
+    def __repr__(self):
+        return f"<OverlayMapping: {len(self)} entries, {len(self.delta)} " \
+               f"changed, {len(self.removed)} removed>"
+
+    def __getitem__(self, key):
+        delta = self.delta
+        if key in delta:
+            return delta[key]
+        if key in self.removed:
+            raise KeyError(key)
+        return self.base[key]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key):
+        if key in self.delta:
+            return True
+        return key not in self.removed and key in self.base
+
+    def _current_counts(self):
+        version, n_new, n_removed = self._counts
+        base_version = self.base_version()
+        if version != base_version:
+            base = self.base
+            n_new = sum(1 for key in self.delta if key not in base)
+            n_removed = sum(1 for key in self.removed if key in base)
+            self._counts = (base_version, n_new, n_removed)
+        return self._counts
+
+    def __len__(self):
+        _, n_new, n_removed = self._current_counts()
+        return len(self.base) - n_removed + n_new
+
+    def __iter__(self):
+        removed = self.removed
+        base = self.base
+        for key in base:
+            if key not in removed:
+                yield key
+        for key in self.delta:
+            if key not in base:
+                yield key
+
+    def __setitem__(self, key, value):
+        version, n_new, n_removed = self._current_counts()
+        if key in self.base:
+            if key in self.removed:
+                self.removed.discard(key)
+                n_removed -= 1
+        elif key not in self.delta:
+            n_new += 1
+        self.delta[key] = value
+        self._counts = (version, n_new, n_removed)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        version, n_new, n_removed = self._current_counts()
+        if key in self.base:
+            self.delta.pop(key, None)
+            self.removed.add(key)
+            n_removed += 1
+        else:
+            del self.delta[key]
+            n_new -= 1
+        self._counts = (version, n_new, n_removed)
+
+    def is_new(self, key):
+        return key in self.delta and key not in self.base
+
+    def clear_delta(self):
+        self.delta = {}
+        self.removed = set()
+        self._counts = (self.base_version(), 0, 0)
+
+
+class OverlayIndex(Mapping):
+    """An edge index (node id -> tuple of edge keys) over a base index.
+    The edges added and removed by edits are kept per node, and merged on
+    read with the current posting of the base, so that edges committed to
+    the base by other sessions show up.
+
+    The keys gained or lost by the edits are counted as they are made,
+    and recounted when ``base_version()`` changes (by default
+    ``len(base)``).
+    """
+    def __init__(self, base, base_version=None):
+        self.base = base
+        self.base_version = base_version or base.__len__
+        self.added = {}
+        self.removed = {}
+        # (base version, number of keys gained minus keys lost)
+        self._count = (self.base_version(), 0)
+
+    def __getitem__(self, key):
+        edges = self.get(key)
+        if edges is None:
+            raise KeyError(key)
+        return edges
+
+    def get(self, key, default=None):
+        base_edges = self.base.get(key, ())
+        added = self.added.get(key)
+        removed = self.removed.get(key)
+        if added is None and removed is None:
+            return base_edges or default
+        removed = removed or ()
+        edges = tuple(x for x in base_edges if x not in removed)
+        if added:
+            base_set = set(base_edges)
+            edges += tuple(x for x in added if x not in base_set)
+        return edges or default
+
+    def __iter__(self):
+        base = self.base
+        for key in base:
+            if key not in self.removed or self.get(key):
+                yield key
+        for key in self.added:
+            if key not in base and self.get(key):
+                yield key
+
+    def _has_key(self, key):
+        # as iterated by __iter__
+        if key in self.base and key not in self.removed:
+            return True
+        return bool(self.get(key))
+
+    def _current_count(self):
+        version, n_diff = self._count
+        base_version = self.base_version()
+        if version != base_version:
+            base = self.base
+            n_diff = sum(self._has_key(key) - (key in base)
+                         for key in set(self.added) | set(self.removed))
+            self._count = (base_version, n_diff)
+        return self._count
+
+    def __len__(self):
+        return len(self.base) + self._current_count()[1]
+
+    def add(self, key, edge):
+        version, n_diff = self._current_count()
+        had_key = self._has_key(key)
+        self.added.setdefault(key, {})[edge] = None
+        removed = self.removed.get(key)
+        if removed:
+            removed.discard(edge)
+        self._count = (version, n_diff + self._has_key(key) - had_key)
+
+    def discard(self, key, edge):
+        version, n_diff = self._current_count()
+        had_key = self._has_key(key)
+        added = self.added.get(key)
+        if added:
+            added.pop(edge, None)
+        self.removed.setdefault(key, set()).add(edge)
+        self._count = (version, n_diff + self._has_key(key) - had_key)
+
+    def clear_delta(self):
+        self.added = {}
+        self.removed = {}
+        self._count = (self.base_version(), 0)
+
+
+class OverlayImage(CwnGraphUtils):
+    """An edit session over ``base``, a loaded image.
+
+    Edits made with ``add_node``, ``add_edge``, ``update_node``,
+    ``remove_node`` and ``remove_edge`` go to ``V`` and ``E``, which are
+    :class:`OverlayMapping` views of the base. Node data dicts of the
+    base are never modified: updates store a new dict in the delta. The
+    edge indexes are :class:`OverlayIndex` views; traversals go through
+    ``find_edges`` (``use_core = False``) rather than rebuilding the
+    integer core after each edit. Editing a lemma node still rebuilds
+    ``lemma_matcher``, ``lemma_automaton`` and ``phonetic_index`` on
+    their next use.
+    """
+    use_core = False
+
+    def __init__(self, base):
+        self.base = base
+        super(OverlayImage, self).__init__(
+            OverlayMapping(base.V, base.graph_version),
+            OverlayMapping(base.E, base.graph_version), dict(base.meta))
+
+    def __repr__(self):
+        changes = self.diff()
+        n_changes = sum(len(x) for x in changes.values())
+        return f"<OverlayImage: {n_changes} changes over {self.base!r}>"
+
+    def build_edge_indexes(self):
+        base = self.base
+        return (OverlayIndex(base.edge_src_index, base.graph_version),
+                OverlayIndex(base.edge_tgt_index, base.graph_version))
+
+    def graph_version(self):
+        return (self._version, self.base.graph_version(),
+                len(self.V), len(self.E))
+
+    @property
+    def node_type_index(self):
+        """node_type -> tuple of node ids, derived from the index of the
+        base and the delta, rebuilt when the graph version changes."""
+        graph_version = self.graph_version()
+        entry = self._node_type_index
+        if entry is None or entry[0] != graph_version:
+            entry = (graph_version, self._merge_node_type_index())
+            self._node_type_index = entry
+        return entry[1]
+
+    def _merge_node_type_index(self):
+        V = self.V
+        base_V = self.base.V
+        index = dict(self.base.node_type_index)
+        touched = set()
+        for nid in V.removed:
+            if nid in base_V:
+                touched.add(base_V[nid].get("node_type"))
+        for nid, ndata in V.delta.items():
+            if nid in base_V:
+                base_type = base_V[nid].get("node_type")
+                if ndata.get("node_type") != base_type:
+                    # a node changing type moves between partitions
+                    return CwnGraphUtils.node_type_index.fget(self)
+        for node_type in touched:
+            index[node_type] = tuple(nid for nid in index.get(node_type, ())
+                                     if nid in V)
+        new_ids = {}
+        for nid, ndata in V.delta.items():
+            if nid not in base_V:
+                new_ids.setdefault(ndata.get("node_type"), []).append(nid)
+        for node_type, ids in new_ids.items():
+            index[node_type] = index.get(node_type, ()) + tuple(ids)
+        return PostingIndex(index)
+
+    @property
+    def lemma_index(self):
+        """lemma string -> tuple of lemma ids, derived from the index of
+        the base and the delta, rebuilt when the graph version changes."""
+        graph_version = self.graph_version()
+        entry = self._lemma_index
+        if entry is None or entry[0] != graph_version:
+            entry = (graph_version, self._merge_lemma_index())
+            self._lemma_index = entry
+        return entry[1]
+
+    def _merge_lemma_index(self):
+        V = self.V
+        base_V = self.base.V
+        index = dict(self.base.lemma_index)
+        touched = set()
+        for nid in [x for x in V.removed if x in base_V] + \
+                   [x for x in V.delta if x in base_V]:
+            base_data = base_V[nid]
+            if base_data.get("node_type") == "lemma":
+                touched.add(base_data.get("lemma"))
+            if nid in V and V[nid].get("node_type") == "lemma":
+                touched.add(V[nid].get("lemma"))
+        for lemma in touched:
+            index.pop(lemma, None)
+        if touched:
+            # regroup the touched lemmas, in V order
+            for nid in self.node_ids("lemma"):
+                lemma = V[nid]["lemma"]
+                if lemma in touched:
+                    index[lemma] = index.get(lemma, ()) + (nid,)
+        for nid, ndata in V.delta.items():
+            if nid not in base_V and ndata.get("node_type") == "lemma" and \
+               ndata["lemma"] not in touched:
+                lemma = ndata["lemma"]
+                index[lemma] = index.get(lemma, ()) + (nid,)
+        return PostingIndex(index)
+
+    def diff(self):
+        """The changes of this session.
+
+        Returns
+        -------
+        dict
+            lists of ids under ``nodes_added``, ``nodes_updated``,
+            ``nodes_removed``, ``edges_added``, ``edges_updated`` and
+            ``edges_removed``
+        """
+        changes = {}
+        for kind, view in (("nodes", self.V), ("edges", self.E)):
+            changes[kind + "_added"] = [x for x in view.delta if view.is_new(x)]
+            changes[kind + "_updated"] = [x for x in view.delta
+                                          if not view.is_new(x)]
+            changes[kind + "_removed"] = list(view.removed)
+        return changes
+
+    def commit(self):
+        """Apply the changes to the base image, through its ``add_``,
+        ``update_`` and ``remove_`` methods, and start a new delta.
+        Sessions editing the same nodes or edges: the last commit wins."""
+        base = self.base
+        V, E = self.V, self.E
+        for edge in list(E.removed):
+            if edge in base.E:
+                base.remove_edge(edge)
+        for nid in list(V.removed):
+            if nid in base.V:
+                base.remove_node(nid)
+        for nid, ndata in list(V.delta.items()):
+            base.add_node(nid, ndata)
+        for edge, edata in list(E.delta.items()):
+            base.add_edge(edge, edata)
+        self.rollback()
+
+    def rollback(self):
+        """Drop the changes of this session."""
+        self.V.clear_delta()
+        self.E.clear_delta()
+        self.edge_src_index.clear_delta()
+        self.edge_tgt_index.clear_delta()
+        self.invalidate_caches()
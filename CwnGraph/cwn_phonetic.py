@@ -0,0 +1,221 @@
+"""Lemma lookup by pronunciation.
+
+The ``zhuyin`` of each lemma is indexed under four keys: toned and
+toneless zhuyin, and toned (numbered) and toneless pinyin derived from
+it, e.g. ``"ㄓㄨㄥ ㄨㄣˊ"``, ``"ㄓㄨㄥ ㄨㄣ"``, ``"zhong1 wen2"`` and
+``"zhong wen"``. Syllables are separated by single spaces. In pinyin,
+ü is written ``v`` (``nv3``, but ``ju4``).
+"""
+import re
+import bisect
+import unicodedata
+
+ZHUYIN_TONES = {"ˉ": "1", "ˊ": "2", "ˇ": "3", "ˋ": "4", "˙": "5"}
+ZHUYIN_TONE_MARKS = {"1": "", "2": "ˊ", "3": "ˇ", "4": "ˋ", "5": "˙"}
+ZHUYIN_INITIALS = {
+    "ㄅ": "b", "ㄆ": "p", "ㄇ": "m", "ㄈ": "f", "ㄉ": "d", "ㄊ": "t",
+    "ㄋ": "n", "ㄌ": "l", "ㄍ": "g", "ㄎ": "k", "ㄏ": "h", "ㄐ": "j",
+    "ㄑ": "q", "ㄒ": "x", "ㄓ": "zh", "ㄔ": "ch", "ㄕ": "sh", "ㄖ": "r",
+    "ㄗ": "z", "ㄘ": "c", "ㄙ": "s"}
+ZHUYIN_FINALS = {
+    "ㄚ": "a", "ㄛ": "o", "ㄜ": "e", "ㄝ": "e", "ㄞ": "ai", "ㄟ": "ei",
+    "ㄠ": "ao", "ㄡ": "ou", "ㄢ": "an", "ㄣ": "en", "ㄤ": "ang",
+    "ㄥ": "eng", "ㄦ": "er", "ㄧ": "i", "ㄨ": "u", "ㄩ": "v",
+    "ㄧㄚ": "ia", "ㄧㄛ": "io", "ㄧㄝ": "ie", "ㄧㄞ": "iai", "ㄧㄠ": "iao",
+    "ㄧㄡ": "iu", "ㄧㄢ": "ian", "ㄧㄣ": "in", "ㄧㄤ": "iang", "ㄧㄥ": "ing",
+    "ㄨㄚ": "ua", "ㄨㄛ": "uo", "ㄨㄞ": "uai", "ㄨㄟ": "ui", "ㄨㄢ": "uan",
+    "ㄨㄣ": "un", "ㄨㄤ": "uang", "ㄨㄥ": "ong",
+    "ㄩㄝ": "ve", "ㄩㄢ": "van", "ㄩㄣ": "vn", "ㄩㄥ": "iong"}
+# finals without an initial
+ZHUYIN_SYLLABLES = {
+    "ㄧ": "yi", "ㄧㄚ": "ya", "ㄧㄛ": "yo", "ㄧㄝ": "ye", "ㄧㄞ": "yai",
+    "ㄧㄠ": "yao", "ㄧㄡ": "you", "ㄧㄢ": "yan", "ㄧㄣ": "yin",
+    "ㄧㄤ": "yang", "ㄧㄥ": "ying",
+    "ㄨ": "wu", "ㄨㄚ": "wa", "ㄨㄛ": "wo", "ㄨㄞ": "wai", "ㄨㄟ": "wei",
+    "ㄨㄢ": "wan", "ㄨㄣ": "wen", "ㄨㄤ": "wang", "ㄨㄥ": "weng",
+    "ㄩ": "yu", "ㄩㄝ": "yue", "ㄩㄢ": "yuan", "ㄩㄣ": "yun", "ㄩㄥ": "yong"}
+# initials read with an empty rhyme: zhi, chi, shi, ri, zi, ci, si
+APICAL_INITIALS = set("ㄓㄔㄕㄖㄗㄘㄙ")
+PINYIN_TONE_MARKS = {"̄": "1", "́": "2", "̌": "3", "̀": "4"}
+READING_SEP_RE = re.compile(r"[,，、;；/／]")
+
+KINDS = ("zhuyin", "zhuyin_toneless", "pinyin", "pinyin_toneless")
+
+
+def is_zhuyin(text):
+    return any("㄀" <= ch <= "ㄯ" for ch in text)
+
+
+def split_zhuyin_syllable(syllable):
+    """Return the initial, the final and the tone number of a syllable."""
+    tone = "1"
+    chars = []
+    for ch in syllable:
+        if ch in ZHUYIN_TONES:
+            tone = ZHUYIN_TONES[ch]
+        else:
+            chars.append(ch)
+    body = "".join(chars)
+    if body[:1] in ZHUYIN_INITIALS:
+        return body[0], body[1:], tone
+    return "", body, tone
+
+
+def zhuyin_syllable_to_pinyin(syllable):
+    """Toneless pinyin and tone number of a zhuyin syllable."""
+    initial, final, tone = split_zhuyin_syllable(syllable)
+    if not initial:
+        pinyin = ZHUYIN_SYLLABLES.get(final) or ZHUYIN_FINALS.get(final)
+    elif not final:
+        pinyin = ZHUYIN_INITIALS[initial] + \
+            ("i" if initial in APICAL_INITIALS else "")
+    else:
+        pinyin_final = ZHUYIN_FINALS.get(final)
+        if pinyin_final and initial in "ㄐㄑㄒ":
+            # ü is written u after j, q and x
+            pinyin_final = pinyin_final.replace("v", "u")
+        pinyin = ZHUYIN_INITIALS[initial] + pinyin_final \
+            if pinyin_final else None
+    if pinyin is None:
+        # not a standard syllable, transliterate symbol by symbol
+        pinyin = ZHUYIN_INITIALS.get(initial, initial) + \
+            "".join(ZHUYIN_FINALS.get(ch, ch) for ch in final)
+    return pinyin, tone
+
+
+def zhuyin_keys(zhuyin):
+    """The four index keys of a zhuyin reading, as a dict by kind."""
+    # not NFKC: it would turn the neutral tone mark into a space
+    syllables = zhuyin.replace("\u3000", " ").split()
+    toned, toneless, pinyin, pinyin_toneless = [], [], [], []
+    for syllable in syllables:
+        initial, final, tone = split_zhuyin_syllable(syllable)
+        if not initial and not final:
+            continue
+        mark = ZHUYIN_TONE_MARKS[tone]
+        # the neutral tone mark comes first, the others last
+        toned.append(mark + initial + final if tone == "5"
+                     else initial + final + mark)
+        toneless.append(initial + final)
+        syllable_pinyin, tone = zhuyin_syllable_to_pinyin(syllable)
+        pinyin.append(syllable_pinyin + tone)
+        pinyin_toneless.append(syllable_pinyin)
+    return {"zhuyin": " ".join(toned),
+            "zhuyin_toneless": " ".join(toneless),
+            "pinyin": " ".join(pinyin),
+            "pinyin_toneless": " ".join(pinyin_toneless)}
+
+
+def normalize_pinyin(query):
+    """Lowercase pinyin with numbered tones, tone marks and ü converted:
+    ``"Zhōng wén"`` -> ``"zhong1 wen2"``."""
+    syllables = []
+    for syllable in unicodedata.normalize("NFD", query.lower()).split():
+        tone = ""
+        chars = []
+        for ch in syllable:
+            if ch in PINYIN_TONE_MARKS:
+                tone = PINYIN_TONE_MARKS[ch]
+            elif ch == "̈":
+                # u + diaeresis
+                if chars and chars[-1] == "u":
+                    chars[-1] = "v"
+            else:
+                chars.append(ch)
+        syllables.append("".join(chars).replace("u:", "v") + tone)
+    return " ".join(syllables)
+
+
+class PhoneticIndex:
+    """Lemma ids by pronunciation, for exact, prefix and homophone queries.
+
+    Parameters
+    ----------
+    readings : iterable
+        ``(lemma_id, zhuyin)`` pairs. A zhuyin field with several
+        readings separated by commas or slashes is indexed under each.
+    """
+    def __init__(self, readings):
+        self.indexes = {kind: {} for kind in KINDS}
+        self.readings = {}
+        for lemma_id, zhuyin in readings:
+            for reading in READING_SEP_RE.split(zhuyin or ""):
+                keys = zhuyin_keys(reading)
+                if not keys["zhuyin"]:
+                    continue
+                self.readings.setdefault(lemma_id, []).append(keys)
+                for kind, key in keys.items():
+                    postings = self.indexes[kind].setdefault(key, [])
+                    if lemma_id not in postings:
+                        postings.append(lemma_id)
+        self.indexes = {kind: {k: tuple(v) for k, v in index.items()}
+                        for kind, index in self.indexes.items()}
+        self.sorted_keys = {kind: sorted(index)
+                            for kind, index in self.indexes.items()}
+
+    def __repr__(self):
+        return f"<PhoneticIndex: {len(self.readings)} lemmas, " \
+               f"{len(self.indexes['zhuyin'])} readings>"
+
+    @classmethod
+    def from_graph(cls, cgu):
+        V = cgu.V
+        return cls((nid, V[nid].get("zhuyin", "")) for nid in cgu.node_ids("lemma"))
+
+    def query_key(self, query):
+        """The index kind and the key of a zhuyin or pinyin query. The
+        query is toneless unless it has a tone mark or number; write ``ˉ``
+        or ``1`` for an explicit first tone."""
+        if is_zhuyin(query):
+            keys = zhuyin_keys(query)
+            has_tone = any(ch in ZHUYIN_TONES for ch in query)
+            if has_tone:
+                return "zhuyin", keys["zhuyin"]
+            return "zhuyin_toneless", keys["zhuyin_toneless"]
+        key = normalize_pinyin(query)
+        if any(ch.isdigit() for ch in key):
+            return "pinyin", key
+        return "pinyin_toneless", key
+
+    def find(self, query, prefix=False):
+        """Lemma ids pronounced ``query`` (zhuyin or pinyin).
+
+        Parameters
+        ----------
+        query : str
+            e.g. ``"ㄓㄨㄥ ㄨㄣˊ"``, ``"ㄓㄨㄥ ㄨㄣ"``, ``"zhong1 wen2"``
+            or ``"zhōng wén"``
+        prefix : bool, optional
+            match the readings starting with ``query``, by default False
+
+        Returns
+        -------
+        list
+            lemma ids, grouped by reading in key order
+        """
+        kind, key = self.query_key(query)
+        index = self.indexes[kind]
+        if not prefix:
+            return list(index.get(key, ()))
+        keys = self.sorted_keys[kind]
+        ret = []
+        seen = set()
+        for i in range(bisect.bisect_left(keys, key), len(keys)):
+            if not keys[i].startswith(key):
+                break
+            for lemma_id in index[keys[i]]:
+                if lemma_id not in seen:
+                    seen.add(lemma_id)
+                    ret.append(lemma_id)
+        return ret
+
+    def homophones(self, lemma_id, tone=True):
+        """Ids of the other lemmas sharing a reading with ``lemma_id``,
+        with the same tones unless ``tone`` is False."""
+        kind = "zhuyin" if tone else "zhuyin_toneless"
+        ret = []
+        for keys in self.readings.get(lemma_id, ()):
+            for other_id in self.indexes[kind][keys[kind]]:
+                if other_id != lemma_id and other_id not in ret:
+                    ret.append(other_id)
+        return ret
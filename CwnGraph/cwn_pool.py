@@ -0,0 +1,190 @@
+"""Run CwnGraphUtils queries in worker processes.
+
+Workers hold their own image in the module-level ``_worker_image``. When
+the platform supports ``fork``, the parent image is inherited by the
+workers as-is (copy-on-write pages, nothing is pickled); otherwise the
+image is written once to a temporary file and loaded by each worker.
+
+Query results cannot be sent back as node objects, since a pickled
+``CwnSense`` drags its whole image along. The nodes and relations in a
+result, also within lists, tuples, sets and dicts, are encoded into their
+ids in the worker and rebound to the parent image by ``decode_result``.
+"""
+import os
+import atexit
+import pickle
+import tempfile
+import multiprocessing as mp
+from collections import deque, namedtuple
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from .cwn_types import (
+    CwnGlyph, CwnLemma, CwnSense, CwnFacet,
+    CwnSynset, PwnSynset, CwnRelation)
+
+NODE_CLASSES = {cls.__name__: cls for cls in (
+    CwnGlyph, CwnLemma, CwnSense, CwnFacet, CwnSynset, PwnSynset)}
+# nodes and relations in encoded results; distinct types, so that a
+# plain tuple in a result is never taken for one
+EncodedNode = namedtuple("EncodedNode", ["node_class", "node_id"])
+EncodedRelation = namedtuple("EncodedRelation", ["edge_id", "reversed"])
+
+_worker_image = None
+
+def init_worker(image_or_path):
+    global _worker_image
+    if isinstance(image_or_path, (str, os.PathLike)):
+        from .cwn_base import CwnImage, load_cwn_image
+        V, E, meta = load_cwn_image(image_or_path)
+        _worker_image = CwnImage(V, E, meta)
+    else:
+        _worker_image = image_or_path
+
+def encode_result(ret):
+    if isinstance(ret, CwnRelation):
+        return EncodedRelation(ret.id, ret.reversed)
+    elif type(ret).__name__ in NODE_CLASSES:
+        return EncodedNode(type(ret).__name__, ret.id)
+    elif isinstance(ret, list):
+        return [encode_result(x) for x in ret]
+    elif isinstance(ret, tuple):
+        # e.g. the (CwnSense, score) pairs of nearest_senses
+        return rebuild_tuple(ret, (encode_result(x) for x in ret))
+    elif isinstance(ret, (set, frozenset)):
+        return type(ret)(encode_result(x) for x in ret)
+    elif isinstance(ret, dict):
+        return {k: encode_result(v) for k, v in ret.items()}
+    else:
+        # ids, numbers and strings are already picklable
+        return ret
+
+def decode_result(ret, cgu):
+    if isinstance(ret, EncodedNode):
+        return NODE_CLASSES[ret.node_class](ret.node_id, cgu)
+    elif isinstance(ret, EncodedRelation):
+        return CwnRelation(ret.edge_id, cgu, reversed=ret.reversed)
+    elif isinstance(ret, list):
+        return [decode_result(x, cgu) for x in ret]
+    elif isinstance(ret, tuple):
+        return rebuild_tuple(ret, (decode_result(x, cgu) for x in ret))
+    elif isinstance(ret, (set, frozenset)):
+        return type(ret)(decode_result(x, cgu) for x in ret)
+    elif isinstance(ret, dict):
+        return {k: decode_result(v, cgu) for k, v in ret.items()}
+    return ret
+
+def rebuild_tuple(ret, items):
+    # namedtuples take their fields as arguments
+    if hasattr(ret, "_fields"):
+        return type(ret)(*items)
+    return type(ret)(items)
+
+def bind_query(cgu, method):
+    # a method name, or a module-level function taking the image first
+    if callable(method):
+        return lambda *args, **kwargs: method(cgu, *args, **kwargs)
+    return getattr(cgu, method)
+
+def run_query(method, args=(), kwargs=None):
+    query_func = bind_query(_worker_image, method)
+    return encode_result(query_func(*args, **(kwargs or {})))
+
+def run_query_chunk(queries):
+    return [run_query(*query_x) for query_x in queries]
+
+def normalize_query(query, method=None):
+    if method is not None:
+        return (method, (query,), None)
+    if isinstance(query, str) or not 2 <= len(query) <= 3:
+        raise ValueError("a query is (method, args) or (method, args, kwargs): "
+                         f"{query!r}")
+    method, args, *kwargs = query
+    if not isinstance(args, (tuple, list)):
+        args = (args,)
+    return (method, tuple(args), kwargs[0] if kwargs else None)
+
+def map_queries(cgu, queries, method=None, workers=None,
+        chunksize=64, max_pending=None):
+    """Run a stream of queries in worker processes, see
+    :meth:`CwnImage.map_queries <CwnGraph.cwn_base.CwnImage.map_queries>`.
+    """
+    queries = (normalize_query(x, method) for x in queries)
+    if workers == 1:
+        for method_x, args, kwargs in queries:
+            yield bind_query(cgu, method_x)(*args, **(kwargs or {}))
+        return
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if max_pending is None:
+        max_pending = 2 * workers
+    image_path = None
+    if not can_fork():
+        image_path = dump_worker_image(cgu)
+    pool = make_process_pool(cgu, workers, image_path)
+    try:
+        for rets in map_bounded(pool, run_query_chunk, queries,
+                                chunksize, max_pending):
+            for ret in rets:
+                yield decode_result(ret, cgu)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        if image_path is not None:
+            os.remove(image_path)
+
+def map_bounded(pool, func, items, chunksize, max_pending):
+    """Yield ``func(chunk)``, run in ``pool``, for the chunks of
+    ``chunksize`` items of ``items``, in order. Only ``max_pending``
+    chunks are kept in flight: the input is consumed as fast as the
+    results are."""
+    items = iter(items)
+    pending = deque()
+    while True:
+        while len(pending) < max_pending:
+            chunk = list(islice(items, chunksize))
+            if not chunk:
+                break
+            pending.append(pool.submit(func, chunk))
+        if not pending:
+            break
+        yield pending.popleft().result()
+
+def can_fork():
+    return "fork" in mp.get_all_start_methods()
+
+def dump_worker_image(cgu):
+    """Write ``cgu`` to a temporary file for spawned workers; the caller
+    removes it."""
+    fd, image_path = tempfile.mkstemp(prefix="cwn-pool-", suffix=".pyobj")
+    with os.fdopen(fd, "wb") as fout:
+        pickle.dump((cgu.V, cgu.E, cgu.meta), fout)
+    return image_path
+
+def make_process_pool(cgu, max_workers=None, image_path=None):
+    """Create a ``ProcessPoolExecutor`` whose workers hold ``cgu``.
+
+    Parameters
+    ----------
+    cgu : CwnGraphUtils
+        the image shared with the workers
+    max_workers : int, optional
+        number of worker processes, by default ``os.cpu_count()``
+    image_path : str, optional
+        without ``fork``, the file workers load ``cgu`` from (see
+        ``dump_worker_image``), owned by the caller; by default a
+        temporary file removed at exit
+
+    Returns
+    -------
+    ProcessPoolExecutor
+    """
+    if can_fork():
+        return ProcessPoolExecutor(max_workers,
+            mp_context=mp.get_context("fork"),
+            initializer=init_worker, initargs=(cgu,))
+
+    if image_path is None:
+        image_path = dump_worker_image(cgu)
+        atexit.register(os.remove, image_path)
+    return ProcessPoolExecutor(max_workers,
+            initializer=init_worker, initargs=(image_path,))
@@ -0,0 +1,311 @@
+"""Compound sense queries.
+
+A :class:`SenseQuery` collects predicates and plans them before running:
+predicates backed by an index (lemma index, POS, domain and relation
+bitmaps) produce candidate bitmaps, which are intersected smallest
+first; the other predicates then filter the remaining
+candidates on their raw node data. ``CwnSense`` objects are only built
+for the returned page.
+
+Examples
+--------
+>>> cwn.query().pos("Na", "Nb").related("hypernym", "05142101").limit(20).all()
+"""
+import re
+from .cwn_examples import strip_markers
+from .cwn_types import CwnSense
+
+
+class Predicate:
+    """A query condition. Indexed predicates return the
+    :class:`SenseBitmap <CwnGraph.cwn_bitmap.SenseBitmap>` of their
+    senses from ``bitmap``; the others return None and are checked by
+    ``match`` on each candidate."""
+    name = "predicate"
+
+    def bitmap(self, cgu):
+        return None
+
+    def match(self, node_id, ndata):
+        return True
+
+    def __repr__(self):
+        return f"{self.name}"
+
+
+class LemmaPredicate(Predicate):
+    name = "lemma"
+
+    def __init__(self, lemma):
+        self.lemma = lemma
+
+    def __repr__(self):
+        return f"lemma == {self.lemma!r}"
+
+    def bitmap(self, cgu):
+        return cgu.sense_bitmaps.from_ids(cgu.lemma_sense_ids(self.lemma))
+
+
+class LemmaRegexPredicate(Predicate):
+    name = "lemma_regex"
+
+    def __init__(self, pattern):
+        self.pattern = re.compile(pattern)
+
+    def __repr__(self):
+        return f"lemma ~ {self.pattern.pattern!r}"
+
+    def bitmap(self, cgu):
+        # scans the distinct lemma strings, not the nodes
+        ids = []
+        for lemma in cgu.lemma_index:
+            if self.pattern.search(lemma) is not None:
+                ids.extend(cgu.lemma_sense_ids(lemma))
+        return cgu.sense_bitmaps.from_ids(ids)
+
+
+class FieldPredicate(Predicate):
+    """Node data ``field`` has one of ``values`` (one of its tags, for
+    the comma-joined ``pos``), or its whole value matches ``pattern``."""
+    def __init__(self, field, values=None, pattern=None):
+        self.name = field
+        self.field = field
+        self.values = frozenset(values) if values is not None else None
+        self.pattern = re.compile(pattern) if pattern is not None else None
+
+    def __repr__(self):
+        if self.pattern is not None:
+            return f"{self.field} ~ {self.pattern.pattern!r}"
+        return f"{self.field} in {sorted(self.values)}"
+
+    def bitmap(self, cgu):
+        index = cgu.sense_bitmaps
+        if self.pattern is None:
+            return index._union(index.values(self.field), self.values)
+        values = index.values(self.field, split=False)
+        return index._union(values, [x for x in values
+                                     if self.pattern.search(x) is not None])
+
+
+class RelationPredicate(Predicate):
+    """Senses with an outgoing ``relation_type`` edge, to ``target_id``
+    if given: ``related("hypernym", x)`` are the senses whose hypernym
+    is ``x``."""
+    name = "related"
+
+    def __init__(self, relation_type, target_id=None):
+        self.relation_type = getattr(relation_type, "name", relation_type)
+        self.target_id = target_id
+
+    def __repr__(self):
+        if self.target_id is None:
+            return f"has {self.relation_type}"
+        return f"{self.relation_type} -> {self.target_id!r}"
+
+    def bitmap(self, cgu):
+        index = cgu.sense_bitmaps
+        if self.target_id is None:
+            return index.relation(self.relation_type)
+        E = cgu.E
+        return index.from_ids(src for src, tgt
+                              in cgu.edge_tgt_index.get(self.target_id, ())
+                              if E[(src, tgt)].get("edge_type") == self.relation_type)
+
+
+class DefinitionPredicate(Predicate):
+    name = "definition"
+
+    def __init__(self, text):
+        self.text = text
+
+    def __repr__(self):
+        return f"definition contains {self.text!r}"
+
+    def match(self, node_id, ndata):
+        return self.text in ndata.get("def", "")
+
+
+class ExamplePredicate(Predicate):
+    name = "examples"
+
+    def __init__(self, text):
+        self.text = text
+
+    def __repr__(self):
+        return f"examples contain {self.text!r}"
+
+    def match(self, node_id, ndata):
+        text = self.text
+        return any(text in strip_markers(x) for x in ndata.get("examples", []))
+
+
+class FunctionPredicate(Predicate):
+    name = "where"
+
+    def __init__(self, func):
+        self.func = func
+
+    def __repr__(self):
+        return f"where {getattr(self.func, '__name__', 'func')}"
+
+    def match(self, node_id, ndata):
+        return self.func(node_id, ndata)
+
+
+class SenseQuery:
+    """A compound query over the senses of ``cgu``, see :mod:`CwnGraph.cwn_query`.
+
+    Predicate methods return the query itself, so they can be chained;
+    all predicates must hold. Results are in ``V`` order.
+    """
+    def __init__(self, cgu):
+        self.cgu = cgu
+        self.predicates = []
+        self._limit = None
+        self._offset = 0
+
+    def __repr__(self):
+        return f"<SenseQuery: {' AND '.join(map(repr, self.predicates)) or 'all'}>"
+
+    def __iter__(self):
+        return iter(self.all())
+
+    def where(self, func):
+        """Keep the senses for which ``func(node_id, node_data)`` is true."""
+        if isinstance(func, Predicate):
+            self.predicates.append(func)
+        else:
+            self.predicates.append(FunctionPredicate(func))
+        return self
+
+    def lemma(self, lemma):
+        """Senses of the lemma string ``lemma``."""
+        return self.where(LemmaPredicate(lemma))
+
+    def lemma_regex(self, pattern):
+        """Senses having a lemma matching the regex ``pattern``."""
+        return self.where(LemmaRegexPredicate(pattern))
+
+    def pos(self, *pos):
+        """Senses having one of the POS tags ``pos``; a sense with a
+        comma-joined POS has each of its tags."""
+        return self.where(FieldPredicate("pos", values=pos))
+
+    def pos_regex(self, pattern):
+        """Senses whose whole POS value matches the regex ``pattern``."""
+        return self.where(FieldPredicate("pos", pattern=pattern))
+
+    def domain(self, *domains):
+        """Senses in one of ``domains``."""
+        return self.where(FieldPredicate("domain", values=domains))
+
+    def related(self, relation_type, target_id=None):
+        """Senses with a ``relation_type`` relation (a name or a
+        ``CwnRelationType``), to ``target_id`` if given."""
+        return self.where(RelationPredicate(relation_type, target_id))
+
+    def definition(self, text):
+        """Senses whose definition contains ``text``."""
+        return self.where(DefinitionPredicate(text))
+
+    def examples(self, text):
+        """Senses with an example containing ``text``, markers ignored."""
+        return self.where(ExamplePredicate(text))
+
+    def limit(self, n):
+        self._limit = n
+        return self
+
+    def offset(self, n):
+        self._offset = n
+        return self
+
+    def page(self, page_no, page_size=20):
+        """Results ``page_no`` (from 0) of ``page_size`` senses."""
+        return self.offset(page_no * page_size).limit(page_size)
+
+    def plan(self):
+        """Bitmaps of the indexed predicates, smallest first, then the
+        filters.
+
+        Returns
+        -------
+        tuple
+            ``[(predicate, bitmap)]`` of indexed predicates, and the
+            list of filter predicates
+        """
+        cgu = self.cgu
+        indexed = []
+        filters = []
+        for pred in self.predicates:
+            bitmap = pred.bitmap(cgu)
+            if bitmap is None:
+                filters.append(pred)
+            else:
+                indexed.append((pred, bitmap))
+        indexed.sort(key=lambda x: len(x[1]))
+        return indexed, filters
+
+    def explain(self):
+        """Describe the plan, one step per line."""
+        indexed, filters = self.plan()
+        lines = [f"candidates: {pred!r} ({len(bitmap)})" if i == 0 else
+                 f"intersect: {pred!r} ({len(bitmap)})"
+                 for i, (pred, bitmap) in enumerate(indexed)]
+        if not indexed:
+            lines.append("candidates: all senses")
+        lines.extend(f"filter: {pred!r}" for pred in filters)
+        return "\n".join(lines)
+
+    def _iter_ids(self):
+        V = self.cgu.V
+        indexed, filters = self.plan()
+        metrics = self.cgu.metrics
+        if metrics is not None:
+            metrics.record_index("query", "sense_bitmaps", bool(indexed))
+        if indexed:
+            candidates = indexed[0][1]
+            for _, bitmap in indexed[1:]:
+                candidates = candidates & bitmap
+            # bitmaps iterate in V order
+            node_ids = iter(candidates)
+        else:
+            node_ids = self.cgu.node_ids("sense")
+
+        for node_id in node_ids:
+            ndata = V[node_id]
+            if all(pred.match(node_id, ndata) for pred in filters):
+                yield node_id
+
+    def ids(self):
+        """Ids of the matching senses, within ``offset`` and ``limit``."""
+        ret = []
+        n_skip = self._offset
+        for node_id in self._iter_ids():
+            if n_skip:
+                n_skip -= 1
+                continue
+            if self._limit is not None and len(ret) >= self._limit:
+                break
+            ret.append(node_id)
+        return ret
+
+    def all(self):
+        """The matching :class:`CwnSense <CwnGraph.cwn_types.CwnSense>`,
+        within ``offset`` and ``limit``."""
+        return [CwnSense(x, self.cgu) for x in self.ids()]
+
+    def first(self):
+        ids = SenseQuery.limit(self._copy(), 1).ids()
+        return CwnSense(ids[0], self.cgu) if ids else None
+
+    def count(self):
+        """Number of matching senses, ignoring ``offset`` and ``limit``."""
+        return sum(1 for _ in self._iter_ids())
+
+    def _copy(self):
+        query = SenseQuery(self.cgu)
+        query.predicates = list(self.predicates)
+        query._limit = self._limit
+        query._offset = self._offset
+        return query
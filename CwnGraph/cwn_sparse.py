@@ -0,0 +1,186 @@
+import numpy as np
+from scipy import sparse
+from .cwn_types import CwnIdNotFoundError
+
+
+class SparseAdjacency:
+    """Adjacency of a CWN graph as a scipy CSR matrix.
+
+    ``matrix[i, j]`` is 1 if there is an edge from ``ids[i]`` to
+    ``ids[j]``. Use :meth:`CwnGraphUtils.to_sparse` to build one.
+
+    Parameters
+    ----------
+    matrix : scipy.sparse.csr_matrix
+        square adjacency matrix
+    ids : list
+        node id of each row (and column)
+    """
+    def __init__(self, matrix, ids):
+        self.matrix = matrix
+        self.ids = ids
+        self.index = {nid: i for i, nid in enumerate(ids)}
+        self._transition = None
+
+    def __repr__(self):
+        return f"<SparseAdjacency: {len(self.ids)} nodes, {self.matrix.nnz} edges>"
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_core(cls, core, relation_types=None, node_types=None,
+                  is_directed=True):
+        """Build from an :class:`IntGraph <CwnGraph.cwn_core.IntGraph>`,
+        see :meth:`CwnGraphUtils.to_sparse`."""
+        n_nodes = len(core.ids)
+        offsets = np.frombuffer(core.out_offsets, dtype=np.int32)
+        rows = np.repeat(np.arange(n_nodes, dtype=np.int32), np.diff(offsets))
+        cols = np.frombuffer(core.out_targets, dtype=np.int32)
+        etypes = np.frombuffer(core.out_types, dtype=np.int16)
+
+        if relation_types is not None:
+            names = set(getattr(x, "name", x) for x in relation_types)
+            type_mask = np.array([x in names for x in core.edge_type_names],
+                                 dtype=bool)
+            edge_mask = type_mask[etypes]
+            rows, cols = rows[edge_mask], cols[edge_mask]
+
+        if node_types is not None:
+            codes = [core.node_type_code(x) for x in node_types]
+            node_codes = np.frombuffer(core.node_types, dtype=np.int16)
+            node_mask = np.isin(node_codes, codes)
+            edge_mask = node_mask[rows] & node_mask[cols]
+            rows, cols = rows[edge_mask], cols[edge_mask]
+            # renumber the remaining nodes, keeping their order
+            remap = np.cumsum(node_mask, dtype=np.int32) - 1
+            rows, cols = remap[rows], remap[cols]
+            ids = [nid for nid, keep in zip(core.ids, node_mask) if keep]
+        else:
+            ids = list(core.ids)
+
+        n_nodes = len(ids)
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float64), (rows, cols)),
+            shape=(n_nodes, n_nodes))
+        if not is_directed:
+            matrix = matrix.maximum(matrix.T).tocsr()
+        return cls(matrix, ids)
+
+    def indices(self, node_ids):
+        """Row indices of ``node_ids``.
+
+        Raises
+        ------
+        CwnIdNotFoundError
+            if a node is not in the matrix
+        """
+        try:
+            return np.array([self.index[x] for x in node_ids], dtype=np.int64)
+        except KeyError as ex:
+            raise CwnIdNotFoundError(ex.args[0]) from None
+
+    def degrees(self, direction="out"):
+        """Degree of every node, as an array in the order of ``ids``.
+
+        Parameters
+        ----------
+        direction : str, optional
+            ``"out"``, ``"in"`` or ``"both"``, by default ``"out"``
+        """
+        if direction not in ("out", "in", "both"):
+            raise ValueError(f"unknown direction: {direction}")
+        out_deg = np.diff(self.matrix.indptr)
+        if direction == "out":
+            return out_deg
+        in_deg = np.bincount(self.matrix.indices, minlength=len(self.ids))
+        if direction == "in":
+            return in_deg
+        return out_deg + in_deg
+
+    def neighbourhoods(self, node_ids, n_hops=1):
+        """Nodes reachable within ``n_hops`` edges from each of ``node_ids``.
+
+        All nodes are expanded together, with one sparse product per hop.
+
+        Returns
+        -------
+        list
+            a set of node ids for each of ``node_ids``, including itself
+        """
+        seeds = self.indices(node_ids)
+        n_nodes = len(self.ids)
+        reached = sparse.csr_matrix(
+            (np.ones(len(seeds), dtype=bool),
+             (np.arange(len(seeds)), seeds)),
+            shape=(len(seeds), n_nodes))
+        adjacency = self.matrix.astype(bool)
+        for _ in range(n_hops):
+            expanded = reached + reached @ adjacency
+            if expanded.nnz == reached.nnz:
+                break
+            reached = expanded
+
+        ids = self.ids
+        return [set(ids[j] for j in reached.indices[reached.indptr[i]:reached.indptr[i+1]])
+                for i in range(len(seeds))]
+
+    def personalized_pagerank(self, seeds, alpha=0.85, tol=1e-8, max_iter=100):
+        """Personalized PageRank, one run per seed list, iterated together.
+
+        Rank of dangling nodes (no outgoing edge) is returned to the seeds.
+
+        Parameters
+        ----------
+        seeds : list
+            a list of node ids to restart from, or a list of such lists
+        alpha : float, optional
+            probability to follow an edge, by default 0.85
+        tol : float, optional
+            stop when the L1 change of every run is below ``tol``
+        max_iter : int, optional
+            maximum number of iterations, by default 100
+
+        Returns
+        -------
+        numpy.ndarray
+            scores in the order of ``ids``, of shape ``(len(ids),)`` for a
+            single seed list, or ``(len(seeds), len(ids))`` for a batch
+        """
+        is_batch = bool(seeds) and not isinstance(seeds[0], str)
+        seed_lists = seeds if is_batch else [seeds]
+
+        n_nodes = len(self.ids)
+        restart = np.zeros((n_nodes, len(seed_lists)))
+        for k, seed_list in enumerate(seed_lists):
+            seed_idx = self.indices(seed_list)
+            if len(seed_idx) == 0:
+                raise ValueError("empty seed list")
+            np.add.at(restart[:, k], seed_idx, 1 / len(seed_idx))
+
+        transition, dangling = self._transition_matrix()
+        scores = restart.copy()
+        for _ in range(max_iter):
+            dangling_mass = scores[dangling].sum(axis=0)
+            new_scores = alpha * (transition @ scores) + \
+                (alpha * dangling_mass + 1 - alpha) * restart
+            delta = np.abs(new_scores - scores).sum(axis=0).max()
+            scores = new_scores
+            if delta < tol:
+                break
+
+        scores = scores.T
+        return scores if is_batch else scores[0]
+
+    def _transition_matrix(self):
+        transition = self._transition
+        if transition is None:
+            out_deg = np.diff(self.matrix.indptr).astype(np.float64)
+            dangling = out_deg == 0
+            inv_deg = np.divide(1, out_deg, out=np.zeros_like(out_deg),
+                                where=~dangling)
+            # column-stochastic: transition @ scores spreads rank along edges
+            matrix = (sparse.diags(inv_deg) @ self.matrix).T.tocsr()
+            transition = (matrix, dangling)
+            self._transition = transition
+        return transition
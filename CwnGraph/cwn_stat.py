@@ -1,5 +1,5 @@
 from CwnGraph.cwn_graph_utils import CwnGraphUtils
-from CwnGraph.cwn_types.cwn_relation_types import CwnRelationType
+from CwnGraph.cwn_types.cwn_relation_types import relation_flags, SEMANTIC_RELATION
 from .cwn_types import CwnSense, CwnLemma
 try:
     from tqdm.auto import tqdm
@@ -31,12 +31,8 @@ def simple_statistics(cgu: CwnGraphUtils, include_all=True):
             n_synset += 1
 
     for eid, edata in tqdm(cgu.E.items()):
-        try:
-            rel_type = CwnRelationType[edata['edge_type']]         
-            if rel_type.is_semantic_relation():
-                n_sem_relations += 1
-        except KeyError:
-            continue
+        if relation_flags(edata['edge_type']) & SEMANTIC_RELATION:
+            n_sem_relations += 1
     
     print("Statistics")
     print("------------")
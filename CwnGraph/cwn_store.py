@@ -0,0 +1,278 @@
+"""Compact, column-oriented storage of node data.
+
+A :class:`NodeTable` stores the node data dicts of an image by field:
+low-cardinality strings (``node_type``, ``pos``, ``domain``...) as codes
+into a value table, other strings as one UTF-8 blob with offsets, lists
+of strings (``examples``) as item blobs, integers in arrays. Columns
+are kept per group of nodes with the same keys, so that a field only
+takes space on the nodes that have it.
+
+``V[node_id]`` is a read-only :class:`NodeView`, decoded field by field
+on access, which compares equal to the original dict. Values that do
+not fit the type of their column (e.g. ``""`` for ``examples``) are kept
+as-is, so the image hash does not change.
+
+:class:`NodeStore` makes the table writable the way ``CwnGraphUtils``
+expects: writes store plain dicts over the table.
+"""
+from array import array
+from bisect import bisect_right
+from collections import Counter
+from collections.abc import Mapping
+from .cwn_overlay import OverlayMapping
+
+# a string field with at most this share of distinct values is an enum
+ENUM_RATIO = 1 / 16
+
+
+def offset_array(n):
+    return array("I" if n < 2**32 else "Q")
+
+
+def code_array(n):
+    return array("B" if n <= 2**8 else "H" if n <= 2**16 else "I")
+
+
+class EnumColumn:
+    kind = "enum"
+
+    def __init__(self, values, others):
+        self.others = others
+        self.values = []
+        codes = {}
+        for x in values:
+            if x not in codes:
+                codes[x] = len(self.values)
+                self.values.append(x)
+        self.codes = code_array(len(self.values))
+        self.codes.extend(codes[x] for x in values)
+
+    def get(self, slot):
+        others = self.others
+        if others and slot in others:
+            return others[slot]
+        return self.values[self.codes[slot]]
+
+
+class TextColumn:
+    kind = "text"
+
+    def __init__(self, values, others):
+        self.others = others
+        chunks = [x.encode("UTF-8", "surrogatepass") for x in values]
+        self.offsets = offset_array(sum(len(x) for x in chunks))
+        self.offsets.append(0)
+        pos = 0
+        for chunk in chunks:
+            pos += len(chunk)
+            self.offsets.append(pos)
+        self.blob = b"".join(chunks)
+
+    def get(self, slot):
+        others = self.others
+        if others and slot in others:
+            return others[slot]
+        offsets = self.offsets
+        return self.blob[offsets[slot]:offsets[slot+1]].decode("UTF-8", "surrogatepass")
+
+
+class ListColumn:
+    kind = "list"
+
+    def __init__(self, values, others):
+        self.others = others
+        items = [x for value in values for x in value]
+        self.slot_offsets = offset_array(len(items))
+        self.slot_offsets.append(0)
+        n_items = 0
+        for value in values:
+            n_items += len(value)
+            self.slot_offsets.append(n_items)
+        self.items = TextColumn(items, None)
+
+    def get(self, slot):
+        others = self.others
+        if others and slot in others:
+            return others[slot]
+        slot_offsets = self.slot_offsets
+        get_item = self.items.get
+        return [get_item(i) for i in range(slot_offsets[slot], slot_offsets[slot+1])]
+
+
+class IntColumn:
+    kind = "int"
+
+    def __init__(self, values, others):
+        self.others = others
+        small = all(-2**31 <= x < 2**31 for x in values)
+        self.values = array("i" if small else "q", values)
+
+    def get(self, slot):
+        others = self.others
+        if others and slot in others:
+            return others[slot]
+        return self.values[slot]
+
+
+class ObjectColumn:
+    kind = "object"
+
+    def __init__(self, values, others):
+        self.others = others
+        self.values = list(values)
+
+    def get(self, slot):
+        others = self.others
+        if others and slot in others:
+            return others[slot]
+        return self.values[slot]
+
+
+def value_kind(value):
+    if isinstance(value, str):
+        return "str"
+    if isinstance(value, int) and not isinstance(value, bool) and \
+       -2**63 <= value < 2**63:
+        return "int"
+    if isinstance(value, list) and all(isinstance(x, str) for x in value):
+        return "list"
+    return "object"
+
+
+def build_column(values):
+    """A column for ``values``, typed by their most common kind; the
+    values of other kinds are kept apart, as they are."""
+    kinds = Counter(value_kind(x) for x in values)
+    kind = kinds.most_common(1)[0][0] if kinds else "object"
+    others = {}
+    column_values = []
+    fill = {"str": "", "int": 0, "list": (), "object": None}[kind]
+    for slot, x in enumerate(values):
+        if value_kind(x) != kind:
+            others[slot] = x
+            column_values.append(fill)
+        else:
+            column_values.append(x)
+    if kind == "str":
+        n_distinct = len(set(column_values))
+        if n_distinct <= max(1, len(values) * ENUM_RATIO):
+            return EnumColumn(column_values, others)
+        return TextColumn(column_values, others)
+    column_class = {"int": IntColumn, "list": ListColumn,
+                    "object": ObjectColumn}[kind]
+    return column_class(column_values, others)
+
+
+class NodeView(Mapping):
+    """Read-only view of the data of one node of a :class:`NodeTable`."""
+    __slots__ = ("keys_", "columns", "slot")
+
+    def __init__(self, keys, columns, slot):
+        self.keys_ = keys
+        self.columns = columns
+        self.slot = slot
+
+    def __repr__(self):
+        return repr(dict(self))
+
+    def __getitem__(self, key):
+        return self.columns[key].get(self.slot)
+
+    def get(self, key, default=None):
+        column = self.columns.get(key)
+        if column is None:
+            return default
+        return column.get(self.slot)
+
+    def __contains__(self, key):
+        return key in self.columns
+
+    def __iter__(self):
+        return iter(self.keys_)
+
+    def __len__(self):
+        return len(self.keys_)
+
+    def __reduce__(self):
+        # pickled (and copied) as a plain dict
+        return (dict, (dict(self),))
+
+
+class NodeTable(Mapping):
+    """Immutable column store of node data, see :mod:`CwnGraph.cwn_store`.
+
+    Nodes are grouped by their keys (``shapes``); each group has its own
+    columns, one per key. ``index`` maps a node id to its row, rows are
+    numbered group after group.
+
+    Parameters
+    ----------
+    V : dict
+        node id -> node data dict
+    """
+    def __init__(self, V):
+        shape_codes = {}
+        groups = []
+        for nid, ndata in V.items():
+            shape = tuple(ndata)
+            code = shape_codes.get(shape)
+            if code is None:
+                code = shape_codes[shape] = len(groups)
+                groups.append([])
+            groups[code].append(nid)
+
+        self.shapes = list(shape_codes)
+        self.group_starts = []
+        self.group_columns = []
+        rows = {}
+        n_rows = 0
+        for shape, group in zip(self.shapes, groups):
+            self.group_starts.append(n_rows)
+            for slot, nid in enumerate(group):
+                rows[nid] = n_rows + slot
+            n_rows += len(group)
+            self.group_columns.append({key: build_column([V[nid][key] for nid in group])
+                                       for key in shape})
+        # in the order of V
+        self.index = {nid: rows[nid] for nid in V}
+
+    def __repr__(self):
+        return f"<NodeTable: {len(self.index)} nodes, {len(self.shapes)} shapes>"
+
+    def view(self, row):
+        group = bisect_right(self.group_starts, row) - 1
+        return NodeView(self.shapes[group], self.group_columns[group],
+                        row - self.group_starts[group])
+
+    def __getitem__(self, node_id):
+        return self.view(self.index[node_id])
+
+    def get(self, node_id, default=None):
+        row = self.index.get(node_id)
+        if row is None:
+            return default
+        return self.view(row)
+
+    def __contains__(self, node_id):
+        return node_id in self.index
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+
+class NodeStore(OverlayMapping):
+    """A :class:`NodeTable` that can be written like a dict: new or
+    replaced node data are kept as dicts over the table."""
+    def __init__(self, V):
+        table = V if isinstance(V, NodeTable) else NodeTable(V)
+        super(NodeStore, self).__init__(table)
+
+    def __repr__(self):
+        return f"<NodeStore: {len(self)} nodes, {len(self.delta)} changed>"
+
+    @property
+    def table(self):
+        return self.base
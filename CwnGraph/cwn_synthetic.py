@@ -0,0 +1,301 @@
+"""Synthetic images shaped like the released CWN image.
+
+The generated ``(V, E, meta)`` follows the schema of :class:`CWN_Graph
+<CwnGraph.cwn_graph.CWN_Graph>` output, with node counts and relation
+densities scaled from ``stat.json``. It is meant for benchmarks, tests
+that have to run offline, and capacity planning at many times the size
+of the released image; the lexical content is random.
+
+``iter_image`` streams the nodes and edges, so an image can be written
+(``write_json``) or loaded (``generate_image``) without holding a second
+copy of it. Apart from the image itself, the generator keeps a few
+bytes per sense and a set of the semantic edges it has emitted.
+"""
+import json
+import random
+from array import array
+from .cwn_types import cwn_pos_labels
+
+# proportions of the released image (stat.json, v.2022.06.17)
+SENSES_PER_LEMMA = 29433 / 29321
+SYNSETS_PER_SENSE = 19912 / 29433
+EXAMPLES_PER_SENSE = 93905 / 29433
+SEM_RELATIONS_PER_SENSE = 59700 / 29433
+FACETS_PER_SENSE = 0.05
+PWN_SYNSETS_PER_SYNSET = 0.4
+
+# relative frequencies of semantic relation types, with the
+# type of the inverse edge that may come with it
+RELATION_MIX = {
+    "synonym": (0.30, None),
+    "nearsynonym": (0.15, None),
+    "hypernym": (0.18, "hyponym"),
+    "hyponym": (0.12, "hypernym"),
+    "antonym": (0.08, None),
+    "holonym": (0.05, "meronym"),
+    "meronym": (0.05, "holonym"),
+    "varword": (0.04, None),
+    "paranym": (0.03, None),
+}
+INVERSE_RATE = 0.9
+
+POS_WEIGHTS = {"Na": 0.35, "VC": 0.12, "VH": 0.12, "VA": 0.06, "D": 0.06,
+               "Nb": 0.03, "Nc": 0.03, "Nf": 0.03, "VJ": 0.03, "VK": 0.02}
+DOMAINS = ["", "", "", "", "bio", "med", "law", "sport", "music", "comp"]
+
+ZHUYIN_INITIALS = list("ㄅㄆㄇㄈㄉㄊㄋㄌㄍㄎㄏㄐㄑㄒㄓㄔㄕㄖㄗㄘㄙ") + [""]
+ZHUYIN_FINALS = ["ㄚ", "ㄛ", "ㄜ", "ㄞ", "ㄟ", "ㄠ", "ㄡ", "ㄢ", "ㄣ", "ㄤ", "ㄥ",
+                 "ㄧ", "ㄧㄚ", "ㄧㄝ", "ㄧㄠ", "ㄧㄢ", "ㄧㄣ", "ㄧㄥ",
+                 "ㄨ", "ㄨㄛ", "ㄨㄞ", "ㄨㄢ", "ㄨㄥ", "ㄩ", "ㄩㄝ", "ㄩㄢ"]
+ZHUYIN_TONES = ["", "ˊ", "ˇ", "ˋ"]
+
+
+def random_word(rng, length):
+    return "".join(chr(rng.randint(0x4e00, 0x4e00 + 3000))
+                   for _ in range(length))
+
+
+def random_zhuyin(rng, n_syllables):
+    return " ".join(rng.choice(ZHUYIN_INITIALS) + rng.choice(ZHUYIN_FINALS) +
+                    rng.choice(ZHUYIN_TONES) for _ in range(n_syllables))
+
+
+def weighted_choice(rng, weights):
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def skewed_index(rng, n, degree_skew):
+    """Draw an index in ``range(n)``; ``degree_skew > 1`` concentrates
+    the draws on low indices, giving a heavy-tailed in-degree."""
+    if degree_skew == 1:
+        return rng.randrange(n)
+    return min(int(n * rng.random() ** degree_skew), n - 1)
+
+
+def iter_image(n_lemma=1000, seed=42,
+        senses_per_lemma=SENSES_PER_LEMMA,
+        sem_relations_per_sense=SEM_RELATIONS_PER_SENSE,
+        degree_skew=1.0, hierarchy_depth=8):
+    """Stream the nodes and edges of a synthetic image.
+
+    Parameters
+    ----------
+    n_lemma : int, optional
+        number of lemma nodes, by default 1000. The other node and edge
+        counts are scaled from it.
+    seed : int, optional
+        random seed, the same arguments give the same image
+    senses_per_lemma : float, optional
+        mean number of senses per lemma. Half of the lemmas have no
+        sense; the others have geometrically distributed sense counts.
+    sem_relations_per_sense : float, optional
+        mean number of semantic relation edges per sense, inverse
+        edges included
+    degree_skew : float, optional
+        1.0 (default) picks relation targets uniformly; larger values
+        give a power-law-like in-degree, with a few hub senses
+    hierarchy_depth : int, optional
+        number of levels of the hypernym hierarchy; every hypernym edge
+        goes from a sense to a sense one level up, so no hypernym chain
+        is longer than ``hierarchy_depth - 1``
+
+    Yields
+    ------
+    tuple
+        ``("node", node_id, node_data)`` or ``("edge", edge_id, edge_data)``.
+        An edge is yielded after both of its nodes.
+    """
+    rng = random.Random(seed)
+    pos_weights = {k: v for k, v in POS_WEIGHTS.items() if k in cwn_pos_labels}
+    id_width = max(6, len(str(n_lemma - 1)))
+    sense_continue = 1 - 1 / (2 * senses_per_lemma) if senses_per_lemma > 0.5 else 0
+
+    glyphs = {}
+    lemma_strs = []
+    # senses are kept as lemma_index * 100 + sense_no, 8 bytes per sense
+    senses = array("q")
+    for lemma_i in range(n_lemma):
+        lemma_id = f"{lemma_i:0{id_width}d}"
+        length = rng.choice([1, 2, 2, 2, 2, 3, 3, 4])
+        # reuse lemma strings now and then, these become homographs
+        if lemma_strs and rng.random() < 0.1:
+            lemma = rng.choice(lemma_strs)
+        else:
+            lemma = random_word(rng, length)
+        if lemma not in glyphs:
+            glyphs[lemma] = [f"G{len(glyphs)+1}", 0]
+            lemma_strs.append(lemma)
+            yield ("node", glyphs[lemma][0], {"node_type": "glyph", "glyph": lemma})
+        glyphs[lemma][1] += 1
+        yield ("node", lemma_id, {"node_type": "lemma", "lemma": lemma,
+                                  "lemma_sno": glyphs[lemma][1],
+                                  "zhuyin": random_zhuyin(rng, len(lemma))})
+        yield ("edge", (glyphs[lemma][0], lemma_id), {"edge_type": "has_lemma"})
+
+        n_sense = 0
+        if rng.random() < 0.5 and senses_per_lemma > 0:
+            n_sense = 1
+            while rng.random() < sense_continue and n_sense < 99:
+                n_sense += 1
+        for sense_no in range(1, n_sense + 1):
+            sense_id = f"{lemma_id}{sense_no:02d}"
+            yield ("node", sense_id, make_sense_data(rng, "sense", lemma, pos_weights))
+            yield ("edge", (lemma_id, sense_id), {"edge_type": "has_sense"})
+            senses.append(lemma_i * 100 + sense_no)
+            if rng.random() < FACETS_PER_SENSE:
+                for facet_no in range(1, rng.randint(2, 3) + 1):
+                    facet_id = f"{sense_id}{facet_no:02d}"
+                    yield ("node", facet_id,
+                           make_sense_data(rng, "facet", lemma, pos_weights))
+                    yield ("edge", (sense_id, facet_id), {"edge_type": "has_facet"})
+    del glyphs, lemma_strs
+
+    n_sense = len(senses)
+    if not n_sense:
+        return
+
+    def sense_id_of(sense_i):
+        lemma_i, sense_no = divmod(senses[sense_i], 100)
+        return f"{lemma_i:0{id_width}d}{sense_no:02d}"
+
+    n_synset = max(1, int(n_sense * SYNSETS_PER_SENSE))
+    for synset_i in range(n_synset):
+        synset_id = f"syn_{synset_i:06d}"
+        yield ("node", synset_id, {"node_type": "synset",
+                                   "gloss": random_word(rng, 12),
+                                   "pwn_word": "", "pwn_id": ""})
+        if rng.random() < PWN_SYNSETS_PER_SYNSET:
+            pwn_id = f"pwn_{synset_i:08d}N"
+            yield ("node", pwn_id, {"node_type": "pwn_synset",
+                                    "synset_sno": str(rng.randint(1, 9)),
+                                    "synset_word1": "word"})
+            yield ("edge", (sense_id_of(rng.randrange(n_sense)), pwn_id),
+                   {"edge_type": rng.choice(["synonym", "hypernym"])})
+    members = rng.sample(range(n_sense), min(n_sense, int(n_synset * 1.3)))
+    for member_i, sense_i in enumerate(members):
+        synset_i = member_i if member_i < n_synset else rng.randrange(n_synset)
+        yield ("edge", (sense_id_of(sense_i), f"syn_{synset_i:06d}"),
+               {"edge_type": "is_synset"})
+    del members
+
+    # the hypernym hierarchy: sense i is on level i % hierarchy_depth,
+    # its hypernyms are on the level above
+    depth = max(1, hierarchy_depth)
+
+    def pick_upper(sense_i):
+        level = sense_i % depth
+        if level == 0:
+            return None
+        n_upper = (n_sense - (level - 1) + depth - 1) // depth
+        return skewed_index(rng, n_upper, degree_skew) * depth + level - 1
+
+    relation_weights = {k: v[0] for k, v in RELATION_MIX.items()}
+    # the inverse edges count towards the semantic relations too
+    inverse_rate = INVERSE_RATE * sum(
+        w for w, inv in RELATION_MIX.values() if inv) / sum(relation_weights.values())
+    n_relation = int(n_sense * sem_relations_per_sense / (1 + inverse_rate))
+    sem_edges = set()
+    for _ in range(n_relation):
+        rel_type = weighted_choice(rng, relation_weights)
+        src_i = rng.randrange(n_sense)
+        if rel_type == "hypernym":
+            tgt_i = pick_upper(src_i)
+        elif rel_type == "hyponym":
+            tgt_i, src_i = src_i, pick_upper(src_i)
+        else:
+            tgt_i = skewed_index(rng, n_sense, degree_skew)
+        if tgt_i is None or src_i is None or src_i == tgt_i or \
+           src_i * n_sense + tgt_i in sem_edges:
+            continue
+        sem_edges.add(src_i * n_sense + tgt_i)
+        yield ("edge", (sense_id_of(src_i), sense_id_of(tgt_i)), {"edge_type": rel_type})
+
+        inv_type = RELATION_MIX[rel_type][1]
+        if inv_type and tgt_i * n_sense + src_i not in sem_edges and \
+           rng.random() < INVERSE_RATE:
+            sem_edges.add(tgt_i * n_sense + src_i)
+            yield ("edge", (sense_id_of(tgt_i), sense_id_of(src_i)),
+                   {"edge_type": inv_type})
+
+
+def generate_image(n_lemma=1000, seed=42, **kwargs):
+    """Generate a synthetic image.
+
+    Parameters
+    ----------
+    n_lemma : int, optional
+        number of lemma nodes, by default 1000
+    seed : int, optional
+        random seed, the same arguments give the same image
+    **kwargs
+        see :func:`iter_image`
+
+    Returns
+    -------
+    tuple
+        ``(V, E, meta)``, which can be passed to ``CwnImage``
+    """
+    V = {}
+    E = {}
+    for kind, item_id, item_data in iter_image(n_lemma, seed, **kwargs):
+        if kind == "node":
+            V[item_id] = item_data
+        else:
+            E[item_id] = item_data
+    return V, E, make_meta(n_lemma, seed, **kwargs)
+
+
+def write_json(prefix, n_lemma=1000, seed=42, **kwargs):
+    """Stream a synthetic image into the files written by
+    :func:`cwnio.dump_json <CwnGraph.cwnio.dump_json>`, without holding
+    the image in memory.
+
+    Returns
+    -------
+    tuple
+        number of nodes and edges written
+    """
+    n_nodes = n_edges = 0
+    with open(f"{prefix}_nodes.json", "w", encoding="UTF-8") as fnodes, \
+         open(f"{prefix}_edges.json", "w", encoding="UTF-8") as fedges:
+        fnodes.write("{")
+        fedges.write("{")
+        for kind, item_id, item_data in iter_image(n_lemma, seed, **kwargs):
+            if kind == "node":
+                fout, key = fnodes, item_id
+                n_nodes += 1
+                sep = ",\n" if n_nodes > 1 else "\n"
+            else:
+                fout, key = fedges, f"{item_id[0]}-{item_id[1]}"
+                n_edges += 1
+                sep = ",\n" if n_edges > 1 else "\n"
+            fout.write(sep + json.dumps(key, ensure_ascii=False) + ": " +
+                       json.dumps(item_data, ensure_ascii=False))
+        fnodes.write("\n}\n")
+        fedges.write("\n}\n")
+
+    with open(f"{prefix}_meta.json", "w", encoding="UTF-8") as fout:
+        json.dump(make_meta(n_lemma, seed, **kwargs), fout,
+                  indent=2, ensure_ascii=False)
+    return n_nodes, n_edges
+
+
+def make_sense_data(rng, node_type, lemma, pos_weights):
+    n_examples = min(rng.randint(0, int(2 * EXAMPLES_PER_SENSE)), 12)
+    examples = [random_word(rng, rng.randint(2, 6)) + f"<{lemma}>" +
+                random_word(rng, rng.randint(2, 8))
+                for _ in range(n_examples)]
+    pos = weighted_choice(rng, pos_weights)
+    if rng.random() < 0.02:
+        pos = ",".join(sorted({pos, weighted_choice(rng, pos_weights)}))
+    return {"node_type": node_type,
+            "def": random_word(rng, rng.randint(8, 30)) + "。",
+            "domain": rng.choice(DOMAINS),
+            "pos": pos,
+            "examples": examples}
+
+
+def make_meta(n_lemma, seed, **kwargs):
+    return {"label": f"synthetic-{n_lemma}-{seed}",
+            "note": "synthetic image, generated by CwnGraph.cwn_synthetic",
+            "generator": {"n_lemma": n_lemma, "seed": seed, **kwargs}}
@@ -1,6 +1,7 @@
 from .cwn_node_types import CwnNode, CwnGlyph, CwnLemma, CwnSense
 from .cwn_node_types import CwnFacet, CwnSynset, PwnSynset
 from .cwn_relation_types import CwnRelationType, CwnRelation
+from .cwn_relation_types import relation_flags, relation_mask
 from .cwn_types import csg, CwnCheckerSuggestion, SuggestionData
 from .cwn_types import GraphStructure
 from .cwn_types import CwnIdNotFoundError
@@ -1,5 +1,5 @@
 from enum import Enum, auto
-from .cwn_relation_types import CwnRelationType
+from .cwn_relation_types import CwnRelationType, relation_flags, SEMANTIC_RELATION
 from collections import namedtuple
 from typing import List
 #pylint: disable=import-error
@@ -134,7 +134,8 @@ class CwnLemma(CwnNode):
 
     @property
     def senses(self):
-        if self._senses is None:
+        sense_nodes = self._senses
+        if sense_nodes is None:
             cgu = self.cgu
             sense_nodes = []
             edges = cgu.find_edges(self.id)
@@ -142,19 +143,20 @@ class CwnLemma(CwnNode):
                 if edge_x.edge_type == "has_sense":
                     sense_nodes.append(CwnSense(edge_x.tgt_id, cgu))
             self._senses = sense_nodes
-        return self._senses
+        return sense_nodes
 
     @property
     def synsets(self):
-        if self._synsets is None:
+        synset_nodes = self._synsets
+        if synset_nodes is None:
             cgu = self.cgu
             synset_nodes = []
             edges = cgu.find_edges(self.id)
             for edge_x in edges:
                 if edge_x.edge_type == "has_synset":
                     synset_nodes.append(CwnSynset(edge_x.tgt_id, cgu))
-            self._senses = synset_nodes
-        return self._synsets
+            self._synsets = synset_nodes
+        return synset_nodes
 
 
 class CwnSense(CwnNode):
@@ -287,25 +289,25 @@ class CwnSense(CwnNode):
         list
             a list of relation tuples (``Tuple[str, CwnSense, str]``)
         """
-        relations = self.relations
-        if not relations:
-            relations = []        
-        
+        # copy the list, the cached relations are shared with other readers
+        relations = list(self.relations or [])
+
         for facet_x in self.facets:
             relations.extend(facet_x.relations)
         return relations
 
     @property
     def lemmas(self):
-        if self._lemmas is None:
+        lemma_nodes = self._lemmas
+        if lemma_nodes is None:
             cgu = self.cgu
             lemma_nodes = []
             edges = cgu.find_edges(self.id, is_directed=False)
             for edge_x in edges:
                 if edge_x.edge_type == "has_sense":
                     lemma_nodes.append(CwnLemma(edge_x.src_id, cgu))
-            self._lemmas = lemma_nodes        
-        return self._lemmas
+            self._lemmas = lemma_nodes
+        return lemma_nodes
 
     @property
     def head_word(self):
@@ -317,7 +319,8 @@ class CwnSense(CwnNode):
 
     @property
     def relations(self):
-        if self._relations is None:
+        relation_infos = self._relations
+        if relation_infos is None:
             cgu = self.cgu
             relation_infos = []
             edges = cgu.find_edges(self.id, is_directed=False)
@@ -348,7 +351,7 @@ class CwnSense(CwnNode):
                 relation_infos.append((edge_type, end_node, edge_direction))
 
             self._relations = relation_infos
-        return self._relations
+        return relation_infos
 
     @property
     def semantic_relations(self):
@@ -358,8 +361,7 @@ class CwnSense(CwnNode):
             
         sem_relations = []
         for rel_x in relation_infos:
-            rel_type = CwnRelationType[rel_x[0]]
-            if rel_type.is_semantic_relation():
+            if relation_flags(rel_x[0]) & SEMANTIC_RELATION:
                 sem_relations.append(rel_x)
         return sem_relations
 
@@ -436,14 +438,16 @@ class CwnFacet(CwnSense):
 
     @property
     def sense(self):
-        if self._sense is None:
-            cgu = self.cgu            
+        sense = self._sense
+        if sense is None:
+            cgu = self.cgu
             edges = cgu.find_edges(self.id, is_directed=False)
             for edge_x in edges:
                 if edge_x.edge_type == "has_facet":
-                    self._sense = CwnSense(edge_x.src_id, cgu)
+                    sense = CwnSense(edge_x.src_id, cgu)
+                    self._sense = sense
                     break
-        return self._sense
+        return sense
         
 
 class CwnSynset(CwnNode):
@@ -501,7 +505,8 @@ class CwnSynset(CwnNode):
 
     @property
     def relations(self):
-        if self._relations is None:
+        relation_infos = self._relations
+        if relation_infos is None:
             cgu = self.cgu
             relation_infos = []
             edges = cgu.find_edges(self.id, is_directed=False)
@@ -532,15 +537,14 @@ class CwnSynset(CwnNode):
                 relation_infos.append((edge_type, end_node, edge_direction))
 
             self._relations = relation_infos
-        return self._relations
+        return relation_infos
 
     @property
     def semantic_relations(self):
         relation_infos = self.relations
         sem_relations = []
         for rel_x in relation_infos:
-            rel_type = CwnRelationType[rel_x[0]]
-            if rel_type.is_semantic_relation():
+            if relation_flags(rel_x[0]) & SEMANTIC_RELATION:
                 sem_relations.append(rel_x)
         return sem_relations
 
@@ -616,7 +620,8 @@ class PwnSynset(CwnNode):
 
     @property
     def relations(self):
-        if self._relations is None:
+        relation_infos = self._relations
+        if relation_infos is None:
             cgu = self.cgu
             relation_infos = []
             edges = cgu.find_edges(self.id, is_directed=False)
@@ -645,7 +650,7 @@ class PwnSynset(CwnNode):
                 relation_infos.append((edge_type, end_node, edge_direction))
 
             self._relations = relation_infos
-        return self._relations
+        return relation_infos
 
     @property
     def senses(self):
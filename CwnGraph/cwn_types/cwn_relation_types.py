@@ -23,64 +23,83 @@ class CwnRelationType(Enum):
     def __repr__(self):
         return f"<CwnRelationType: {str(self.name)}>"
 
-    def __eq__(self, other):
-        if isinstance(other, CwnRelationType):
-            return other.value == self.value
-        else:
-            return False
+    @property
+    def flags(self):
+        """Category bits of this relation, see :func:`relation_mask`."""
+        return RELATION_FLAGS[self.name]
 
     def is_semantic_relation(self):
-        return 0 < self.value <= 20
+        return RELATION_FLAGS[self.name] & SEMANTIC_RELATION != 0
 
     def is_upper_relation(self):
-        return self.name in (
-            "holonym", "hypernym"
-        )
-    
+        return RELATION_FLAGS[self.name] & UPPER_RELATION != 0
+
     def is_lower_relation(self):
-        return self.name in (
-            "meronym", "hyponym"
-        )
+        return RELATION_FLAGS[self.name] & LOWER_RELATION != 0
 
     def is_synonym_relation(self):
-        return self.name in (
-            "synonym", "is_synset", "has_synset"
-        )
+        return RELATION_FLAGS[self.name] & SYNONYM_RELATION != 0
+
     def inverse(self):
-        cls = self.__class__
-        inverse_pairs = [
-            (cls.has_instance, cls.instance_of),
-            (cls.hypernym, cls.hyponym),
-            (cls.holonym, cls.meronym)
-        ]
-
-        for rel_x, rel_y in inverse_pairs:
-            if self == rel_x:
-                return rel_y
-
-            if self == rel_y:
-                return rel_x
-        
-        return None
+        return INVERSE_RELATIONS.get(self)
 
     @staticmethod
     def from_zhLabel(zhlabel):
-        label_map = {
-            "全體詞": CwnRelationType.holonym,
-            "反義詞": CwnRelationType.antonym,
-            "部分詞": CwnRelationType.meronym,
-            "上位詞": CwnRelationType.hypernym,
-            "下位詞": CwnRelationType.hyponym,
-            "異體": CwnRelationType.variant,
-            "近義詞": CwnRelationType.nearsynonym,
-            "類義詞": CwnRelationType.paranym,
-            "同義詞": CwnRelationType.synonym,
-            "事例": CwnRelationType.has_instance,
-            "之事例": CwnRelationType.instance_of,
-            "同義詞集": CwnRelationType.is_synset
-        }
-
-        return label_map.get(zhlabel, CwnRelationType.generic)
+        return ZH_LABEL_RELATIONS.get(zhlabel, CwnRelationType.generic)
+
+
+# category bits of the relation types; an edge type matches a mask from
+# relation_mask() when relation_flags(edge_type) & mask is not zero
+UPPER_RELATION = 1
+LOWER_RELATION = 2
+SYNONYM_RELATION = 4
+SEMANTIC_RELATION = 8
+
+RELATION_FLAGS = {}
+for _rel in CwnRelationType:
+    RELATION_FLAGS[_rel.name] = \
+        (UPPER_RELATION if _rel.name in ("holonym", "hypernym") else 0) | \
+        (LOWER_RELATION if _rel.name in ("meronym", "hyponym") else 0) | \
+        (SYNONYM_RELATION if _rel.name in ("synonym", "is_synset", "has_synset") else 0) | \
+        (SEMANTIC_RELATION if 0 < _rel.value <= 20 else 0)
+del _rel
+
+INVERSE_RELATIONS = {}
+for _rel_x, _rel_y in [
+        (CwnRelationType.has_instance, CwnRelationType.instance_of),
+        (CwnRelationType.hypernym, CwnRelationType.hyponym),
+        (CwnRelationType.holonym, CwnRelationType.meronym)]:
+    INVERSE_RELATIONS[_rel_x] = _rel_y
+    INVERSE_RELATIONS[_rel_y] = _rel_x
+del _rel_x, _rel_y
+
+ZH_LABEL_RELATIONS = {
+    "全體詞": CwnRelationType.holonym,
+    "反義詞": CwnRelationType.antonym,
+    "部分詞": CwnRelationType.meronym,
+    "上位詞": CwnRelationType.hypernym,
+    "下位詞": CwnRelationType.hyponym,
+    "異體": CwnRelationType.variant,
+    "近義詞": CwnRelationType.nearsynonym,
+    "類義詞": CwnRelationType.paranym,
+    "同義詞": CwnRelationType.synonym,
+    "事例": CwnRelationType.has_instance,
+    "之事例": CwnRelationType.instance_of,
+    "同義詞集": CwnRelationType.is_synset
+}
+
+
+def relation_flags(edge_type):
+    """Category bits of an edge type name, 0 for unknown names."""
+    return RELATION_FLAGS.get(edge_type, 0)
+
+
+def relation_mask(upper=False, lower=False, synonym=False, semantic=False):
+    """Bit mask selecting the relation categories set to True."""
+    return (UPPER_RELATION if upper else 0) | \
+           (LOWER_RELATION if lower else 0) | \
+           (SYNONYM_RELATION if synonym else 0) | \
+           (SEMANTIC_RELATION if semantic else 0)
 
 
 class CwnRelation:
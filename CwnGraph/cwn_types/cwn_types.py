@@ -3,6 +3,7 @@ import hashlib
 from enum import Enum, auto
 from typing import Tuple
 from collections import namedtuple
+from collections.abc import Mapping
 
 class GraphStructure:
     def __init__(self):
@@ -10,11 +11,29 @@ class GraphStructure:
         self.E = {}
         self.meta = {}
         self._hash = None
+        self._version = 0
+
+    def graph_version(self):
+        """A value that changes whenever the graph is mutated.
+
+        Mutations made through ``invalidate_caches()`` are always reflected;
+        direct changes to ``V`` or ``E`` are only caught if they change
+        the number of nodes or edges.
+        """
+        return (self._version, len(self.V), len(self.E))
+
+    def invalidate_caches(self):
+        """Drop everything derived from ``V`` and ``E``.
+
+        Call this after modifying ``V`` or ``E`` in place.
+        """
+        self._version += 1
+        self._hash = None
 
     def compute_dict_hash(self, dict_obj):        
         m = hashlib.sha1()
         for k, value in sorted(dict_obj.items()):
-            if isinstance(value, dict):
+            if isinstance(value, Mapping):
                 m.update(pickle.dumps(k))                
                 value_hash = self.compute_dict_hash(value)
                 m.update(value_hash.encode())                 
@@ -24,14 +43,16 @@ class GraphStructure:
         return hash_value
 
     def get_hash(self):
-        if not self._hash:
+        graph_hash = self._hash
+        if not graph_hash:
             Vhash = self.compute_dict_hash(self.V)
             Ehash = self.compute_dict_hash(self.E)
             m = hashlib.sha1()
             m.update(Vhash.encode())
             m.update(Ehash.encode())
-            self._hash = m.hexdigest()        
-        hashStr = self._hash[:6]
+            graph_hash = m.hexdigest()
+            self._hash = graph_hash
+        hashStr = graph_hash[:6]
         return hashStr
 
     def export(self):
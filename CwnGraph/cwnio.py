@@ -6,7 +6,8 @@ def dump_json(V, E, meta, prefix):
         json.dump(meta, fout, indent=2, ensure_ascii=False)
 
     with open(f"{prefix}_nodes.json", "w", encoding="UTF-8") as fout:
-        json.dump(V, fout, indent=2, ensure_ascii=False)
+        strV = {k: dict(v) for k, v in V.items()}
+        json.dump(strV, fout, indent=2, ensure_ascii=False)
     
     with open(f"{prefix}_edges.json", "w", encoding="UTF-8") as fout:        
         strE = {f"{k[0]}-{k[1]}": v for k, v in E.items()}
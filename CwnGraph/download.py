@@ -1,6 +1,7 @@
+import os
 from pathlib import Path
 import requests
-import shutil
+from .cwn_fetch import fetch_image
 
 MANIFEST_URL = "https://raw.githubusercontent.com/lopentu/CwnGraph/develop/etc/manifest.json"
 
@@ -23,8 +24,11 @@ def update_manifest(manifest_in=None):
     cache_dir = get_cache_dir()
     
     manifest_path = (cache_dir/"manifest.json")
-    with manifest_path.open("w", encoding="UTF-8") as fout:
+    # write and rename, so that concurrent readers never see half a file
+    tmp_path = cache_dir / f"manifest.json.tmp{os.getpid()}"
+    with tmp_path.open("w", encoding="UTF-8") as fout:
         json.dump(manifest, fout)
+    os.replace(tmp_path, manifest_path)
     print("manifest version: ", manifest.get("version", "<base>"))
 
 def get_manifest():
@@ -41,29 +45,43 @@ def list_images():
     manifest = get_manifest()
     return [x["tag"] for x in manifest["images"]]
 
-def download_image(google_drive_id: str):
-    import gdown    
-    down_file = gdown.download(id=google_drive_id, quiet=False)
-    cache_dir = get_cache_dir()
-    model_path = cache_dir / down_file
-    shutil.move(down_file, model_path)
-    print("image has downloaded: ", down_file)
+def download_image(img_info, sources=None):
+    """Download an image into the cache, see
+    :func:`fetch_image <CwnGraph.cwn_fetch.fetch_image>`.
+
+    Parameters
+    ----------
+    img_info : dict or str
+        a manifest entry, or the ``drive_id`` of one
+    sources : list, optional
+        :class:`ImageSource <CwnGraph.cwn_fetch.ImageSource>` objects,
+        by default from ``CWN_GRAPH_SOURCES``
+
+    Returns
+    -------
+    Path
+    """
+    if isinstance(img_info, str):
+        entries = [x for x in get_manifest()["images"] if x.get("drive_id") == img_info]
+        if not entries:
+            raise ValueError(f"drive_id {img_info} not in the manifest")
+        img_info = entries[0]
+    return fetch_image(img_info, get_cache_dir(), sources)
 
-def ensure_image(tag: str):
+def get_image_info(tag: str):
+    """The manifest entry of ``tag``: ``file``, ``drive_id``, and
+    optionally ``sha256`` and ``note``."""
     manifest = get_manifest()
     img_info = [x for x in manifest["images"] if x["tag"] == tag]
-    
     if not img_info:
         raise ValueError(f"tag {tag} not found")
-    else:
-        img_info = img_info[0]
-        if "note" in img_info:
-            print("[NOTE]", img_info["note"])
-        img_cache_path = get_cache_dir() / img_info["file"]
-        if not img_cache_path.exists():
-            print(f"downloading image: {img_info['drive_id']}...")
-            download_image(img_info["drive_id"])
-        return img_cache_path        
+    return img_info[0]
+
+def ensure_image(tag: str, sources=None):
+    img_info = get_image_info(tag)
+    if "note" in img_info:
+        print("[NOTE]", img_info["note"])
+    return download_image(img_info, sources)
 
 def download():
     print("Deprecation note: download() is no longer needed after 0.3.0.")
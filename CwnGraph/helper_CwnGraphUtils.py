@@ -1,20 +1,18 @@
+"""Interactive session on a CWN image.
 
-import pickle
-from . import cwn_graph_utils
-import networkx as nx
+usage:
+    python -i -m CwnGraph.helper_CwnGraphUtils [image tag or path]
+"""
+import sys
+from .cwn_base import CwnImage
 
-with open("cwn_graph.pyobj", "rb") as fin:
-    V, E = pickle.load(fin)
-cgu = cwn_graph_utils.CwnGraphUtils(V, E)
-
-G = nx.Graph()
-for v in V.keys():
-    G.add_node(v)
-for e in E.keys():
-    G.add_edge(e[0], e[1])
+img_path_or_tag = sys.argv[1] if len(sys.argv) > 1 else "latest"
+cgu = CwnImage.load(img_path_or_tag)
+V, E = cgu.V, cgu.E
+G = cgu.to_networkx()
 
 print("Available objects: ")
-print("G: NetworkX graph object")
+print("G: NetworkX graph view (read-only)")
 print("V: Raw vertices dictionary")
 print("E: Raw edge dictionary")
-print("cgu: CwnGraphUtils")
+print("cgu: CwnImage")
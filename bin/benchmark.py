@@ -0,0 +1,158 @@
+"""Benchmark CwnGraph query and load paths on a synthetic image.
+
+usage:
+    python benchmark.py [--n-lemma 30000] [--repeat 5]
+                        [--degree-skew 1.0] [--hierarchy-depth 8]
+                        [--save-baseline baseline.json]
+                        [--baseline baseline.json] [--threshold 1.2]
+
+Each operation is timed ``--repeat`` times (the median is reported) and
+run once more under tracemalloc to measure its peak memory. With
+``--baseline``, operations slower or larger than ``--threshold`` times
+the baseline are reported as regressions and the script exits with 1.
+"""
+import os
+import io
+import sys
+import json
+import time
+import pickle
+import argparse
+import platform
+import tempfile
+import statistics
+import tracemalloc
+from contextlib import redirect_stdout, redirect_stderr
+from CwnGraph import CwnImage
+from CwnGraph.cwn_base import load_cwn_image
+from CwnGraph.cwn_synthetic import generate_image
+from CwnGraph.cwnio import dump_json
+
+
+def build_operations(cwn, image_path, tmp_dir, n_queries=20):
+    lemma_ids = [nid for nid, ndata in cwn.V.items()
+                 if ndata["node_type"] == "lemma"][:n_queries]
+    lemmas = [cwn.V[x]["lemma"] for x in lemma_ids]
+    sense_ids = [nid for nid, ndata in cwn.V.items()
+                 if ndata["node_type"] == "sense"]
+    sense_ids = sense_ids[::max(1, len(sense_ids) // n_queries)][:n_queries]
+
+    def load():
+        V, E, meta = load_cwn_image(image_path)
+        CwnImage(V, E, meta)
+
+    compressed_path = os.path.join(tmp_dir, "bench.cwnz")
+    cwn.save(compressed_path, compress=True)
+
+    def load_compressed():
+        V, E, meta = load_cwn_image(compressed_path)
+        CwnImage(V, E, meta)
+
+    def statistics_():
+        # silence the report and the tqdm progress bars
+        with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+            cwn.statistics()
+
+    return {
+        "load": load,
+        "load_compressed": load_compressed,
+        "find_lemma": lambda: [cwn.find_lemma(x) for x in lemmas],
+        "find_all_senses": lambda: [cwn.find_all_senses(x) for x in lemmas],
+        "find_senses": lambda: [cwn.find_senses(lemma=x) for x in lemmas[:3]],
+        "connected": lambda: [cwn.connected(x, max_depth=5) for x in sense_ids],
+        "find_shortest_path": lambda: [
+            cwn.find_shortest_path(src, tgt, is_directed=False)
+            for src, tgt in zip(sense_ids, sense_ids[1:5])],
+        "subgraph": lambda: cwn.subgraph(sense_ids),
+        "simple_statistics": statistics_,
+        "dump_json": lambda: dump_json(cwn.V, cwn.E, cwn.meta,
+                                       os.path.join(tmp_dir, "bench")),
+    }
+
+
+def run_benchmarks(n_lemma, repeat, seed=42, **generator_args):
+    V, E, meta = generate_image(n_lemma, seed, **generator_args)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        image_path = os.path.join(tmp_dir, "bench.pyobj")
+        with open(image_path, "wb") as fout:
+            pickle.dump((V, E, meta), fout)
+        cwn = CwnImage(V, E, meta)
+
+        for op_name, op_func in build_operations(cwn, image_path, tmp_dir).items():
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                op_func()
+                timings.append(time.perf_counter() - t0)
+
+            tracemalloc.start()
+            op_func()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            results[op_name] = {"time": statistics.median(timings),
+                                "min_time": min(timings),
+                                "peak_bytes": peak}
+            print(f"{op_name:>20}: {results[op_name]['time']*1000:10.2f} ms"
+                  f" {peak/2**20:10.2f} MiB")
+
+    return {"meta": {"n_lemma": n_lemma, "n_nodes": len(V), "n_edges": len(E),
+                     "seed": seed, "repeat": repeat, **generator_args,
+                     "python": platform.python_version(),
+                     "platform": platform.platform()},
+            "results": results}
+
+
+# differences below these floors are noise, whatever the ratio
+NOISE_FLOORS = {"time": 0.001, "peak_bytes": 64 * 1024}
+
+def compare(report, baseline, threshold):
+    regressions = []
+    for op_name, base_x in baseline["results"].items():
+        cur_x = report["results"].get(op_name)
+        if cur_x is None:
+            continue
+        for field, floor in NOISE_FLOORS.items():
+            base_value, cur_value = base_x[field], cur_x[field]
+            if cur_value > base_value * threshold and \
+               cur_value - base_value > floor:
+                regressions.append((op_name, field, base_value, cur_value))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--n-lemma", type=int, default=30000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--degree-skew", type=float, default=1.0)
+    parser.add_argument("--hierarchy-depth", type=int, default=8)
+    parser.add_argument("--baseline", help="compare with this baseline")
+    parser.add_argument("--save-baseline", help="write the results to this path")
+    parser.add_argument("--threshold", type=float, default=1.2)
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.n_lemma, args.repeat, args.seed,
+                            degree_skew=args.degree_skew,
+                            hierarchy_depth=args.hierarchy_depth)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="UTF-8") as fout:
+            json.dump(report, fout, indent=2)
+        print("baseline saved: ", args.save_baseline)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="UTF-8") as fin:
+            baseline = json.load(fin)
+        if baseline["meta"]["n_lemma"] != args.n_lemma:
+            print("WARNING: baseline was run with n_lemma =",
+                  baseline["meta"]["n_lemma"])
+        regressions = compare(report, baseline, args.threshold)
+        for op_name, field, base_value, cur_value in regressions:
+            print(f"REGRESSION {op_name}.{field}: "
+                  f"{base_value:.6g} -> {cur_value:.6g} "
+                  f"({cur_value/base_value:.2f}x)")
+        if regressions:
+            sys.exit(1)
+        print("no regression against", args.baseline)
@@ -0,0 +1,24 @@
+"""Serve a directory of images as an HTTP mirror, e.g. to test
+downloads offline or to share images on a local network.
+
+usage: python serve_mirror.py [directory] [port] [host]
+
+Point clients at it with, for example:
+    CWN_GRAPH_SOURCES=http://127.0.0.1:8000,gdrive
+"""
+import sys
+import time
+from CwnGraph.cwn_fetch import serve_mirror
+
+
+if __name__ == "__main__":
+    directory = sys.argv[1] if len(sys.argv) > 1 else "."
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 8000
+    host = sys.argv[3] if len(sys.argv) > 3 else "127.0.0.1"
+    with serve_mirror(directory, host=host, port=port) as mirror:
+        print(f"serving {directory} at {mirror.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,86 @@
+"""Run many reader threads against one shared CwnImage and check that
+every thread sees the same results as a single-threaded run.
+
+usage: python stress_concurrent_reads.py [image_tag_or_path] [n_threads] [n_rounds]
+
+Without an image, or with ``-``, a synthetic image of 3000 lemmas is
+generated, so the check runs offline.
+"""
+import re
+import sys
+import random
+import threading
+from CwnGraph import CwnImage
+from CwnGraph.cwn_synthetic import generate_image
+
+
+def run_queries(cwn, lemma_ids):
+    results = []
+    for lemma_id in lemma_ids:
+        lemma = cwn.find_lemma(f"^{re.escape(cwn.V[lemma_id]['lemma'])}$")
+        senses = cwn.find_all_senses(cwn.V[lemma_id]["lemma"])
+        sense_results = []
+        for sense in senses:
+            sense_results.append((
+                sense.id,
+                tuple((rel[0], rel[1].id if rel[1] else None, rel[2])
+                      for rel in sense.all_relations()),
+                len(sense.all_examples()),
+                tuple(sorted(cwn.connected(sense.id, max_depth=3)))
+            ))
+        results.append((lemma_id, tuple(x.id for x in lemma), tuple(sense_results)))
+    return results
+
+
+if __name__ == "__main__":
+    img = sys.argv[1] if len(sys.argv) > 1 else "-"
+    n_threads = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    n_rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+
+    if img == "-":
+        cwn = CwnImage(*generate_image(n_lemma=3000))
+    else:
+        cwn = CwnImage.load(img)
+    lemma_ids = [nid for nid, ndata in cwn.V.items()
+                 if ndata["node_type"] == "lemma" and ndata.get("lemma")]
+    rng = random.Random(1234)
+    lemma_ids = rng.sample(lemma_ids, min(200, len(lemma_ids)))
+
+    # the reference run goes to a separately loaded image,
+    # so the lazy caches of the shared image start cold.
+    expected = run_queries(CwnImage(cwn.V, cwn.E, cwn.meta), lemma_ids)
+
+    barrier = threading.Barrier(n_threads)
+    errors = []
+
+    def reader(seed):
+        order = list(range(len(lemma_ids)))
+        random.Random(seed).shuffle(order)
+        barrier.wait()
+        for _ in range(n_rounds):
+            results = run_queries(cwn, [lemma_ids[i] for i in order])
+            for i, res_x in zip(order, results):
+                if res_x != expected[i]:
+                    errors.append((seed, lemma_ids[i]))
+
+    threads = [threading.Thread(target=reader, args=(i,))
+               for i in range(n_threads)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    hashes = set()
+    def hasher():
+        hashes.add(cwn.get_hash())
+    threads = [threading.Thread(target=hasher) for _ in range(4)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    print(f"threads: {n_threads}, rounds: {n_rounds}, lemmas: {len(lemma_ids)}")
+    print("mismatches: ", len(errors))
+    print("distinct hashes: ", len(hashes))
+    if errors or len(hashes) != 1:
+        sys.exit(1)
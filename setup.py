@@ -6,8 +6,10 @@ setup(
     packages=find_packages(),
     license='GPL GNUv3',
     author="NTUGIL LOPE Lab",   
+    python_requires=">=3.9",
     setup_requires=["wheel"],
     install_requires=["gdown>=4.4.0", "requests", "nltk"],
+    extras_require={"zstd": ["zstandard"], "lz4": ["lz4"]},
     description="A CWN Python binding with graph structure",
     long_description="A CWN Python binding with graph structure"
 )
@@ -0,0 +1,43 @@
+"""Fixtures shared by the tests: small synthetic images, so the tests run
+offline and without the released image."""
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+# keep the tests off the network and the user's cache: CwnGraph reads its
+# manifest from ~/.cwn_graph on import, so give it a home of its own
+# holding the manifest of the repository
+_home = tempfile.mkdtemp(prefix="cwn-test-home-")
+os.environ["HOME"] = _home
+(Path(_home) / ".cwn_graph").mkdir()
+shutil.copy(Path(__file__).parent.parent / "etc" / "manifest.json",
+            Path(_home) / ".cwn_graph" / "manifest.json")
+
+import pytest
+from CwnGraph import CwnImage
+from CwnGraph.cwn_synthetic import generate_image
+
+
+@pytest.fixture(scope="session")
+def image_data():
+    """``(V, E, meta)`` of a synthetic image of 300 lemmas; shared, not
+    to be modified."""
+    return generate_image(n_lemma=300, seed=7)
+
+
+@pytest.fixture
+def make_image(image_data):
+    """Make a new ``CwnImage`` over copies of ``image_data``, which the
+    test may modify."""
+    def make():
+        V, E, meta = image_data
+        return CwnImage({k: dict(v) for k, v in V.items()},
+                        {k: dict(v) for k, v in E.items()}, dict(meta))
+    return make
+
+
+@pytest.fixture
+def cwn(make_image):
+    return make_image()
+
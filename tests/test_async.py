@@ -0,0 +1,85 @@
+import time
+import asyncio
+import threading
+import pytest
+from CwnGraph import AsyncCwnImage
+
+
+def test_queries_match_the_image(cwn):
+    lemma = cwn.V[cwn.node_ids("lemma")[0]]["lemma"]
+    sense_id = cwn.node_ids("sense")[0]
+
+    async def main():
+        async with AsyncCwnImage(cwn, max_workers=2) as acwn:
+            return await asyncio.gather(acwn.find_lemma(lemma),
+                acwn.find_all_senses(lemma),
+                acwn.connected(sense_id, max_depth=2))
+
+    lemmas, senses, conn = asyncio.run(main())
+    assert lemmas == cwn.find_lemma(lemma)
+    assert senses == cwn.find_all_senses(lemma)
+    assert conn == cwn.connected(sense_id, max_depth=2)
+
+
+def test_identical_calls_are_coalesced(cwn):
+    calls = []
+    release = threading.Event()
+
+    def find_lemma(pattern):
+        calls.append(pattern)
+        release.wait(5)
+        return [pattern]
+    cwn.find_lemma = find_lemma
+
+    async def main():
+        acwn = AsyncCwnImage(cwn, max_workers=4)
+        tasks = [asyncio.ensure_future(acwn.find_lemma("a")) for _ in range(5)]
+        tasks.append(asyncio.ensure_future(acwn.find_lemma("b")))
+        await asyncio.sleep(0.1)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        acwn.close()
+        return results, acwn._inflight
+
+    results, inflight = asyncio.run(main())
+    assert sorted(calls) == ["a", "b"]
+    assert results == [["a"]] * 5 + [["b"]]
+    # every caller gets its own list
+    assert len(set(map(id, results))) == 6
+    assert not inflight
+
+
+def test_timeout(cwn):
+    cwn.find_lemma = lambda pattern: time.sleep(0.5)
+
+    async def main():
+        acwn = AsyncCwnImage(cwn, timeout=0.05)
+        try:
+            await acwn.find_lemma("a")
+        finally:
+            acwn.close(wait=False)
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(main())
+
+
+def test_unknown_method(cwn):
+    acwn = AsyncCwnImage(cwn)
+    with pytest.raises(AttributeError):
+        acwn.remove_node
+    with pytest.raises(ValueError):
+        asyncio.run(acwn.call("remove_node", "x"))
+    acwn.close()
+
+
+def test_process_executor(cwn):
+    lemma = cwn.V[cwn.node_ids("lemma")[0]]["lemma"]
+
+    async def main():
+        async with AsyncCwnImage(cwn, executor="process", max_workers=2) as acwn:
+            return await acwn.find_all_senses(lemma)
+
+    senses = asyncio.run(main())
+    assert senses == cwn.find_all_senses(lemma)
+    # results are decoded into nodes of the parent image
+    assert all(x.cgu is cwn for x in senses)
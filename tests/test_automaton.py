@@ -0,0 +1,76 @@
+import random
+from itertools import islice
+import pytest
+from CwnGraph.cwn_automaton import LemmaAutomaton
+
+LEMMAS = {"電": ("L1",), "電腦": ("L2",), "腦": ("L3",), "電腦化": ("L4",),
+          "人腦": ("L5",), "化": ("L6",)}
+
+
+def brute_force_scan(lemma_index, text):
+    return sorted(((end - len(lemma), end, lemma)
+                   for end in range(1, len(text) + 1)
+                   for lemma in lemma_index if lemma and text[:end].endswith(lemma)),
+                  key=lambda x: (x[1], x[0]))
+
+
+def test_scan():
+    automaton = LemmaAutomaton(LEMMAS)
+    matches = list(automaton.scan("人腦電腦化"))
+    assert [(x.start, x.end, x.lemma) for x in matches] == \
+        brute_force_scan(LEMMAS, "人腦電腦化")
+    assert matches[-1].lemma_ids == ("L6",)
+
+
+def test_scan_matches_brute_force(cwn):
+    lemma_index = cwn.lemma_index
+    automaton = cwn.lemma_automaton
+    rng = random.Random(0)
+    lemmas = list(lemma_index)
+    for _ in range(20):
+        text = "".join(rng.choice(lemmas) + rng.choice(["", "。", "的"])
+                       for _ in range(10))
+        assert [(x.start, x.end, x.lemma) for x in automaton.scan(text)] == \
+            brute_force_scan(lemma_index, text)
+
+
+def test_segment():
+    automaton = LemmaAutomaton(LEMMAS)
+    spans = automaton.segment("人腦電腦化了")
+    assert [x.lemma for x in spans] == ["人腦", "電腦化", "了"]
+    assert spans[-1].lemma_ids == ()
+    assert [(x.start, x.end) for x in spans] == [(0, 2), (2, 5), (5, 6)]
+
+
+def test_scan_many_matches_scan(cwn):
+    automaton = cwn.lemma_automaton
+    lemmas = list(cwn.lemma_index)
+    docs = ["".join(lemmas[i:i+5]) for i in range(0, 200, 5)]
+    expected = [list(automaton.scan(x)) for x in docs]
+    assert list(automaton.scan_many(docs, workers=1)) == expected
+    assert list(automaton.scan_many(docs, workers=2, chunksize=3)) == expected
+    assert list(automaton.scan_many(docs, mode="segment", workers=2)) == \
+        [automaton.segment(x) for x in docs]
+    with pytest.raises(ValueError):
+        automaton.scan_many(docs, mode="tag")
+
+
+def test_scan_many_consumes_documents_lazily():
+    automaton = LemmaAutomaton(LEMMAS)
+    consumed = []
+
+    def documents():
+        for i in range(10000):
+            consumed.append(i)
+            yield "人腦電腦化"
+
+    results = automaton.scan_many(documents(), workers=2, chunksize=4, max_pending=2)
+    assert len(list(islice(results, 3))) == 3
+    assert len(consumed) <= 2 * 4 + 4
+    results.close()
+
+
+def test_lemma_automaton_follows_mutations(cwn):
+    assert not list(cwn.lemma_automaton.scan("電腦"))
+    cwn.add_node("L-new", {"node_type": "lemma", "lemma": "電腦", "lemma_sno": 1})
+    assert [x.lemma_ids for x in cwn.lemma_automaton.scan("電腦")] == [("L-new",)]
@@ -0,0 +1,33 @@
+import importlib.util
+from pathlib import Path
+import pytest
+
+
+@pytest.fixture(scope="module")
+def benchmark():
+    path = Path(__file__).parent.parent / "bin" / "benchmark.py"
+    spec = importlib.util.spec_from_file_location("benchmark", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_run_benchmarks(benchmark):
+    report = benchmark.run_benchmarks(n_lemma=50, repeat=1)
+    assert report["meta"]["n_lemma"] == 50
+    assert {"load", "load_compressed", "find_all_senses", "connected",
+            "find_shortest_path"} <= set(report["results"])
+    for result in report["results"].values():
+        assert result["time"] >= 0 and result["peak_bytes"] >= 0
+
+
+def test_compare(benchmark):
+    baseline = {"results": {
+        "a": {"time": 1.0, "peak_bytes": 10**6},
+        "b": {"time": 0.0001, "peak_bytes": 1000}}}
+    report = {"results": {
+        "a": {"time": 1.5, "peak_bytes": 10**6},
+        # slower, but within the noise floors
+        "b": {"time": 0.0005, "peak_bytes": 5000}}}
+    assert benchmark.compare(report, baseline, 1.2) == [("a", "time", 1.0, 1.5)]
+    assert benchmark.compare(report, baseline, 2.0) == []
@@ -0,0 +1,50 @@
+import random
+from collections import Counter
+import pytest
+from CwnGraph.cwn_bitmap import (SenseSpace, bits_from_positions, iter_positions,
+                                 popcount, split_values)
+
+
+@pytest.mark.parametrize("positions", [[], [0], [3, 5, 63], list(range(0, 1000, 7))])
+def test_bits_and_positions(positions):
+    bits = bits_from_positions(positions, 1000)
+    assert list(iter_positions(bits)) == positions
+    assert popcount(bits) == len(positions) == bin(bits).count("1")
+
+
+def test_set_algebra():
+    rng = random.Random(0)
+    ids = [f"s{i}" for i in range(300)]
+    space = SenseSpace(ids)
+    a_ids = set(rng.sample(ids, 100))
+    b_ids = set(rng.sample(ids, 100))
+    a, b = space.bitmap(a_ids), space.bitmap(b_ids | {"not-a-sense"})
+    in_order = lambda x: [nid for nid in ids if nid in x]
+    assert list(a & b) == in_order(a_ids & b_ids)
+    assert list(a | b) == in_order(a_ids | b_ids)
+    assert list(a - b) == in_order(a_ids - b_ids)
+    assert list(a ^ b) == in_order(a_ids ^ b_ids)
+    assert list(~a) == in_order(set(ids) - a_ids)
+    assert len(a) == 100 and "s0" in space.bitmap(["s0"]) and "x" not in a
+    with pytest.raises(ValueError):
+        a & SenseSpace(ids).bitmap(a_ids)
+
+
+def test_index_matches_brute_force(cwn):
+    bm = cwn.sense_bitmaps
+    senses = cwn.node_ids("sense")
+    V = cwn.V
+    for tag in ("VC", "Na", "D"):
+        assert list(bm.pos(tag)) == [x for x in senses if tag in split_values(V[x]["pos"])]
+    assert list(bm.domain("")) == [x for x in senses if not V[x].get("domain")]
+    sources = {src for (src, _), edata in cwn.E.items() if edata["edge_type"] == "hypernym"}
+    assert list(bm.relation("hypernym")) == [x for x in senses if x in sources]
+
+    counts = bm.counts("domain")
+    assert counts == {k: v for k, v in Counter(V[x].get("domain", "") for x in senses).items()}
+    within = bm.pos("VC")
+    table = bm.crosstab("pos", "domain", within=within)
+    expected = Counter((tag, V[x].get("domain", "")) for x in within
+                       for tag in split_values(V[x]["pos"]) or [""])
+    assert {(row, col): n for row, cols in table.items()
+            for col, n in cols.items()} == dict(expected)
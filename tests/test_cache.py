@@ -0,0 +1,70 @@
+import time
+from CwnGraph.cwn_cache import QueryCache
+
+
+def test_hits_return_copies(cwn):
+    lemma = cwn.V[cwn.node_ids("lemma")[0]]["lemma"]
+    cache = cwn.enable_query_cache()
+    first = cwn.find_all_senses(lemma)
+    first.append(None)
+    second = cwn.find_all_senses(lemma=lemma)
+    assert second == first[:-1]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_arguments_are_normalized(cwn):
+    sense_id = cwn.node_ids("sense")[0]
+    cache = cwn.enable_query_cache()
+    cwn.connected(sense_id)
+    cwn.connected(sense_id, False)
+    cwn.connected(node_id=sense_id, max_conn=1000)
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_mutation_empties_the_cache(cwn):
+    lemma_id = cwn.node_ids("lemma")[0]
+    lemma = cwn.V[lemma_id]["lemma"]
+    cwn.enable_query_cache()
+    n_senses = len(cwn.find_all_senses(lemma))
+    sense_id = cwn.find_all_senses(lemma)[0].id
+    cwn.remove_edge((lemma_id, sense_id))
+    assert len(cwn.find_all_senses(lemma)) == n_senses - 1
+
+
+def fill(cache, key, value, graph_version=0):
+    # as cached_query: a miss, then the computed value
+    cache.get(key, graph_version)
+    cache.put(key, value, graph_version)
+
+
+def test_lru_and_memory_bounds():
+    cache = QueryCache(maxsize=2)
+    for key in "abc":
+        fill(cache, key, [key])
+    assert cache.get("a", 0) == (False, None)
+    assert cache.get("c", 0) == (True, ["c"])
+    assert cache.evictions == 1
+
+    cache = QueryCache(max_bytes=2000)
+    for i in range(10):
+        fill(cache, i, list(range(10)))
+    assert 0 < len(cache) < 10
+    assert cache.total_bytes <= 2000
+
+
+def test_ttl():
+    cache = QueryCache(ttl=0.01)
+    fill(cache, "a", 1)
+    assert cache.get("a", 0) == (True, 1)
+    time.sleep(0.02)
+    assert cache.get("a", 0) == (False, None)
+    assert len(cache) == 0
+
+
+def test_results_of_an_older_version_are_dropped():
+    cache = QueryCache()
+    fill(cache, "a", 1)
+    assert cache.get("a", 1) == (False, None)
+    # computed before the graph changed
+    cache.put("b", 2, 0)
+    assert cache.get("b", 1) == (False, None)
@@ -0,0 +1,66 @@
+from collections import Counter
+from CwnGraph import CwnImage
+from CwnGraph.cwn_types import csg
+
+
+def make_graph():
+    V = {x: {"node_type": "sense"} for x in ("a", "b", "c", "d", "e", "f", "g")}
+    V.update({"syn1": {"node_type": "synset"}, "syn2": {"node_type": "synset"},
+              "syn3": {"node_type": "synset"},
+              "pwn1": {"node_type": "pwn_synset"}})
+    E = {("a", "syn1"): "is_synset", ("b", "syn1"): "is_synset",
+         ("c", "syn1"): "is_synset", ("d", "syn2"): "is_synset",
+         # a-b linked both ways, b-c one way, a-c missing
+         ("a", "b"): "synonym", ("b", "a"): "synonym", ("c", "b"): "synonym",
+         # in different synsets, then in no synset
+         ("a", "d"): "synonym", ("e", "f"): "synonym", ("f", "e"): "synonym",
+         ("g", "d"): "synonym", ("a", "pwn1"): "synonym",
+         ("d", "e"): "hypernym", ("e", "d"): "hyponym", ("d", "f"): "hypernym",
+         ("f", "d"): "hypernym", ("g", "e"): "meronym",
+         ("a", "pwn1x"): "hypernym"}
+    V["pwn1x"] = {"node_type": "pwn_synset"}
+    return CwnImage(V, {k: {"edge_type": v} for k, v in E.items()}, {})
+
+
+def test_suggestions():
+    cwn = make_graph()
+    assert list(cwn.check_consistency()) == [
+        (csg.INVERSE_ERROR, ("d", "f", "hypernym", "hypernym")),
+        (csg.INVERSE_ERROR, ("f", "d", "hypernym", "hypernym")),
+        (csg.INVERSE_NOT_EXISTS, ("g", "e", "meronym", "holonym")),
+        (csg.SYN_MISSING_REL, ("syn1", "a", "c")),
+        (csg.SYN_NO_SENSE, "syn3"),
+        (csg.SYN_REL_DIFF, ("a", "d", "syn1", "syn2")),
+        (csg.NO_SYNSET, ("e", "f")),
+        (csg.MISSING_SYNSET, ("g", "syn2")),
+    ]
+
+
+def brute_force_missing(cwn):
+    E = cwn.E
+
+    def is_synonym_pair(a, b):
+        return any(E.get(key, {}).get("edge_type") == "synonym"
+                   for key in ((a, b), (b, a)))
+
+    ret = []
+    for synset_id in cwn.node_ids("synset"):
+        members = [src for src, tgt in cwn.edge_tgt_index.get(synset_id, ())
+                   if E[(src, tgt)]["edge_type"] == "is_synset"]
+        ret.extend((synset_id, a, b) for i, a in enumerate(members)
+                   for b in members[i+1:] if not is_synonym_pair(a, b))
+    return ret
+
+
+def test_synthetic_image(cwn):
+    suggestions = list(cwn.check_consistency())
+    assert [x for code, x in suggestions if code == csg.SYN_MISSING_REL] == \
+        brute_force_missing(cwn)
+    # links to PWN synsets are not checked
+    pwn_ids = set(cwn.node_ids("pwn_synset"))
+    assert not any(pwn_ids & set(x) for _, x in suggestions if isinstance(x, tuple))
+    # each pair is reported once
+    pairs = Counter(frozenset(x[:2]) for code, x in suggestions
+                    if code in (csg.NO_SYNSET, csg.SYN_REL_DIFF))
+    assert all(n == 1 for n in pairs.values())
+    assert list(cwn.check_consistency(workers=2, chunksize=50)) == suggestions
@@ -0,0 +1,62 @@
+import re
+import threading
+from CwnGraph import CwnImage
+
+
+def run_queries(cwn, lemma_ids):
+    results = []
+    for lemma_id in lemma_ids:
+        lemma = cwn.V[lemma_id]["lemma"]
+        senses = cwn.find_all_senses(lemma)
+        results.append((
+            tuple(x.id for x in cwn.find_lemma(f"^{re.escape(lemma)}$")),
+            tuple((x.id, tuple((rel[0], rel[1].id if rel[1] else None, rel[2])
+                               for rel in x.all_relations()),
+                   tuple(sorted(cwn.connected(x.id, max_depth=3))))
+                  for x in senses)))
+    return results
+
+
+def test_concurrent_readers_see_single_threaded_results(image_data):
+    V, E, meta = image_data
+    cwn = CwnImage(V, E, meta)
+    lemma_ids = list(cwn.node_ids("lemma"))[:100]
+    # the reference runs on its own image, so the caches of cwn start cold
+    expected = run_queries(CwnImage(V, E, meta), lemma_ids)
+
+    n_threads = 8
+    barrier = threading.Barrier(n_threads)
+    results = [None] * n_threads
+    hashes = set()
+
+    def reader(i):
+        order = lemma_ids[i:] + lemma_ids[:i]
+        barrier.wait()
+        hashes.add(cwn.get_hash())
+        results[i] = dict(zip(order, run_queries(cwn, order)))
+
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(n_threads)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+
+    for res in results:
+        assert [res[x] for x in lemma_ids] == expected
+    assert len(hashes) == 1
+
+
+def test_all_relations_leaves_cached_relations_unchanged(cwn):
+    sense = next(x for x in cwn.senses() if x.facets and x.relations)
+    n_relations = len(sense.relations)
+    first = sense.all_relations()
+    assert len(first) > n_relations
+    assert sense.all_relations() == first
+    assert len(sense.relations) == n_relations
+
+
+def test_lemma_synsets_keep_senses(cwn):
+    lemma = cwn.find_lemma(".")[0]
+    senses = lemma.senses
+    lemma.synsets
+    assert lemma.senses == senses
@@ -0,0 +1,69 @@
+import pytest
+from CwnGraph import CwnImage
+from CwnGraph.cwn_core import IntGraph
+
+
+def by_edges(cwn):
+    # the traversals of CwnGraphUtils before IntGraph
+    image = CwnImage(cwn.V, cwn.E, cwn.meta)
+    image.use_core = False
+    return image
+
+
+OPTIONS = [{}, {"max_depth": 2}, {"is_directed": True, "lemma_guard": False},
+           {"include_upper_relations": False, "include_lower_relations": False},
+           {"include_synonym": False, "include_facets": True}, {"max_conn": 5}]
+
+
+@pytest.mark.parametrize("options", OPTIONS)
+def test_connected_matches_edge_traversal(cwn, options):
+    reference = by_edges(cwn)
+    for node_id in list(cwn.V)[::7]:
+        assert cwn.connected(node_id, **options) == \
+            reference.connected(node_id, **options), node_id
+
+
+def test_shortest_path_matches_edge_traversal(cwn):
+    reference = by_edges(cwn)
+    sense_ids = cwn.node_ids("sense")[::10]
+    for src, tgt in zip(sense_ids, sense_ids[1:]):
+        for is_directed in (True, False):
+            assert cwn.find_shortest_path(src, tgt, is_directed) == \
+                reference.find_shortest_path(src, tgt, is_directed)
+
+
+def test_unknown_ids(cwn):
+    assert cwn.connected("no-such-node") == {"no-such-node"}
+    assert cwn.find_shortest_path("no-such-node", cwn.node_ids("sense")[0]) == []
+
+
+def test_interning():
+    V = {"a": {"node_type": "sense"}, "b": {"node_type": "lemma"}}
+    E = {("b", "a"): {"edge_type": "has_sense"},
+         ("a", "x"): {"edge_type": "synonym"}}
+    core = IntGraph(V, E)
+    # the target outside V is interned after the nodes of V
+    assert core.ids == ["a", "b", "x"]
+    assert core.index == {"a": 0, "b": 1, "x": 2}
+    assert list(core.node_types) == [0, 1, -1]
+    assert list(core.neighbours(0, is_directed=False)) == \
+        [(2, core.edge_type_codes["synonym"]), (1, core.edge_type_codes["has_sense"])]
+
+
+def test_many_types():
+    V = {f"n{i}": {"node_type": f"type{i}"} for i in range(300)}
+    E = {(f"n{i}", f"n{i+1}"): {"edge_type": f"rel{i}"} for i in range(299)}
+    core = IntGraph(V, E)
+    assert core.node_types[299] == 299
+    assert list(core.neighbours(298)) == [(299, 298)]
+    cwn = CwnImage(V, E, {})
+    assert cwn.to_sparse(relation_types=["rel298"]).matrix.nnz == 1
+    assert cwn.to_sparse(node_types=["type0", "type1"]).matrix.nnz == 1
+
+
+def test_too_many_types(monkeypatch):
+    from CwnGraph import cwn_core
+    monkeypatch.setattr(cwn_core, "MAX_TYPES", 3)
+    V = {f"n{i}": {"node_type": f"type{i}"} for i in range(4)}
+    with pytest.raises(ValueError, match="more than 3 node types"):
+        IntGraph(V, {})
@@ -0,0 +1,85 @@
+import pytest
+from CwnGraph.cwn_bitmap import split_values
+
+np = pytest.importorskip("numpy")
+from CwnGraph.cwn_embeddings import SenseEmbeddings
+
+
+def encode(texts):
+    # a deterministic stand-in for a sentence encoder
+    return np.array([np.random.default_rng(sum(map(ord, x))).normal(size=16)
+                     for x in texts])
+
+
+@pytest.fixture
+def embeddings(cwn):
+    embeddings = SenseEmbeddings.from_encoder(cwn, encode, batch_size=50, model="test")
+    cwn.attach_embeddings(embeddings)
+    return embeddings
+
+
+def brute_force(embeddings, vector, keep):
+    vectors = np.asarray(embeddings.vectors)
+    scores = vectors @ vector / np.linalg.norm(vectors, axis=1) / np.linalg.norm(vector)
+    ranked = sorted((x for x in range(len(scores)) if keep(embeddings.ids[x])),
+                    key=lambda x: -scores[x])
+    return [embeddings.ids[x] for x in ranked]
+
+
+def test_from_encoder(cwn, embeddings):
+    assert embeddings.ids == list(cwn.node_ids("sense"))
+    assert embeddings.vectors.shape == (len(embeddings.ids), 16)
+    assert embeddings.meta == {"graph_hash": cwn.get_hash(), "model": "test"}
+
+
+def test_save_and_load(cwn, embeddings, tmp_path):
+    image_path = tmp_path / "img.pyobj"
+    cwn.save(image_path)
+    embeddings.save(image_path)
+    loaded = SenseEmbeddings.load(image_path)
+    assert isinstance(loaded.vectors, np.memmap)
+    assert loaded.ids == embeddings.ids
+    assert np.array_equal(loaded.vectors, embeddings.vectors)
+
+    cwn.image_path = str(image_path)
+    assert cwn.load_embeddings().ids == embeddings.ids
+    cwn.update_node(cwn.node_ids("sense")[0], **{"def": "changed"})
+    with pytest.raises(ValueError):
+        cwn.load_embeddings()
+    assert cwn.load_embeddings(strict=False).ids == embeddings.ids
+
+
+def test_nearest_senses(cwn, embeddings):
+    vector = encode(["query"])[0]
+    ret = cwn.nearest_senses(vector, k=5)
+    assert [x.id for x, _ in ret] == brute_force(embeddings, vector, lambda x: True)[:5]
+    assert all(a >= b for (_, a), (_, b) in zip(ret, ret[1:]))
+
+    ret = cwn.nearest_senses(vector, k=5, pos="VC")
+    assert [x.id for x, _ in ret] == brute_force(embeddings, vector,
+        lambda x: "VC" in split_values(cwn.V[x]["pos"]))[:5]
+
+    lemma = cwn.V[cwn.node_ids("lemma")[0]]["lemma"]
+    ret = cwn.nearest_senses(vector, k=50, lemma=lemma)
+    assert sorted(x.id for x, _ in ret) == sorted(cwn.lemma_sense_ids(lemma))
+
+
+def test_ivf_search(embeddings):
+    vector = encode(["query"])[0]
+    exact_rows, exact_scores = embeddings.search(vector, k=10)
+    ann = embeddings.build_index(n_lists=8)
+    # probing every list finds the exact neighbours
+    rows, scores = embeddings.search(vector, k=10, n_probe=8, exact_threshold=0)
+    assert list(rows) == list(exact_rows)
+    assert scores == pytest.approx(exact_scores, rel=1e-5)
+    assert len(ann.search(vector, k=10, n_probe=2)[0]) <= 10
+
+    mask = np.zeros(len(embeddings), dtype=bool)
+    mask[::3] = True
+    rows, _ = embeddings.search(vector, k=10, mask=mask, n_probe=8, exact_threshold=0)
+    assert all(mask[rows])
+
+
+def test_no_embeddings(cwn):
+    with pytest.raises(ValueError):
+        cwn.nearest_senses([0.0] * 16)
@@ -0,0 +1,60 @@
+import pytest
+from CwnGraph.cwn_examples import parse_example, strip_markers
+
+
+@pytest.mark.parametrize("example, expected", [
+    ("他<跑>得很快", ("他跑得很快", ((1, 2),))),
+    ("<我們>去<看>", ("我們去看", ((0, 2), (3, 4)))),
+    ("  <快>走 ", ("快走", ((0, 1),))),
+    ("沒有標記", ("沒有標記", ())),
+    ("多餘的>括號<", ("多餘的括號", ())),
+    ("<>空的", ("空的", ())),
+])
+def test_parse_example(example, expected):
+    assert parse_example(example) == expected
+    assert strip_markers(example).strip() == expected[0]
+
+
+def make_examples(cwn):
+    sense_id, other_id = cwn.node_ids("sense")[:2]
+    facet_id = "facet-x"
+    cwn.update_node(sense_id, examples=["他<跑>得很快", "他<跑>得很快", "", "<>"])
+    cwn.add_node(facet_id, {"node_type": "facet", "examples": ["他<跑>得很快", "<走>"]})
+    cwn.add_edge((sense_id, facet_id), {"edge_type": "has_facet"})
+    cwn.update_node(other_id, examples=["他<跑>得很快"])
+    return sense_id, other_id, facet_id
+
+
+def test_dedup_and_facets(cwn):
+    sense_id, other_id, facet_id = make_examples(cwn)
+
+    def records(**kwargs):
+        return [(x.sense_id, x.node_id, x.text) for x in cwn.iter_examples(**kwargs)
+                if x.sense_id in (sense_id, other_id)]
+
+    assert records() == [(sense_id, sense_id, "他跑得很快"),
+                         (sense_id, facet_id, "走"),
+                         (other_id, other_id, "他跑得很快")]
+    assert records(dedup="global") == [(sense_id, sense_id, "他跑得很快"),
+                                       (sense_id, facet_id, "走")]
+    assert records(include_facets=False) == [(sense_id, sense_id, "他跑得很快"),
+                                             (other_id, other_id, "他跑得很快")]
+    assert len(records(dedup=None)) == 5
+
+
+def test_batches(cwn):
+    examples = list(cwn.iter_examples())
+    batches = list(cwn.iter_examples(batch_size=7))
+    assert all(len(x) == 7 for x in batches[:-1]) and 0 < len(batches[-1]) <= 7
+    assert [x for batch in batches for x in batch] == examples
+    with pytest.raises(ValueError):
+        next(cwn.iter_examples(batch_size=0))
+    with pytest.raises(ValueError):
+        cwn.iter_examples(dedup="lemma")
+
+
+def test_spans_point_at_the_target(cwn):
+    for example in cwn.iter_examples():
+        lemma = cwn.from_sense_id(example.sense_id).head_word
+        for start, end in example.target_spans:
+            assert example.text[start:end] == lemma
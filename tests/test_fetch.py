@@ -0,0 +1,127 @@
+import os
+import threading
+import pytest
+from CwnGraph.cwn_fetch import (fetch_image, FileLock, LocalDirSource, HttpMirrorSource,
+                                ImageSource, serve_mirror, parse_sources)
+from CwnGraph.cwn_imagefile import file_sha256
+
+pytest.importorskip("requests")
+
+
+@pytest.fixture
+def mirror_dir(tmp_path):
+    directory = tmp_path / "mirror"
+    directory.mkdir()
+    (directory / "img.cwnz").write_bytes(os.urandom(3 * 2**20 + 123))
+    return directory
+
+
+@pytest.fixture
+def img_info(mirror_dir):
+    fpath = mirror_dir / "img.cwnz"
+    return {"file": "img.cwnz", "size": fpath.stat().st_size,
+            "sha256": file_sha256(fpath)}
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    directory = tmp_path / "cache"
+    directory.mkdir()
+    return directory
+
+
+@pytest.fixture(params=["local", "http"])
+def source(request, mirror_dir):
+    if request.param == "local":
+        yield LocalDirSource(mirror_dir)
+    else:
+        with serve_mirror(mirror_dir) as mirror:
+            yield HttpMirrorSource(mirror.url)
+
+
+class FailingSource(ImageSource):
+    """Writes the first ``n_bytes`` of the image, then fails."""
+    def __init__(self, directory, n_bytes):
+        self.directory = directory
+        self.n_bytes = n_bytes
+        self.calls = 0
+
+    def fetch(self, img_info, part_path):
+        self.calls += 1
+        data = (self.directory / img_info["file"]).read_bytes()
+        part_path.write_bytes(data[:self.n_bytes])
+        raise IOError("connection reset")
+
+
+def test_download(source, img_info, cache_dir, mirror_dir):
+    img_path = fetch_image(img_info, cache_dir, sources=[source])
+    assert img_path.read_bytes() == (mirror_dir / "img.cwnz").read_bytes()
+    assert not (cache_dir / "img.cwnz.part").exists()
+    # cached: no source is tried
+    assert fetch_image(img_info, cache_dir, sources=[]) == img_path
+
+
+def test_resume(source, img_info, cache_dir, mirror_dir):
+    failing = FailingSource(mirror_dir, 2**20 + 7)
+    img_path = fetch_image(img_info, cache_dir, sources=[failing, source])
+    assert failing.calls == 1
+    assert file_sha256(img_path) == img_info["sha256"]
+
+
+@pytest.mark.parametrize("with_size", [True, False])
+def test_junk_part_file(source, img_info, cache_dir, with_size):
+    # a part file of another image: the resumed download is corrupted,
+    # so the source is tried again from scratch
+    (cache_dir / "img.cwnz.part").write_bytes(b"x" * 1000)
+    if not with_size:
+        del img_info["size"]
+    img_path = fetch_image(img_info, cache_dir, sources=[source])
+    assert file_sha256(img_path) == img_info["sha256"]
+
+
+def test_corrupted_source(source, img_info, cache_dir, mirror_dir):
+    (mirror_dir / "img.cwnz").write_bytes(b"y" * img_info["size"])
+    with pytest.raises(IOError, match="cannot download"):
+        fetch_image(img_info, cache_dir, sources=[source])
+    assert not (cache_dir / "img.cwnz.part").exists()
+    assert not (cache_dir / "img.cwnz").exists()
+
+
+def test_failed_download_keeps_the_part(img_info, cache_dir, mirror_dir):
+    failing = FailingSource(mirror_dir, 1000)
+    with pytest.raises(IOError, match="connection reset"):
+        fetch_image(img_info, cache_dir, sources=[failing])
+    assert failing.calls == 1
+    assert (cache_dir / "img.cwnz.part").stat().st_size == 1000
+
+
+def test_lock(img_info, cache_dir, mirror_dir):
+    with FileLock(cache_dir / "img.cwnz.lock"):
+        with pytest.raises(TimeoutError):
+            fetch_image(img_info, cache_dir, sources=[LocalDirSource(mirror_dir)],
+                        lock_timeout=0.2)
+
+    class CountingSource(LocalDirSource):
+        calls = 0
+
+        def fetch(self, img_info, part_path):
+            CountingSource.calls += 1
+            super().fetch(img_info, part_path)
+
+    source = CountingSource(mirror_dir)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+                   fetch_image(img_info, cache_dir, sources=[source])))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(results)) == 1 and CountingSource.calls == 1
+
+
+def test_parse_sources(tmp_path):
+    sources = parse_sources(f"http://mirror.local/cwn/, gdrive,{tmp_path},")
+    assert [type(x).__name__ for x in sources] == \
+        ["HttpMirrorSource", "GoogleDriveSource", "LocalDirSource"]
+    assert sources[0].base_url == "http://mirror.local/cwn"
@@ -0,0 +1,57 @@
+import random
+import pytest
+from CwnGraph.cwn_fuzzy import LemmaMatcher, edit_distance, canonical_chars
+
+
+@pytest.mark.parametrize("a, b, distance", [
+    ("電腦", "電腦", 0), ("電腦", "電惱", 1), ("電腦", "腦電", 1),
+    ("電腦化", "電腦", 1), ("微電腦", "電腦化", 2), ("abcd", "wxyz", 4)])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b, 5) == distance
+    if distance:
+        # past the bound: bound + 1
+        assert edit_distance(a, b, distance - 1) == distance
+
+
+def test_search_matches_brute_force(cwn):
+    lemmas = list(cwn.lemma_index)
+    matcher = LemmaMatcher(lemmas)
+    rng = random.Random(0)
+    for lemma in rng.sample(lemmas, 40):
+        # a typo: substitute, delete, or swap a character
+        chars = list(lemma)
+        i = rng.randrange(len(chars))
+        op = rng.choice(["sub", "del", "swap"])
+        if op == "sub":
+            chars[i] = "丁"
+        elif op == "del" and len(chars) > 1:
+            del chars[i]
+        elif i + 1 < len(chars):
+            chars[i], chars[i+1] = chars[i+1], chars[i]
+        word = "".join(chars)
+        for max_distance in (1, 2):
+            cap = min(max_distance, len(word) - 1)
+            expected = sorted((edit_distance(word, x, cap), x != word, x)
+                              for x in lemmas if edit_distance(word, x, cap) <= cap)
+            assert matcher.search(word, max_distance, limit=1000) == \
+                [(x, d) for d, _, x in expected]
+
+
+def test_variants_and_aliases():
+    matcher = LemmaMatcher(["臺灣", "台北", "番茄"], variants={"臺": "台"},
+                           aliases=[("番茄", "西紅柿")])
+    assert matcher.search("台灣", 0) == [("臺灣", 0)]
+    assert matcher.search("臺北", 0) == [("台北", 0)]
+    assert matcher.search("西紅柿", 0) == [("番茄", 0)]
+    with pytest.raises(ValueError):
+        matcher.search("台灣", 3)
+    assert canonical_chars([("b", "a"), ("c", "b")]) == {"b": "a", "c": "a"}
+
+
+def test_find_lemma_fuzzy_uses_variant_edges(cwn):
+    sense_a, sense_b = cwn.node_ids("sense")[:2]
+    cwn.add_node("L1", {"node_type": "lemma", "lemma": "臺灣", "lemma_sno": 1})
+    cwn.add_node("L2", {"node_type": "lemma", "lemma": "台灣", "lemma_sno": 1})
+    cwn.add_edge(("L1", "L2"), {"edge_type": "varword"})
+    assert [x.id for x in cwn.find_lemma_fuzzy("臺灣", max_distance=0)] == ["L1", "L2"]
+    assert [x.id for x in cwn.find_lemma_fuzzy("台湾", max_distance=1)][:2] == ["L2", "L1"]
@@ -0,0 +1,81 @@
+import pickle
+import pytest
+from CwnGraph.cwn_imagefile import (write_image, read_image, file_sha256,
+                                    is_image_file, CwnImageIntegrityError, MAGIC)
+
+
+@pytest.fixture
+def image_file(image_data, tmp_path):
+    V, E, meta = image_data
+    fpath = tmp_path / "img.cwnz"
+    info = write_image(fpath, V, E, meta, codec="zlib", chunksize=200)
+    return fpath, info
+
+
+def test_round_trip(image_data, image_file):
+    fpath, info = image_file
+    assert is_image_file(fpath)
+    assert info["sha256"] == file_sha256(fpath) and info["size"] == fpath.stat().st_size
+    V, E, meta = read_image(fpath, sha256=info["sha256"], prefetch=1)
+    assert (V, E, meta) == image_data
+    assert list(V) == list(image_data[0])
+
+
+def test_bit_flips(image_file):
+    fpath, info = image_file
+    data = fpath.read_bytes()
+    # in the magic, the header length, the header and a section
+    for pos in (3, len(MAGIC) + 2, len(MAGIC) + 40, len(data) // 2, len(data) - 1):
+        corrupted = bytearray(data)
+        corrupted[pos] ^= 0x10
+        fpath.write_bytes(bytes(corrupted))
+        with pytest.raises(CwnImageIntegrityError):
+            read_image(fpath)
+
+
+def test_truncated_and_trailing(image_file):
+    fpath, info = image_file
+    data = fpath.read_bytes()
+    for size in (4, len(MAGIC) + 10, len(data) // 3, len(data) - 1):
+        fpath.write_bytes(data[:size])
+        with pytest.raises(CwnImageIntegrityError, match="truncated|magic|header"):
+            read_image(fpath)
+    fpath.write_bytes(data + b"x")
+    with pytest.raises(CwnImageIntegrityError, match="trailing"):
+        read_image(fpath)
+
+
+def test_sha256_mismatch(image_file):
+    fpath, _ = image_file
+    with pytest.raises(CwnImageIntegrityError, match="SHA-256"):
+        read_image(fpath, sha256="0" * 64)
+
+
+def test_legacy_pickle(image_data, tmp_path):
+    fpath = tmp_path / "img.pyobj"
+    V, E, meta = image_data
+    with open(fpath, "wb") as fout:
+        pickle.dump((V, E), fout)
+    assert not is_image_file(fpath)
+    assert read_image(fpath) == (V, E, {})
+    assert read_image(fpath, sha256=file_sha256(fpath)) == (V, E, {})
+    with pytest.raises(CwnImageIntegrityError, match="SHA-256"):
+        read_image(fpath, sha256="0" * 64)
+
+
+@pytest.mark.parametrize("data", [
+    b"", b"junk" * 100, pickle.dumps((1, 2))[:-3], pickle.dumps(42),
+    pickle.dumps({"a": 1}), pickle.dumps(({}, {}, {}, {})),
+    # refers to a missing global
+    b"cno_such_module\nno_such_name\n.",
+])
+def test_corrupt_legacy_pickle(tmp_path, data):
+    fpath = tmp_path / "img.pyobj"
+    fpath.write_bytes(data)
+    with pytest.raises(CwnImageIntegrityError):
+        read_image(fpath)
+    # a file not matching the manifest is reported as such
+    with pytest.raises(CwnImageIntegrityError, match="SHA-256"):
+        read_image(fpath, sha256="0" * 64)
+    with pytest.raises(CwnImageIntegrityError, match="not a pickled image"):
+        read_image(fpath, sha256=file_sha256(fpath))
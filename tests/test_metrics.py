@@ -0,0 +1,67 @@
+import pytest
+from CwnGraph import CwnImage, Metrics, CallbackSink, PrometheusTextSink
+
+
+def test_calls_and_errors(cwn):
+    events = []
+    metrics = cwn.enable_metrics(sinks=[CallbackSink(events.append)])
+    cwn.find_lemma("a")
+    with pytest.raises(Exception):
+        cwn.find_lemma("(")
+    snapshot = metrics.snapshot()
+    assert snapshot['cwn_query_calls_total{method="find_lemma"}'] == 2
+    assert snapshot['cwn_query_errors_total{method="find_lemma"}'] == 1
+    assert snapshot['cwn_query_duration_seconds{method="find_lemma"}']["count"] == 2
+    assert [x["event"] for x in events] == ["query", "query"]
+    assert "error" in events[1]
+
+
+def test_traversal_sizes(cwn):
+    metrics = cwn.enable_metrics()
+    cwn.connected(cwn.node_ids("sense")[0], max_depth=2)
+    nodes = metrics.snapshot()['cwn_traversal_nodes_visited{method="connected"}']
+    assert nodes["count"] == 1 and nodes["sum"] >= 1
+
+
+def test_cache_and_index_hits(cwn):
+    metrics = cwn.enable_metrics()
+    cwn.enable_query_cache()
+    lemma = cwn.V[cwn.node_ids("lemma")[0]]["lemma"]
+    cwn.find_all_senses(lemma)
+    cwn.find_all_senses(lemma)
+    cwn.find_all_senses(lemma + "?")
+    cwn.query().pos("Na").count()
+    cwn.query().definition("。").count()
+
+    snapshot = metrics.snapshot()
+    assert snapshot['cwn_query_cache_hits_total{method="find_all_senses"}'] == 1
+    assert snapshot['cwn_query_cache_misses_total{method="find_all_senses"}'] == 2
+    key = '{{index="{}",method="{}"}}'
+    assert snapshot["cwn_index_hits_total" + key.format("lemma_index", "find_all_senses")] == 1
+    assert snapshot["cwn_index_misses_total" + key.format("lemma_index", "find_all_senses")] == 1
+    assert snapshot["cwn_index_hits_total" + key.format("sense_bitmaps", "query")] == 1
+    assert snapshot["cwn_index_misses_total" + key.format("sense_bitmaps", "query")] == 1
+
+
+def test_load_phases_and_prometheus_sink(image_data, tmp_path):
+    image_path = tmp_path / "img.pyobj"
+    CwnImage(*image_data).save(image_path)
+    prom_path = tmp_path / "cwn.prom"
+    metrics = Metrics([PrometheusTextSink(prom_path)])
+    cwn = CwnImage.load(str(image_path), metrics=metrics)
+    assert cwn.metrics is metrics
+    cwn.find_lemma("a")
+    metrics.flush()
+
+    text = prom_path.read_text(encoding="UTF-8")
+    for phase in ("resolve", "read", "index"):
+        assert f'cwn_image_load_seconds_count{{phase="{phase}"}} 1' in text
+    assert "# TYPE cwn_query_calls_total counter" in text
+    assert 'cwn_query_calls_total{method="find_lemma"} 1' in text
+
+
+def test_disabled_metrics_record_nothing(cwn):
+    metrics = cwn.enable_metrics()
+    cwn.disable_metrics()
+    cwn.find_lemma("a")
+    assert metrics.snapshot() == {}
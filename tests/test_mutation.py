@@ -0,0 +1,104 @@
+import random
+import pytest
+from CwnGraph import CwnImage
+from CwnGraph.cwn_graph_utils import PostingIndex
+from CwnGraph.cwn_types import CwnIdNotFoundError
+
+
+def warm_up(cwn):
+    # build the indexes and caches, so that the mutations patch them
+    cwn.node_ids("sense")
+    cwn.lemma_index
+    cwn.core
+    cwn.sense_bitmaps.pos("VC")
+    cwn.sense_bitmaps.relation("hypernym")
+    cwn.lemma_matcher
+    cwn.phonetic_index
+
+
+def mutate(cwn, rng, n):
+    for i in range(n):
+        sense_ids = cwn.node_ids("sense")
+        lemma_ids = cwn.node_ids("lemma")
+        op = rng.choice(["add_lemma", "add_sense", "retype", "update", "rename",
+                         "remove_node", "add_edge", "remove_edge"])
+        if op == "add_lemma":
+            cwn.add_node(f"L{i}", {"node_type": "lemma", "lemma": f"詞{i % 3}",
+                                   "lemma_sno": 1, "zhuyin": "ㄘˊ"})
+        elif op == "add_sense":
+            cwn.add_node(f"S{i}", {"node_type": "sense", "pos": "VC,Na",
+                                   "def": "定義", "domain": "bio", "examples": []})
+        elif op == "retype":
+            cwn.update_node(rng.choice(sense_ids), node_type="facet")
+        elif op == "update":
+            cwn.update_node(rng.choice(sense_ids), pos="VH", domain="med")
+        elif op == "rename":
+            cwn.update_node(rng.choice(lemma_ids), lemma=f"詞{i % 3}")
+        elif op == "remove_node":
+            cwn.remove_node(rng.choice(list(sense_ids) + list(lemma_ids)))
+        elif op == "add_edge":
+            cwn.add_edge((rng.choice(sense_ids), rng.choice(sense_ids)),
+                         {"edge_type": rng.choice(["hypernym", "synonym"])})
+        else:
+            cwn.remove_edge(rng.choice(list(cwn.E)))
+        if rng.random() < 0.3:
+            # reads between the mutations freeze the changed postings
+            cwn.node_ids("sense")
+            cwn.lemma_index.get(f"詞{i % 3}")
+
+
+def as_sets(index):
+    return {k: set(v) for k, v in index.items() if v}
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_indexes_match_a_rebuild(cwn, seed):
+    warm_up(cwn)
+    mutate(cwn, random.Random(seed), 60)
+    rebuilt = CwnImage({k: dict(v) for k, v in cwn.V.items()},
+                       {k: dict(v) for k, v in cwn.E.items()}, {})
+
+    for node_type in ("lemma", "sense", "facet", "synset"):
+        assert set(cwn.node_ids(node_type)) == set(rebuilt.node_ids(node_type))
+        assert len(cwn.node_ids(node_type)) == len(rebuilt.node_ids(node_type))
+    assert as_sets(cwn.lemma_index) == as_sets(rebuilt.lemma_index)
+    assert as_sets(cwn.edge_src_index) == as_sets(rebuilt.edge_src_index)
+    assert as_sets(cwn.edge_tgt_index) == as_sets(rebuilt.edge_tgt_index)
+    assert set(cwn.sense_bitmaps.pos("VC")) == set(rebuilt.sense_bitmaps.pos("VC"))
+    assert set(cwn.sense_bitmaps.relation("hypernym")) == \
+        set(rebuilt.sense_bitmaps.relation("hypernym"))
+    assert cwn.lemma_matcher.forms.keys() == rebuilt.lemma_matcher.forms.keys()
+    assert cwn.phonetic_index.find("ci2") == rebuilt.phonetic_index.find("ci2")
+    for node_id in cwn.node_ids("sense")[::5]:
+        assert cwn.connected(node_id) == rebuilt.connected(node_id)
+
+
+def test_new_nodes_come_last(cwn):
+    sense_ids = list(cwn.node_ids("sense"))
+    cwn.add_node("S-new", {"node_type": "sense", "pos": "Na", "def": ""})
+    cwn.update_node(sense_ids[0], node_type="facet")
+    assert list(cwn.node_ids("sense")) == sense_ids[1:] + ["S-new"]
+    assert cwn.node_ids("facet")[-1] == sense_ids[0]
+
+
+def test_unknown_ids(cwn):
+    with pytest.raises(CwnIdNotFoundError):
+        cwn.update_node("no-such-node", pos="Na")
+    with pytest.raises(CwnIdNotFoundError):
+        cwn.remove_node("no-such-node")
+    with pytest.raises(CwnIdNotFoundError):
+        cwn.remove_edge(("no-such-node", "other"))
+
+
+def test_posting_index():
+    index = PostingIndex({"a": [1, 2]})
+    index.add("a", 3)
+    index.add("a", 1)
+    index.add("b", 4)
+    assert index["a"] == (1, 2, 3) and index.get("b") == (4,)
+    index.discard("a", 2)
+    index.discard("b", 4)
+    index.discard("c", 5)
+    assert dict(index) == {"a": (1, 3)} and len(index) == 1
+    # a frozen posting is a tuple, shared by the following reads
+    assert index["a"] is index["a"]
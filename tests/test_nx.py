@@ -0,0 +1,56 @@
+import pytest
+from CwnGraph.cwn_nx import edge_list
+
+nx = pytest.importorskip("networkx")
+
+
+def test_networkx_view(cwn):
+    G = cwn.to_networkx()
+    assert set(G.nodes) == set(cwn.V)
+    assert set(G.edges) == set(cwn.E)
+    node_id = cwn.node_ids("sense")[0]
+    assert G.nodes[node_id] is cwn.V[node_id]
+    edge = next(iter(cwn.E))
+    assert G.edges[edge] is cwn.E[edge]
+    assert set(G.successors(node_id)) == {tgt for _, tgt in cwn.edge_src_index[node_id]}
+    assert set(G.predecessors(node_id)) == {src for src, _ in cwn.edge_tgt_index[node_id]}
+    assert G.out_degree(node_id) == len(cwn.edge_src_index[node_id])
+    assert G.graph["label"] == cwn.meta["label"]
+
+
+def test_networkx_view_matches_a_copy(cwn):
+    G = cwn.to_networkx()
+    H = nx.DiGraph()
+    H.add_nodes_from(cwn.V.items())
+    H.add_edges_from((src, tgt, edata) for (src, tgt), edata in cwn.E.items())
+    assert nx.number_weakly_connected_components(G) == \
+        nx.number_weakly_connected_components(H)
+    src, tgt = cwn.node_ids("sense")[:2]
+    U, UH = G.to_undirected(as_view=True), H.to_undirected()
+    assert nx.has_path(U, src, tgt) == nx.has_path(UH, src, tgt)
+    if nx.has_path(UH, src, tgt):
+        assert nx.shortest_path_length(U, src, tgt) == nx.shortest_path_length(UH, src, tgt)
+
+
+def test_networkx_view_is_frozen(cwn):
+    G = cwn.to_networkx()
+    with pytest.raises(nx.NetworkXError):
+        G.add_edge("a", "b")
+
+
+def test_edge_list(cwn):
+    pytest.importorskip("numpy")
+    ids, edges, edge_types = edge_list(cwn, relation_types=["synonym", "hypernym"])
+    expected = {edge: edata["edge_type"] for edge, edata in cwn.E.items()
+                if edata["edge_type"] in ("synonym", "hypernym")}
+    assert {(ids[i], ids[j]): t for (i, j), t in zip(edges, edge_types)} == expected
+
+
+def test_igraph(cwn):
+    pytest.importorskip("igraph")
+    G = cwn.to_igraph()
+    assert G.vcount() == len(cwn.V) and G.ecount() == len(cwn.E)
+    names = G.vs["name"]
+    assert {(names[e.source], names[e.target]): e["edge_type"] for e in G.es} == \
+        {edge: edata["edge_type"] for edge, edata in cwn.E.items()}
+    assert G.vs.find(name=cwn.node_ids("lemma")[0])["node_type"] == "lemma"
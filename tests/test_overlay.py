@@ -0,0 +1,132 @@
+import random
+import pytest
+from CwnGraph import CwnImage
+from CwnGraph.cwn_overlay import OverlayMapping, OverlayIndex
+
+
+def snapshot(cwn):
+    return ({k: dict(v) for k, v in cwn.V.items()},
+            {k: dict(v) for k, v in cwn.E.items()})
+
+
+def edit(session, rng):
+    sense_ids = list(session.node_ids("sense"))
+    lemma_id = session.node_ids("lemma")[0]
+    session.add_node("L-new", {"node_type": "lemma", "lemma": "新詞", "lemma_sno": 1})
+    session.add_node("S-new", {"node_type": "sense", "pos": "VC", "def": "新的",
+                               "domain": "", "examples": []})
+    session.add_edge(("L-new", "S-new"), {"edge_type": "has_sense"})
+    session.add_edge(("S-new", sense_ids[0]), {"edge_type": "hypernym"})
+    session.update_node(sense_ids[1], **{"def": "改過的"})
+    session.update_node(lemma_id, lemma="改過")
+    for edge in rng.sample([x for x in session.E if x[0] in sense_ids], 5):
+        session.remove_edge(edge)
+    session.remove_node(sense_ids[2])
+
+
+def test_view_matches_edited_copy(cwn):
+    V, E = snapshot(cwn)
+    reference = CwnImage(V, E, dict(cwn.meta))
+    session = cwn.overlay()
+    edit(session, random.Random(0))
+    edit(reference, random.Random(0))
+
+    assert dict(session.V) == reference.V and len(session.V) == len(reference.V)
+    assert dict(session.E) == reference.E and len(session.E) == len(reference.E)
+    for index in ("edge_src_index", "edge_tgt_index"):
+        merged = getattr(session, index)
+        expected = getattr(reference, index)
+        assert len(merged) == len(expected) == len(list(merged))
+        assert {k: set(v) for k, v in merged.items()} == \
+            {k: set(v) for k, v in expected.items()}
+    for node_type in ("lemma", "sense"):
+        assert list(session.node_ids(node_type)) == list(reference.node_ids(node_type))
+    assert dict(session.lemma_index) == dict(reference.lemma_index)
+    assert session.query().pos("VC").ids() == reference.query().pos("VC").ids()
+    assert session.connected("S-new") == reference.connected("S-new")
+
+
+def test_commit_and_rollback(cwn):
+    before = snapshot(cwn)
+    session = cwn.overlay()
+    edit(session, random.Random(0))
+    assert snapshot(cwn) == before
+    assert len(session.diff()["nodes_removed"]) == 1
+
+    session.rollback()
+    assert snapshot(session) == before
+    assert len(session.V) == len(before[0]) and len(session.E) == len(before[1])
+    assert not any(session.diff().values())
+
+    edit(session, random.Random(0))
+    edited = snapshot(session)
+    session.commit()
+    assert snapshot(cwn) == edited == snapshot(session)
+    assert not any(session.diff().values())
+    assert cwn.lemma_index["新詞"] == ("L-new",)
+
+
+def test_counts_follow_the_base(cwn):
+    session = cwn.overlay()
+    other = cwn.overlay()
+    session.add_node("X", {"node_type": "lemma", "lemma": "甲", "lemma_sno": 1})
+    node_id = cwn.node_ids("sense")[0]
+    edge = cwn.edge_src_index[node_id][0]
+    session.remove_edge(edge)
+    n_nodes, n_edges = len(session.V), len(session.E)
+
+    # another session commits the same node, and removes the same edge
+    other.add_node("X", {"node_type": "lemma", "lemma": "甲", "lemma_sno": 1})
+    other.remove_edge(edge)
+    other.commit()
+    assert len(session.V) == n_nodes == len(list(session.V))
+    assert len(session.E) == n_edges == len(list(session.E))
+    assert len(session.edge_src_index) == len(list(session.edge_src_index))
+
+
+def test_mapping_counts():
+    base = {"a": 1, "b": 2}
+    view = OverlayMapping(base)
+    view["c"] = 3
+    view["a"] = 10
+    del view["b"]
+    view["b"] = 20
+    del view["c"]
+    del view["a"]
+    assert len(view) == 1 and dict(view) == {"b": 20}
+    with pytest.raises(KeyError):
+        del view["c"]
+    base["c"] = 3
+    assert len(view) == 2 == len(list(view))
+
+
+def test_index_counts():
+    base = {"a": (1, 2), "b": (3,)}
+    index = OverlayIndex(base)
+    index.discard("b", 3)
+    index.add("c", 4)
+    index.discard("c", 4)
+    index.add("d", 5)
+    assert len(index) == 2 and dict(index) == {"a": (1, 2), "d": (5,)}
+    index.add("b", 6)
+    assert dict(index) == {"a": (1, 2), "b": (6,), "d": (5,)} and len(index) == 3
+    index.clear_delta()
+    assert len(index) == 2
+
+
+class CountingDict(dict):
+    n_lookups = 0
+
+    def __contains__(self, key):
+        CountingDict.n_lookups += 1
+        return super().__contains__(key)
+
+
+def test_len_does_not_scan_the_delta():
+    base = CountingDict(a=1)
+    view = OverlayMapping(base)
+    for i in range(100):
+        view[i] = i
+    CountingDict.n_lookups = 0
+    assert len(view) == 101
+    assert CountingDict.n_lookups == 0
@@ -0,0 +1,52 @@
+import pytest
+from CwnGraph.cwn_phonetic import PhoneticIndex, zhuyin_keys, normalize_pinyin
+
+
+@pytest.mark.parametrize("zhuyin, pinyin", [
+    ("ㄓㄨㄥ ㄨㄣˊ", "zhong1 wen2"), ("ㄋㄩˇ", "nv3"), ("ㄐㄩˋ", "ju4"),
+    ("ㄕˋ", "shi4"), ("ㄧ", "yi1"), ("ㄩㄝˋ", "yue4"), ("˙ㄉㄜ", "de5"),
+    ("ㄒㄩㄥ", "xiong1")])
+def test_zhuyin_keys(zhuyin, pinyin):
+    keys = zhuyin_keys(zhuyin)
+    assert keys["zhuyin"] == zhuyin
+    assert keys["pinyin"] == pinyin
+    assert keys["pinyin_toneless"] == "".join(x for x in pinyin if not x.isdigit())
+
+
+def test_normalize_pinyin():
+    assert normalize_pinyin("Zhōng wén") == "zhong1 wen2"
+    assert normalize_pinyin("nǚ") == "nv3"
+    assert normalize_pinyin("nu:3") == "nv3"
+
+
+def test_find():
+    index = PhoneticIndex([("L1", "ㄓㄨㄥ ㄨㄣˊ"), ("L2", "ㄓㄨㄥˋ ㄨㄣˊ"),
+                           ("L3", "ㄓㄨㄥ"), ("L4", "ㄕˋ，ㄕˊ")])
+    assert index.find("ㄓㄨㄥ ㄨㄣˊ") == ["L1"]
+    assert index.find("ㄓㄨㄥ ㄨㄣ") == ["L1", "L2"]
+    assert index.find("zhong1 wen2") == ["L1"]
+    assert index.find("zhōng wén") == ["L1"]
+    assert index.find("zhong wen") == ["L1", "L2"]
+    assert index.find("zhong", prefix=True) == ["L3", "L1", "L2"]
+    assert index.find("shi2") == index.find("shi4") == ["L4"]
+    assert index.homophones("L1") == []
+    assert index.homophones("L1", tone=False) == ["L2"]
+
+
+def test_find_lemma_by_sound_matches_brute_force(cwn):
+    lemma_ids = cwn.node_ids("lemma")
+    for lemma_id in lemma_ids[:30]:
+        keys = zhuyin_keys(cwn.V[lemma_id]["zhuyin"])
+        for query, kind in [(keys["zhuyin"], "zhuyin"),
+                            (keys["pinyin_toneless"], "pinyin_toneless")]:
+            expected = [x for x in lemma_ids
+                        if zhuyin_keys(cwn.V[x]["zhuyin"])[kind] == query]
+            assert [x.id for x in cwn.find_lemma_by_sound(query)] == expected
+        assert lemma_id not in [x.id for x in cwn.find_homophones(lemma_id)]
+
+
+def test_phonetic_index_follows_mutations(cwn):
+    assert not cwn.find_lemma_by_sound("ㄅㄚˇ ㄅㄚˇ ㄅㄚˇ")
+    cwn.add_node("L-new", {"node_type": "lemma", "lemma": "把把把",
+                           "lemma_sno": 1, "zhuyin": "ㄅㄚˇ ㄅㄚˇ ㄅㄚˇ"})
+    assert [x.id for x in cwn.find_lemma_by_sound("ba3 ba3 ba3")] == ["L-new"]
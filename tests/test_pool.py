@@ -0,0 +1,73 @@
+import pickle
+import tempfile
+from itertools import islice
+from CwnGraph import cwn_pool
+from CwnGraph.cwn_types import CwnSense, CwnRelation
+
+
+def count_senses(cgu, lemma):
+    return len(cgu.find_all_senses(lemma))
+
+
+def lemmas_of(cwn, n):
+    return [cwn.V[x]["lemma"] for x in cwn.node_ids("lemma")[:n]]
+
+
+def test_map_queries_matches_serial_results(cwn):
+    lemmas = lemmas_of(cwn, 50)
+    results = list(cwn.map_queries(lemmas, method="find_all_senses",
+                                   workers=2, chunksize=8))
+    assert results == [cwn.find_all_senses(x) for x in lemmas]
+    assert all(x.cgu is cwn for senses in results for x in senses)
+
+    queries = [(count_senses, (x,)) for x in lemmas] + \
+              [("find_lemma", (x,), {}) for x in lemmas]
+    assert list(cwn.map_queries(queries, workers=2, chunksize=8)) == \
+        [count_senses(cwn, x) for x in lemmas] + [cwn.find_lemma(x) for x in lemmas]
+
+
+def test_map_queries_consumes_input_lazily(cwn):
+    lemmas = lemmas_of(cwn, 300)
+    consumed = []
+
+    def queries():
+        for x in lemmas:
+            consumed.append(x)
+            yield x
+
+    results = cwn.map_queries(queries(), method="find_all_senses",
+                              workers=2, chunksize=4, max_pending=3)
+    first = list(islice(results, 1))
+    assert first == [cwn.find_all_senses(lemmas[0])]
+    assert len(consumed) <= 3 * 4 + 4
+    results.close()
+
+
+def test_map_queries_without_fork_removes_image_file(cwn, monkeypatch, tmp_path):
+    monkeypatch.setattr(cwn_pool, "can_fork", lambda: False)
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    lemmas = lemmas_of(cwn, 10)
+    results = list(cwn.map_queries(lemmas, method="find_all_senses", workers=2))
+    assert results == [cwn.find_all_senses(x) for x in lemmas]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_encoded_results_hold_no_image(cwn):
+    sense = CwnSense(cwn.node_ids("sense")[0], cwn)
+    edge = next(iter(cwn.E))
+    ret = {"pairs": [(sense, 0.5)], "nodes": {sense},
+           "edges": (CwnRelation(edge, cwn, reversed=True),)}
+    encoded = cwn_pool.encode_result(ret)
+    assert len(pickle.dumps(encoded)) < 500
+
+    decoded = cwn_pool.decode_result(pickle.loads(pickle.dumps(encoded)), cwn)
+    assert decoded["pairs"] == [(sense, 0.5)]
+    assert decoded["pairs"][0][0].cgu is cwn
+    assert decoded["nodes"] == {sense}
+    relation = decoded["edges"][0]
+    assert (relation.id, relation.reversed, relation.cgu) == (edge, True, cwn)
+
+
+def test_plain_tuples_are_not_decoded(cwn):
+    ret = [("EncodedNode", "CwnSense", "x"), ("a", 1, None)]
+    assert cwn_pool.decode_result(cwn_pool.encode_result(ret), cwn) == ret
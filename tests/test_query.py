@@ -0,0 +1,87 @@
+import re
+import pytest
+from CwnGraph.cwn_bitmap import split_values
+from CwnGraph.cwn_examples import strip_markers
+
+
+def brute_force(cwn, *conditions):
+    return [nid for nid in cwn.node_ids("sense")
+            if all(cond(nid, cwn.V[nid]) for cond in conditions)]
+
+
+def has_relation(cwn, relation_type, target_id=None):
+    sources = {src for (src, tgt), edata in cwn.E.items()
+               if edata["edge_type"] == relation_type
+               and target_id in (None, tgt)}
+    return lambda nid, ndata: nid in sources
+
+
+def test_predicates_match_brute_force(cwn):
+    lemma = cwn.V[cwn.node_ids("lemma")[0]]["lemma"]
+    lemma_senses = set(cwn.lemma_sense_ids(lemma))
+    hypernym_src, hypernym_tgt = next(edge for edge, edata in cwn.E.items()
+                                      if edata["edge_type"] == "hypernym")
+    pos = lambda *tags: lambda nid, ndata: bool(set(tags) & set(split_values(ndata["pos"])))
+    domain = lambda *domains: lambda nid, ndata: ndata.get("domain") in domains
+    cases = [
+        (cwn.query().lemma(lemma), [lambda nid, _: nid in lemma_senses]),
+        (cwn.query().lemma_regex("^[一-丿]"),
+         [lambda nid, _: any(re.search("^[一-丿]", x.lemma)
+                             for x in cwn.from_sense_id(nid).lemmas)]),
+        (cwn.query().pos("VC", "Na"), [pos("VC", "Na")]),
+        (cwn.query().pos_regex("N.*"), [lambda nid, ndata: re.search("N.*", ndata["pos"])]),
+        (cwn.query().domain("bio", "med").pos("VC"), [domain("bio", "med"), pos("VC")]),
+        (cwn.query().related("hypernym"), [has_relation(cwn, "hypernym")]),
+        (cwn.query().related("hypernym", hypernym_tgt),
+         [has_relation(cwn, "hypernym", hypernym_tgt)]),
+        (cwn.query().definition("。").pos("D"),
+         [pos("D"), lambda nid, ndata: "。" in ndata.get("def", "")]),
+        (cwn.query().examples("<"), [lambda nid, ndata: False]),
+        (cwn.query().where(lambda nid, ndata: nid.endswith("1")).domain("sport"),
+         [lambda nid, _: nid.endswith("1"), domain("sport")]),
+        (cwn.query(), []),
+    ]
+    for query, conditions in cases:
+        expected = brute_force(cwn, *conditions)
+        assert query.ids() == expected, query
+        assert query.count() == len(expected)
+    assert hypernym_src in cwn.query().related("hypernym", hypernym_tgt).ids()
+
+
+def test_examples_ignore_markers(cwn):
+    sense_id = next(nid for nid in cwn.node_ids("sense") if cwn.V[nid]["examples"])
+    text = strip_markers(cwn.V[sense_id]["examples"][0])[:4]
+    assert sense_id in cwn.query().examples(text).ids()
+
+
+def test_limit_offset_page(cwn):
+    all_ids = cwn.query().pos("VC").ids()
+    assert len(all_ids) > 10
+    assert cwn.query().pos("VC").limit(5).ids() == all_ids[:5]
+    assert cwn.query().pos("VC").offset(3).limit(4).ids() == all_ids[3:7]
+    assert cwn.query().pos("VC").page(1, page_size=4).ids() == all_ids[4:8]
+    query = cwn.query().pos("VC").offset(2).limit(3)
+    assert query.count() == len(all_ids)
+    assert query.first().id == all_ids[2]
+    assert [x.id for x in query] == all_ids[2:5]
+    assert cwn.query().lemma("no-such-lemma").first() is None
+
+
+def test_explain(cwn):
+    query = cwn.query().definition("。").domain("bio").pos("VC", "Na")
+    lines = query.explain().splitlines()
+    (_, domain_bitmap), (_, pos_bitmap) = query.plan()[0]
+    assert len(domain_bitmap) <= len(pos_bitmap)
+    assert lines == [f"candidates: domain in ['bio'] ({len(domain_bitmap)})",
+                     f"intersect: pos in ['Na', 'VC'] ({len(pos_bitmap)})",
+                     "filter: definition contains '。'"]
+    assert cwn.query().definition("。").explain() == \
+        "candidates: all senses\nfilter: definition contains '。'"
+
+
+def test_query_follows_mutations(cwn):
+    n_before = cwn.query().pos("VC").count()
+    cwn.add_node("S-new", {"node_type": "sense", "pos": "VC", "def": "新的",
+                           "domain": "", "examples": []})
+    assert cwn.query().pos("VC").count() == n_before + 1
+    assert cwn.query().pos("VC").definition("新的").ids() == ["S-new"]
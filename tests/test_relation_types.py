@@ -0,0 +1,38 @@
+import pytest
+from CwnGraph.cwn_types import CwnRelationType, relation_flags, relation_mask
+
+
+@pytest.mark.parametrize("rel", list(CwnRelationType))
+def test_categories(rel):
+    # the categories as the name lists and value range they replace
+    assert rel.is_semantic_relation() == (0 < rel.value <= 20)
+    assert rel.is_upper_relation() == (rel.name in ("holonym", "hypernym"))
+    assert rel.is_lower_relation() == (rel.name in ("meronym", "hyponym"))
+    assert rel.is_synonym_relation() == \
+        (rel.name in ("synonym", "is_synset", "has_synset"))
+    assert relation_flags(rel.name) == rel.flags
+    for upper in (False, True):
+        for synonym in (False, True):
+            mask = relation_mask(upper=upper, synonym=synonym)
+            assert bool(rel.flags & mask) == \
+                (upper and rel.is_upper_relation() or
+                 synonym and rel.is_synonym_relation())
+
+
+def test_inverse():
+    pairs = [("hypernym", "hyponym"), ("holonym", "meronym"),
+             ("has_instance", "instance_of")]
+    for x, y in pairs:
+        assert CwnRelationType[x].inverse() is CwnRelationType[y]
+        assert CwnRelationType[y].inverse() is CwnRelationType[x]
+    assert CwnRelationType.synonym.inverse() is None
+
+
+def test_lookups():
+    assert CwnRelationType.from_zhLabel("上位詞") is CwnRelationType.hypernym
+    assert CwnRelationType.from_zhLabel("同義詞集") is CwnRelationType.is_synset
+    assert CwnRelationType.from_zhLabel("不明") is CwnRelationType.generic
+    assert relation_flags("no-such-relation") == 0
+    assert relation_mask() == 0
+    assert {CwnRelationType.synonym: 1}[CwnRelationType["synonym"]] == 1
+    assert CwnRelationType.synonym != "synonym"
@@ -0,0 +1,46 @@
+import pytest
+
+
+def test_dict_columns_match_senses(cwn):
+    table = cwn.sense_table(columns=cwn.SENSE_COLUMNS, output="dict")
+    senses = cwn.get_all_senses()
+    assert table["id"] == [x.id for x in senses]
+    assert table["pos"] == [x.pos for x in senses]
+    assert table["definition"] == [x.definition for x in senses]
+    assert table["head_word"] == [x.head_word for x in senses]
+    assert table["lemma_id"] == [x.lemmas[0].id for x in senses]
+    assert table["n_examples"] == [len(x.data().get("examples", [])) for x in senses]
+
+
+def test_filters_match_bitmaps(cwn):
+    bitmaps = cwn.sense_bitmaps
+    multi_pos = [x for x in cwn.get_all_senses() if "," in x.pos]
+    assert multi_pos
+    for pos in {x.pos.split(",")[0] for x in multi_pos}:
+        table = cwn.sense_table(columns=["id"], pos=pos, output="dict")
+        assert table["id"] == list(bitmaps.pos(pos))
+    table = cwn.sense_table(columns=["id", "domain"], domain=["bio", "med"],
+                            output="dict")
+    assert table["id"] == list(bitmaps.domain("bio", "med"))
+    assert set(table["domain"]) == {"bio", "med"}
+
+
+def test_numpy_output(cwn):
+    np = pytest.importorskip("numpy")
+    table = cwn.sense_table()
+    assert table["n_examples"].dtype == np.int64
+    assert len(table["id"]) == len(cwn.node_ids("sense"))
+
+
+def test_bad_arguments(cwn):
+    with pytest.raises(ValueError):
+        cwn.sense_table(columns=["id", "color"])
+    with pytest.raises(ValueError):
+        cwn.sense_table(output="xml")
+
+
+def test_node_type_partition(cwn):
+    for node_type in ("lemma", "sense", "synset", "facet"):
+        assert list(cwn.node_ids(node_type)) == \
+            [nid for nid, ndata in cwn.V.items() if ndata["node_type"] == node_type]
+    assert cwn.node_ids("no-such-type") == ()
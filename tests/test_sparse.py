@@ -0,0 +1,78 @@
+import pytest
+from CwnGraph.cwn_types import CwnIdNotFoundError
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+
+def test_matrix_has_the_edges(cwn):
+    adj = cwn.to_sparse()
+    rows, cols = adj.matrix.nonzero()
+    assert {(adj.ids[i], adj.ids[j]) for i, j in zip(rows, cols)} == set(cwn.E)
+    assert adj.ids[:len(cwn.V)] == list(cwn.V)
+
+
+def test_filters(cwn):
+    adj = cwn.to_sparse(relation_types=["hypernym"], node_types=["sense"])
+    rows, cols = adj.matrix.nonzero()
+    expected = {edge for edge, edata in cwn.E.items()
+                if edata["edge_type"] == "hypernym" and
+                cwn.V[edge[0]]["node_type"] == cwn.V[edge[1]]["node_type"] == "sense"}
+    assert {(adj.ids[i], adj.ids[j]) for i, j in zip(rows, cols)} == expected
+    assert adj.ids == list(cwn.node_ids("sense"))
+
+    sym = cwn.to_sparse(relation_types=["hypernym"], is_directed=False).matrix
+    assert (sym != sym.T).nnz == 0
+
+
+def test_degrees(cwn):
+    adj = cwn.to_sparse()
+    out_deg = adj.degrees("out")
+    in_deg = adj.degrees("in")
+    for nid in list(cwn.V)[::13]:
+        i = adj.index[nid]
+        assert out_deg[i] == len(cwn.edge_src_index.get(nid, ()))
+        assert in_deg[i] == len(cwn.edge_tgt_index.get(nid, ()))
+    assert np.array_equal(adj.degrees("both"), out_deg + in_deg)
+    with pytest.raises(ValueError):
+        adj.degrees("sideways")
+
+
+def test_neighbourhoods(cwn):
+    adj = cwn.to_sparse()
+    node_ids = cwn.node_ids("sense")[:20]
+    for node_id, reached in zip(node_ids, adj.neighbourhoods(node_ids, n_hops=2)):
+        expected = {node_id}
+        frontier = {node_id}
+        for _ in range(2):
+            frontier = {tgt for x in frontier
+                        for _, tgt in cwn.edge_src_index.get(x, ())}
+            expected |= frontier
+        assert reached == expected
+
+
+def test_personalized_pagerank(cwn):
+    nx = pytest.importorskip("networkx")
+    adj = cwn.to_sparse(relation_types=["hypernym", "hyponym", "synonym"],
+                        node_types=["sense"])
+    seeds = adj.ids[:3]
+    scores = adj.personalized_pagerank(seeds, tol=1e-12, max_iter=500)
+    assert scores.sum() == pytest.approx(1)
+
+    G = nx.from_scipy_sparse_array(adj.matrix, create_using=nx.DiGraph)
+    restart = {i: (1 / 3 if i < 3 else 0) for i in range(len(adj.ids))}
+    expected = nx.pagerank(G, alpha=0.85, personalization=restart,
+                           dangling=restart, tol=1e-12, max_iter=500)
+    assert scores == pytest.approx([expected[i] for i in range(len(adj.ids))], abs=1e-8)
+
+    batch = adj.personalized_pagerank([seeds, adj.ids[5:6]], tol=1e-12, max_iter=500)
+    assert batch.shape == (2, len(adj.ids))
+    assert batch[0] == pytest.approx(scores)
+
+
+def test_unknown_ids(cwn):
+    adj = cwn.to_sparse()
+    with pytest.raises(CwnIdNotFoundError):
+        adj.neighbourhoods(["no-such-node"])
+    with pytest.raises(ValueError):
+        adj.personalized_pagerank([[]])
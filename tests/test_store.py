@@ -0,0 +1,64 @@
+import pickle
+from CwnGraph import CwnImage
+from CwnGraph.cwn_store import NodeTable, NodeView, NodeStore
+
+
+def test_compact_keeps_the_hash(cwn, make_image):
+    original = make_image()
+    table = cwn.compact()
+    assert isinstance(cwn.V, NodeStore) and isinstance(table, NodeTable)
+    assert cwn.get_hash() == original.get_hash()
+    assert list(cwn.V) == list(original.V)
+    assert all(cwn.V[x] == original.V[x] for x in original.V)
+    assert cwn.compact() is table
+
+
+def test_columns_keep_their_values():
+    V = {f"n{i}": {"node_type": "sense", "def": f"定義{i}", "pos": "VC" if i % 2 else "Na",
+                   "examples": [f"例{i}", "<例>"], "n": i} for i in range(40)}
+    # values not of their column's type are kept as they are
+    V["n3"]["examples"] = ""
+    V["n4"]["n"] = 2**70
+    V["n5"]["pos"] = None
+    V["x"] = {"node_type": "lemma", "lemma": "詞", "lemma_sno": 1}
+    table = NodeTable(V)
+    assert len(table.shapes) == 2
+    assert dict(table) == V
+    for nid, ndata in V.items():
+        view = table[nid]
+        assert isinstance(view, NodeView)
+        assert dict(view) == ndata and list(view) == list(ndata)
+        assert {k: type(v) for k, v in view.items()} == \
+            {k: type(v) for k, v in ndata.items()}
+    assert table["n1"].get("lemma") is None and "lemma" not in table["n1"]
+    assert table.get("missing") is None
+    # pickled as plain dicts
+    assert type(pickle.loads(pickle.dumps(table["n1"]))) is dict
+
+
+def test_mutations_after_compact(cwn, make_image):
+    reference = make_image()
+    cwn.compact()
+    for image in (cwn, reference):
+        sense_ids = image.node_ids("sense")
+        image.update_node(sense_ids[0], pos="VH")
+        image.remove_node(sense_ids[1])
+        image.add_node("S-new", {"node_type": "sense", "pos": "Na", "def": "新"})
+    assert cwn.get_hash() == reference.get_hash()
+    assert cwn.query().pos("VH", "Na").ids() == reference.query().pos("VH", "Na").ids()
+    assert cwn.V[cwn.node_ids("sense")[0]]["pos"] == "VH"
+
+    # compacting again folds the changes into a new table
+    table = cwn.compact()
+    assert "S-new" in table and not cwn.V.delta
+    assert cwn.get_hash() == reference.get_hash()
+
+
+def test_save_compacted(cwn, tmp_path):
+    cwn.compact()
+    cwn.save(tmp_path / "img.pyobj")
+    loaded = CwnImage.load(tmp_path / "img.pyobj")
+    assert loaded.get_hash() == cwn.get_hash()
+    compacted = CwnImage.load(tmp_path / "img.pyobj", compact=True)
+    assert isinstance(compacted.V, NodeStore)
+    assert compacted.get_hash() == cwn.get_hash()
@@ -0,0 +1,54 @@
+import json
+from CwnGraph import CwnImage
+from CwnGraph.cwn_synthetic import generate_image, iter_image, write_json
+
+
+def test_same_arguments_same_image():
+    assert generate_image(100, seed=1) == generate_image(100, seed=1)
+    assert generate_image(100, seed=1)[0] != generate_image(100, seed=2)[0]
+
+
+def test_schema_and_scale(image_data):
+    V, E, meta = image_data
+    n_lemma = sum(1 for x in V.values() if x["node_type"] == "lemma")
+    assert n_lemma == 300
+    assert meta["generator"] == {"n_lemma": 300, "seed": 7}
+    # every edge joins two nodes, and is yielded after them
+    seen = set()
+    for kind, item_id, item_data in iter_image(300, seed=7):
+        if kind == "node":
+            seen.add(item_id)
+        else:
+            assert item_id[0] in seen and item_id[1] in seen
+    assert all(src in V and tgt in V for src, tgt in E)
+
+    cwn = CwnImage(V, E, meta)
+    sense = cwn.get_all_senses()[0]
+    assert sense.lemmas and sense.definition and sense.pos
+
+
+def test_hierarchy_depth():
+    V, E, meta = generate_image(500, seed=3, hierarchy_depth=3)
+    hypernyms = {}
+    for (src, tgt), edata in E.items():
+        if edata["edge_type"] == "hypernym" and V[tgt]["node_type"] == "sense":
+            hypernyms.setdefault(src, []).append(tgt)
+
+    def chain_length(node_id):
+        return max((1 + chain_length(x) for x in hypernyms.get(node_id, ())),
+                   default=0)
+    assert hypernyms
+    assert max(chain_length(x) for x in hypernyms) <= 2
+
+
+def test_write_json_loads_as_the_generated_image(tmp_path):
+    prefix = str(tmp_path / "syn")
+    n_nodes, n_edges = write_json(prefix, 100, seed=5)
+    V, E, meta = generate_image(100, seed=5)
+    assert (n_nodes, n_edges) == (len(V), len(E))
+    with open(prefix + "_meta.json", encoding="UTF-8") as fin:
+        assert json.load(fin) == meta
+    with open(prefix + "_nodes.json", encoding="UTF-8") as fin:
+        assert json.load(fin) == V
+    with open(prefix + "_edges.json", encoding="UTF-8") as fin:
+        assert {tuple(k.split("-")): v for k, v in json.load(fin).items()} == E